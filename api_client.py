@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+API Client for BlinkySign
+Shared HTTP client for the button clients: one persistent session with a
+connection pool, timeouts, retries with jittered backoff and optional HTTP/2
+"""
+import os
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Client configuration
+API_ENDPOINT = os.getenv('API_ENDPOINT', 'http://localhost:5000')
+API_KEY = os.getenv('API_KEY')  # API Gateway key, sent as x-api-key when set
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', 3.0))  # Seconds to open a connection
+API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', 5.0))  # Seconds to wait for a response
+API_RETRIES = int(os.getenv('API_RETRIES', 2))  # Retries after the first attempt
+API_BACKOFF = float(os.getenv('API_BACKOFF', 0.2))  # Base retry delay in seconds (doubles per retry, with jitter)
+API_HTTP2 = os.getenv('API_HTTP2', 'false').lower() == 'true'  # HTTP/2 through httpx (pip install "httpx[http2]")
+API_BACKOFF_MAX = 2.0  # Longest retry delay in seconds
+API_POOL_SIZE = 4  # Connections kept open per host
+
+# Responses worth retrying: the request may have failed on the way
+RETRY_STATUS = (429, 502, 503, 504)
+# Of those, the ones that mean it was refused before it ran (safe to repeat even a toggle)
+REFUSED_STATUS = (429, 503)
+
+class APIClient:
+    """Persistent, thread-safe HTTP client for the sign's API
+
+    Connections (and their TLS sessions) stay open between requests, so
+    only the first request pays for the TCP and TLS handshakes. Every
+    request has a connect and a read timeout. A request that could not be
+    delivered (connection refused, connect timeout) or that was refused
+    with 429 or 503 is retried up to ``retries`` times after a jittered,
+    exponentially growing delay. A 502 or 504 (the gateway gave up on the
+    integration) and any other error (a reset or timeout after the request
+    was sent) are only retried when ``idempotent``: the server may have
+    carried the request out, and a repeated toggle would undo the first
+    one. ``http2`` uses httpx instead
+    of requests.
+    """
+
+    def __init__(self, endpoint=API_ENDPOINT, api_key=API_KEY, timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+                 retries=API_RETRIES, backoff=API_BACKOFF, http2=API_HTTP2, verify=True):
+        self.endpoint = endpoint.rstrip("/")
+        self.timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.http2 = http2
+        headers = {"x-api-key": api_key} if api_key else {}
+        if http2:
+            try:
+                import httpx
+            except ImportError:
+                raise RuntimeError('httpx is required for API_HTTP2 (pip install "httpx[http2]")')
+            connect, read = self.timeout
+            self._session = httpx.Client(
+                http2=True, headers=headers, verify=verify,
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(max_connections=API_POOL_SIZE, max_keepalive_connections=API_POOL_SIZE)
+            )
+            self._fatal = ()
+            self._unsent = (httpx.ConnectError, httpx.ConnectTimeout)
+            self._errors = (httpx.HTTPError,)
+            self._options = {}  # httpx takes its timeouts from the client
+        else:
+            self._session = requests.Session()
+            self._session.headers.update(headers)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=API_POOL_SIZE, max_retries=0)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+            self._fatal = (requests.exceptions.SSLError,)  # A bad certificate will not fix itself
+            self._unsent = (requests.exceptions.ConnectTimeout,)
+            self._errors = (requests.exceptions.RequestException,)
+            # Per request: REQUESTS_CA_BUNDLE would override a session-level verify
+            self._options = {"timeout": self.timeout, "verify": verify}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self._latency_last = 0.0
+        self._latency_max = 0.0
+        self._latency_total = 0.0
+
+    def close(self):
+        """Close the pooled connections"""
+        self._session.close()
+
+    def never_sent(self, error):
+        """True if ``error`` means the request never reached the server (connection refused, connect timeout)"""
+        if isinstance(error, self._unsent):
+            return True
+        # requests wraps refused connections as ConnectionError(MaxRetryError(reason=NewConnectionError))
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def _delay(self, attempt, response=None):
+        """Seconds to wait before retry ``attempt`` (full jitter, or the server's Retry-After)"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), API_BACKOFF_MAX)
+        return random.uniform(0, min(self.backoff * 2 ** attempt, API_BACKOFF_MAX))
+
+    def request(self, method, path, json=None, idempotent=None):
+        """Send a request, retrying as described above; returns the response
+
+        Raises the last error if every attempt failed. ``idempotent``
+        defaults to True for GET.
+        """
+        if idempotent is None:
+            idempotent = method == "GET"
+        url = f"{self.endpoint}{path}"
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                response = self._session.request(method, url, json=json, **self._options)
+                retry = RETRY_STATUS if idempotent else REFUSED_STATUS
+                if response.status_code not in retry or attempt == self.retries:
+                    self._record(started)
+                    return response
+                logger.warning(f"{method} {path} answered {response.status_code}, retrying")
+            except self._fatal:
+                self._record(started, failed=True)
+                raise
+            except self._errors as e:
+                if attempt == self.retries or not (idempotent or self.never_sent(e)):
+                    self._record(started, failed=True)
+                    raise
+                logger.warning(f"{method} {path} failed ({e}), retrying")
+            with self._lock:
+                self.retried += 1
+            time.sleep(self._delay(attempt, response))
+
+    def _record(self, started, failed=False):
+        latency = time.perf_counter() - started
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.failed += 1
+            self._latency_last = latency
+            self._latency_max = max(self._latency_max, latency)
+            self._latency_total += latency
+
+    def get(self, path):
+        return self.request("GET", path)
+
+    def put(self, path, json=None, idempotent=False):
+        return self.request("PUT", path, json=json, idempotent=idempotent)
+
+    def status(self):
+        return self.get("/status")
+
+    def toggle(self):
+        return self.put("/toggle")
+
+    def set_muted(self, muted):
+        return self.put("/set", json={"muted": muted}, idempotent=True)
+
+    def effect(self, name):
+        return self.put(f"/effects/{name}")
+
+    def off(self):
+        return self.put("/off", idempotent=True)
+
+    def stats(self):
+        """Return request counts and latency (including retries)"""
+        with self._lock:
+            requests_made = self.requests or 1
+            return {
+                "http2": self.http2,
+                "requests": self.requests,
+                "retried": self.retried,
+                "failed": self.failed,
+                "latency_ms": {
+                    "last": round(self._latency_last * 1000, 3),
+                    "avg": round(self._latency_total / requests_made * 1000, 3),
+                    "max": round(self._latency_max * 1000, 3)
+                }
+            }
+
+# Shared client for this process
+api_client = APIClient()
@@ -6,10 +6,12 @@ import os
 import time
 import json
 import logging
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
-from led_controller import led_controller
+from led_client import led_client, LEDClient, LEDDaemonUnavailable, HTTP_STATUS, LED_CLIENT_TIMEOUT
+from effect_runner import QUEUED, RUNNING
+from state_stream import StateBroadcaster, StateEvent, STATUS_MAX_WAIT
 
 # Load environment variables
 load_dotenv()
@@ -24,52 +26,76 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app
 app = Flask(__name__)
 # Enable CORS with more explicit configuration
-CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization", "X-Api-Key"]}})
-
-# Current state
-current_state = {
-    "muted": False,
-    "led_on": False
-}
-
-def update_led_state():
-    """Update the LED based on current state"""
-    if current_state["muted"]:
-        led_controller.set_muted()
-        current_state["led_on"] = True
-    else:
-        led_controller.set_unmuted()
-        current_state["led_on"] = True
-    logger.info(f"LED state updated: {'MUTED' if current_state['muted'] else 'UNMUTED'}")
+CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization", "X-Api-Key", "If-None-Match"], "expose_headers": ["ETag", "X-State-Version"]}})
+
+# State changes pushed to every open control panel
+state_broadcaster = StateBroadcaster()
+
+def daemon_response(response, success_status=200):
+    """Turn an LED daemon response into a Flask response"""
+    if response.get("status") == "error":
+        code = response.pop("code", None)
+        return jsonify(response), HTTP_STATUS.get(code, 500)
+    return jsonify(response), success_status
+
+@app.errorhandler(LEDDaemonUnavailable)
+def daemon_unavailable(e):
+    """The LED daemon is not running or not responding"""
+    logger.error(f"LED daemon unavailable: {e}")
+    return jsonify({
+        "status": "error",
+        "message": "LED daemon unavailable"
+    }), 503
+
+def submit_effect(name, params=None):
+    """Queue an effect on the LED daemon and build the 202 Accepted response"""
+    response = led_client.effect(name, params)
+    if response.get("status") == "error":
+        return daemon_response(response)
+    accepted = jsonify(response)
+    accepted.headers["Location"] = f"/effects/{response['effect']['id']}"
+    return accepted, 202
 
 @app.route('/status', methods=['GET'])
 def get_status():
-    """Get the current mute status"""
-    return jsonify(current_state)
+    """Get the current mute status
+
+    Carries an ETag and the state version. A request whose If-None-Match
+    (or ``?version=``) is current gets 304; with ``?wait=<seconds>`` it is
+    held until the state changes instead.
+    """
+    state_broadcaster.follow(led_client.subscribe)
+    if_none_match = request.headers.get("If-None-Match")
+    version = request.args.get("version")
+    wait = request.args.get("wait", type=float)
+
+    event = state_broadcaster.current()
+    if event is None:
+        event = StateEvent.from_status(led_client.status())
+    elif wait and event.matches(if_none_match, version):
+        events = state_broadcaster.wait(event.seq, min(wait, STATUS_MAX_WAIT))
+        event = events[-1] if events else event
+
+    if event.matches(if_none_match, version):
+        response = Response(status=304)
+    else:
+        response = Response(event.body, mimetype="application/json")
+    response.headers["ETag"] = event.etag
+    response.headers["X-State-Version"] = str(event.version)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 @app.route('/toggle', methods=['PUT'])
 def toggle_mute():
     """Toggle the mute status"""
-    current_state["muted"] = not current_state["muted"]
-    update_led_state()
-    return jsonify({
-        "status": "success",
-        "message": f"Mute toggled to {'muted' if current_state['muted'] else 'unmuted'}",
-        "state": current_state
-    })
+    return daemon_response(led_client.toggle())
 
 @app.route('/set', methods=['PUT'])
 def set_status():
     """Set the mute status explicitly"""
     data = request.get_json()
     if data and "muted" in data:
-        current_state["muted"] = bool(data["muted"])
-        update_led_state()
-        return jsonify({
-            "status": "success",
-            "message": f"Status set to {'muted' if current_state['muted'] else 'unmuted'}",
-            "state": current_state
-        })
+        return daemon_response(led_client.set_muted(data["muted"]))
     return jsonify({
         "status": "error",
         "message": "Invalid request. Expected JSON with 'muted' field."
@@ -80,159 +106,99 @@ def health_check():
     """Health check endpoint"""
     return jsonify({"status": "healthy"})
 
-@app.route('/effects/rainbow', methods=['PUT'])
-def rainbow_effect():
-    """Trigger rainbow effect"""
-    try:
-        led_controller.rainbow_cycle()
-        update_led_state()  # Return to normal state after effect
-        return jsonify({
-            "status": "success",
-            "message": "Rainbow effect completed"
-        })
-    except Exception as e:
-        logger.error(f"Error in rainbow effect: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/effects/pulse', methods=['PUT'])
-def pulse_effect():
-    """Trigger pulse effect"""
-    try:
-        data = request.get_json() or {}
-        color = data.get("color", "blue").lower()
-        cycles = int(data.get("cycles", 3))
-        
-        # Map color names to RGB values
-        color_map = {
-            "red": (255, 0, 0),
-            "green": (0, 255, 0),
-            "blue": (0, 0, 255),
-            "yellow": (255, 255, 0),
-            "purple": (128, 0, 128),
-            "cyan": (0, 255, 255),
-            "white": (255, 255, 255)
-        }
-        
-        rgb_color = color_map.get(color, (0, 0, 255))  # Default to blue
-        
-        led_controller.pulse(rgb_color, cycles=cycles)
-        update_led_state()  # Return to normal state after effect
-        
-        return jsonify({
-            "status": "success",
-            "message": f"Pulse effect completed with color {color}"
-        })
-    except Exception as e:
-        logger.error(f"Error in pulse effect: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/effects/theater', methods=['PUT'])
-def theater_effect():
-    """Trigger theater chase effect"""
-    try:
-        data = request.get_json() or {}
-        color = data.get("color", "white").lower()
-        iterations = int(data.get("iterations", 10))
-        
-        # Map color names to RGB values
-        color_map = {
-            "red": (255, 0, 0),
-            "green": (0, 255, 0),
-            "blue": (0, 0, 255),
-            "yellow": (255, 255, 0),
-            "purple": (128, 0, 128),
-            "cyan": (0, 255, 255),
-            "white": (255, 255, 255)
-        }
-        
-        rgb_color = color_map.get(color, (255, 255, 255))  # Default to white
-        
-        led_controller.theater_chase(rgb_color, iterations=iterations)
-        update_led_state()  # Return to normal state after effect
-        
-        return jsonify({
-            "status": "success",
-            "message": f"Theater chase effect completed with color {color}"
-        })
-    except Exception as e:
-        logger.error(f"Error in theater chase effect: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
-
-@app.route('/effects/wipe', methods=['PUT'])
-def wipe_effect():
-    """Trigger color wipe effect"""
-    try:
-        data = request.get_json() or {}
-        color = data.get("color", "blue").lower()
-        
-        # Map color names to RGB values
-        color_map = {
-            "red": (255, 0, 0),
-            "green": (0, 255, 0),
-            "blue": (0, 0, 255),
-            "yellow": (255, 255, 0),
-            "purple": (128, 0, 128),
-            "cyan": (0, 255, 255),
-            "white": (255, 255, 255)
-        }
-        
-        rgb_color = color_map.get(color, (0, 0, 255))  # Default to blue
-        
-        led_controller.color_wipe(rgb_color)
-        update_led_state()  # Return to normal state after effect
-        
-        return jsonify({
-            "status": "success",
-            "message": f"Color wipe effect completed with color {color}"
-        })
-    except Exception as e:
-        logger.error(f"Error in color wipe effect: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Performance metrics for the LED pipeline"""
+    metrics = led_client.metrics()["metrics"]
+    metrics["stream"] = state_broadcaster.stats()
+    return jsonify(metrics)
+
+@app.route('/events', methods=['GET'])
+def state_events():
+    """Stream state changes to the client as Server-Sent Events"""
+    state_broadcaster.follow(led_client.subscribe)
+    response = Response(state_broadcaster.sse_stream(request.headers.get("Last-Event-ID")),
+                        mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route('/effects/<name>', methods=['PUT'])
+def start_effect(name):
+    """Trigger an effect (optional JSON body with its parameters, such as ``color``)"""
+    data = request.get_json(silent=True)
+    return submit_effect(name, data if isinstance(data, dict) else None)
+
+@app.route('/effects/types', methods=['GET'])
+def effect_types():
+    """List the effects that can be triggered and their parameters"""
+    return jsonify({"effects": led_client.effect_types()["effects"]})
+
+@app.route('/effects', methods=['GET'])
+def list_effects():
+    """List recently submitted effects"""
+    return jsonify({"effects": led_client.effects()["effects"]})
+
+@app.route('/effects/<effect_id>', methods=['GET'])
+def get_effect(effect_id):
+    """Poll the status of a submitted effect"""
+    return daemon_response(led_client.effect_status(effect_id))
+
+@app.route('/effects/<effect_id>', methods=['DELETE'])
+def cancel_effect(effect_id):
+    """Cancel a queued or running effect"""
+    return daemon_response(led_client.cancel_effect(effect_id))
+
+@app.route('/batch', methods=['POST'])
+def run_batch():
+    """Run an ordered list of operations as one timeline
+
+    Steps are ``set``, ``toggle``, ``off``, ``effect`` and ``pause``. Answers
+    202 with per-step results to poll at /effects/<id>; ``?wait=<seconds>``
+    holds the response until the batch finishes (200) or the wait runs out.
+    """
+    data = request.get_json(silent=True)
+    steps = data.get("steps") if isinstance(data, dict) else data
+    response = led_client.batch(steps)
+    if response.get("status") == "error":
+        return daemon_response(response)
+
+    job = response["effect"]
+    wait = min(request.args.get('wait', 0, type=float), STATUS_MAX_WAIT)
+    if wait > 0:
+        # Wait on a connection of our own so other requests are not held up
+        waiter = LEDClient(timeout=wait + LED_CLIENT_TIMEOUT)
+        try:
+            job = waiter.effect_status(job["id"], wait=wait)["effect"]
+        finally:
+            waiter.close()
+
+    finished = job["status"] not in (QUEUED, RUNNING)
+    if finished:
+        response = {"status": "success", "message": f"Batch {job['status']}", "effect": job}
+    result = jsonify(response)
+    result.headers["Location"] = f"/effects/{job['id']}"
+    return result, 200 if finished else 202
 
 @app.route('/off', methods=['PUT'])
 def turn_off():
     """Turn off all LEDs"""
-    try:
-        led_controller.turn_off()
-        current_state["led_on"] = False
-        return jsonify({
-            "status": "success",
-            "message": "LEDs turned off",
-            "state": current_state
-        })
-    except Exception as e:
-        logger.error(f"Error turning off LEDs: {e}")
-        return jsonify({
-            "status": "error",
-            "message": str(e)
-        }), 500
+    return daemon_response(led_client.off())
 
 if __name__ == '__main__':
     try:
-        # Show connecting state
-        led_controller.set_connecting()
-        time.sleep(1)
+        # The LED daemon owns the strips and the mute state
+        try:
+            logger.info(f"LED state: {led_client.status()['state']}")
+        except LEDDaemonUnavailable as e:
+            logger.warning(f"{e} (start led_daemon.py; requests fail with 503 until then)")
         
-        # Initial LED state
-        update_led_state()
+        state_broadcaster.follow(led_client.subscribe)
         
         # Start the Flask app
         port = int(os.getenv('PORT', 5000))
         app.run(host='0.0.0.0', port=port)
     except Exception as e:
         logger.error(f"Error: {e}")
-        led_controller.set_error()
-        time.sleep(2)
-        led_controller.turn_off()
\ No newline at end of file
+    finally:
+        led_client.close()
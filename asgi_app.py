@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Async BlinkySign API
+The app.py routes as an ASGI application served from an event loop (uvicorn)
+"""
+import os
+import asyncio
+import logging
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from led_client import LEDClient, LEDDaemonUnavailable, HTTP_STATUS, LED_CLIENT_TIMEOUT
+from effect_runner import QUEUED, RUNNING
+from state_stream import StateBroadcaster, StateEvent, STATUS_MAX_WAIT
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# State changes and read-only queries use separate daemon connections and
+# threads, so a flood of status polls never queues in front of a toggle
+command_client = LEDClient()
+query_client = LEDClient()
+command_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="led-command")
+query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="led-query")
+
+# State changes pushed to every open control panel
+state_broadcaster = StateBroadcaster()
+
+# Concurrent status requests share one daemon round trip
+_status_fetch = None
+_status_generation = 0
+_commands_completed = 0
+
+async def run_command(func, *args, **kwargs):
+    """Run a state-changing LED daemon call on the command executor"""
+    global _commands_completed
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(command_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        _commands_completed += 1
+
+async def run_query(func, *args):
+    """Run a read-only LED daemon call on the query executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(query_executor, functools.partial(func, *args))
+
+async def fetch_status():
+    """Current state, joining a status fetch already in flight
+
+    A fetch is only shared if no command finished since it started, so a
+    client always sees the result of its own earlier toggle.
+    """
+    global _status_fetch, _status_generation
+    if _status_fetch is None or _status_generation != _commands_completed:
+        _status_generation = _commands_completed
+        fetch = asyncio.ensure_future(run_query(query_client.status))
+        _status_fetch = fetch
+
+        def forget(done):
+            global _status_fetch
+            if _status_fetch is done:
+                _status_fetch = None
+        fetch.add_done_callback(forget)
+    return await asyncio.shield(_status_fetch)
+
+def daemon_response(response, success_status=200, headers=None):
+    """Turn an LED daemon response into a JSON response"""
+    if response.get("status") == "error":
+        code = response.pop("code", None)
+        return JSONResponse(response, status_code=HTTP_STATUS.get(code, 500))
+    return JSONResponse(response, status_code=success_status, headers=headers)
+
+async def json_body(request):
+    """Parsed JSON body, or None when it is missing or malformed"""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def daemon_unavailable(request, e):
+    """The LED daemon is not running or not responding"""
+    logger.error(f"LED daemon unavailable: {e}")
+    return JSONResponse({
+        "status": "error",
+        "message": "LED daemon unavailable"
+    }, status_code=503)
+
+async def submit_effect(name, params=None):
+    """Queue an effect on the LED daemon and build the 202 Accepted response"""
+    response = await run_command(command_client.effect, name, params)
+    if response.get("status") == "error":
+        return daemon_response(response)
+    return daemon_response(response, 202, headers={"Location": f"/effects/{response['effect']['id']}"})
+
+async def get_status(request):
+    """Get the current mute status (ETag, 304 and ``?wait=`` as in app.py)"""
+    if_none_match = request.headers.get("if-none-match")
+    version = request.query_params.get("version")
+    try:
+        wait = float(request.query_params.get("wait", 0))
+    except ValueError:
+        wait = 0
+
+    event = state_broadcaster.current()
+    if event is None:
+        event = StateEvent.from_status(await fetch_status())
+    elif wait and event.matches(if_none_match, version):
+        events = await state_broadcaster.wait_async(event.seq, min(wait, STATUS_MAX_WAIT))
+        event = events[-1] if events else event
+
+    headers = {"ETag": event.etag, "X-State-Version": str(event.version), "Cache-Control": "no-cache"}
+    if event.matches(if_none_match, version):
+        return Response(status_code=304, headers=headers)
+    return Response(event.body, media_type="application/json", headers=headers)
+
+async def toggle_mute(request):
+    """Toggle the mute status"""
+    return daemon_response(await run_command(command_client.toggle))
+
+async def set_status(request):
+    """Set the mute status explicitly"""
+    data = await json_body(request)
+    if isinstance(data, dict) and "muted" in data:
+        return daemon_response(await run_command(command_client.set_muted, data["muted"]))
+    return JSONResponse({
+        "status": "error",
+        "message": "Invalid request. Expected JSON with 'muted' field."
+    }, status_code=400)
+
+async def health_check(request):
+    """Health check endpoint"""
+    return JSONResponse({"status": "healthy"})
+
+async def get_metrics(request):
+    """Performance metrics for the LED pipeline"""
+    response = await run_query(query_client.metrics)
+    metrics = response["metrics"]
+    metrics["stream"] = state_broadcaster.stats()
+    return JSONResponse(metrics)
+
+async def state_events(request):
+    """Stream state changes to the client as Server-Sent Events"""
+    state_broadcaster.follow(query_client.subscribe)
+    return StreamingResponse(
+        state_broadcaster.sse_stream_async(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def start_effect(request):
+    """Trigger an effect (optional JSON body with its parameters, such as ``color``)"""
+    data = await json_body(request)
+    return await submit_effect(request.path_params["name"], data if isinstance(data, dict) else None)
+
+async def effect_types(request):
+    """List the effects that can be triggered and their parameters"""
+    response = await run_query(query_client.effect_types)
+    return JSONResponse({"effects": response["effects"]})
+
+async def list_effects(request):
+    """List recently submitted effects"""
+    response = await run_query(query_client.effects)
+    return JSONResponse({"effects": response["effects"]})
+
+async def get_effect(request):
+    """Poll the status of a submitted effect"""
+    return daemon_response(await run_query(query_client.effect_status, request.path_params["effect_id"]))
+
+async def cancel_effect(request):
+    """Cancel a queued or running effect"""
+    return daemon_response(await run_command(command_client.cancel_effect, request.path_params["effect_id"]))
+
+def wait_for_effect(effect_id, wait):
+    """Block until an effect finishes, on a connection of its own"""
+    waiter = LEDClient(timeout=wait + LED_CLIENT_TIMEOUT)
+    try:
+        return waiter.effect_status(effect_id, wait=wait)["effect"]
+    finally:
+        waiter.close()
+
+async def run_batch(request):
+    """Run an ordered list of operations as one timeline (``?wait=`` as in app.py)"""
+    data = await json_body(request)
+    steps = data.get("steps") if isinstance(data, dict) else data
+    response = await run_command(command_client.batch, steps)
+    if response.get("status") == "error":
+        return daemon_response(response)
+
+    job = response["effect"]
+    try:
+        wait = min(float(request.query_params.get("wait", 0)), STATUS_MAX_WAIT)
+    except ValueError:
+        wait = 0
+    if wait > 0:
+        # Not on the command or query executor: the wait may take a while
+        loop = asyncio.get_running_loop()
+        job = await loop.run_in_executor(None, wait_for_effect, job["id"], wait)
+
+    finished = job["status"] not in (QUEUED, RUNNING)
+    if finished:
+        response = {"status": "success", "message": f"Batch {job['status']}", "effect": job}
+    return JSONResponse(response, status_code=200 if finished else 202,
+                        headers={"Location": f"/effects/{job['id']}"})
+
+async def turn_off(request):
+    """Turn off all LEDs"""
+    return daemon_response(await run_command(command_client.off))
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    state_broadcaster.follow(query_client.subscribe)
+    yield
+    command_executor.shutdown(wait=False)
+    query_executor.shutdown(wait=False)
+    command_client.close()
+    query_client.close()
+
+routes = [
+    Route('/status', get_status, methods=["GET"]),
+    Route('/toggle', toggle_mute, methods=["PUT"]),
+    Route('/set', set_status, methods=["PUT"]),
+    Route('/health', health_check, methods=["GET"]),
+    Route('/metrics', get_metrics, methods=["GET"]),
+    Route('/events', state_events, methods=["GET"]),
+    Route('/effects', list_effects, methods=["GET"]),
+    Route('/effects/types', effect_types, methods=["GET"]),
+    Route('/effects/{name}', start_effect, methods=["PUT"]),
+    Route('/effects/{effect_id}', get_effect, methods=["GET"]),
+    Route('/effects/{effect_id}', cancel_effect, methods=["DELETE"]),
+    Route('/batch', run_batch, methods=["POST"]),
+    Route('/off', turn_off, methods=["PUT"])
+]
+
+# Same CORS policy as app.py
+middleware = [
+    Middleware(CORSMiddleware, allow_origins=["*"],
+               allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+               allow_headers=["Content-Type", "Authorization", "X-Api-Key", "If-None-Match"],
+               expose_headers=["ETag", "X-State-Version"])
+]
+
+app = Starlette(routes=routes, middleware=middleware,
+                exception_handlers={LEDDaemonUnavailable: daemon_unavailable},
+                lifespan=lifespan)
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.getenv('PORT', 5000))
+    uvicorn.run(app, host='0.0.0.0', port=port, log_level="warning")
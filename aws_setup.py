@@ -63,7 +63,10 @@ def create_iot_thing():
                     "Resource": [
                         f"arn:aws:iot:{AWS_REGION}:*:client/{THING_NAME}",
                         f"arn:aws:iot:{AWS_REGION}:*:topic/{THING_NAME}/*",
-                        f"arn:aws:iot:{AWS_REGION}:*:topicfilter/{THING_NAME}/*"
+                        f"arn:aws:iot:{AWS_REGION}:*:topicfilter/{THING_NAME}/*",
+                        # Device Shadow topics (IOT_SYNC_MODE=shadow)
+                        f"arn:aws:iot:{AWS_REGION}:*:topic/$aws/things/{THING_NAME}/shadow/*",
+                        f"arn:aws:iot:{AWS_REGION}:*:topicfilter/$aws/things/{THING_NAME}/shadow/*"
                     ]
                 }
             ]
@@ -0,0 +1,4 @@
+"""
+Hardware-free benchmarks for BlinkySign
+Run from the repository root, e.g. ``python -m benchmarks.run_all``
+"""
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+API request latency benchmark
+Drives the Flask app in-process (no HTTP server) through a local LED daemon
+on simulated strips and reports per-endpoint latency percentiles
+"""
+import time
+import argparse
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+
+DEFAULT_ITERATIONS = 200
+SHOW_REPEATS = 3  # Each scripted show takes a couple of seconds
+
+# A scripted show: one request per step, or one /batch request
+SHOW = [
+    {"op": "set", "muted": True},
+    {"op": "effect", "effect": "theater", "color": "white", "iterations": 2},
+    {"op": "toggle"},
+    {"op": "effect", "effect": "pulse", "color": "red", "cycles": 1},
+    {"op": "set", "muted": False}
+]
+
+def run(iterations=DEFAULT_ITERATIONS):
+    """Measure handler latency for the main endpoints"""
+    import app
+    common.start_daemon()
+
+    client = app.app.test_client()
+    client.put('/set', json={"muted": False})
+
+    def submit_and_cancel():
+        response = client.put('/effects/pulse', json={"color": "red", "cycles": 1})
+        client.delete(f"/effects/{response.get_json()['effect']['id']}")
+
+    cases = {
+        "GET /status": lambda: client.get('/status'),
+        "GET /health": lambda: client.get('/health'),
+        "PUT /toggle": lambda: client.put('/toggle'),
+        "PUT /set": lambda: client.put('/set', json={"muted": True}),
+        "PUT /effects/pulse + DELETE": submit_and_cancel,
+        "GET /metrics": lambda: client.get('/metrics')
+    }
+    results = {name: common.summarize(common.timed(call, iterations)) for name, call in cases.items()}
+
+    def wait_for(response):
+        location = response.headers["Location"]
+        while client.get(location).get_json()["effect"]["status"] in ("queued", "running"):
+            time.sleep(0.005)
+
+    def show_step_by_step():
+        for step in SHOW:
+            if step["op"] == "effect":
+                params = {key: value for key, value in step.items() if key not in ("op", "effect")}
+                wait_for(client.put(f"/effects/{step['effect']}", json=params))
+            elif step["op"] == "toggle":
+                client.put('/toggle')
+            else:
+                client.put('/set', json={"muted": step["muted"]})
+
+    shows = {
+        "show: one request per step": show_step_by_step,
+        "show: POST /batch?wait": lambda: client.post('/batch?wait=30', json={"steps": SHOW})
+    }
+    results.update({name: common.summarize(common.timed(call, SHOW_REPEATS)) for name, call in shows.items()})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API request latency")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({"environment": common.environment(), "api": run(args.iterations)}, args.output)
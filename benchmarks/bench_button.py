@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Button press-to-photon benchmark
+Presses a virtual button against a local LED daemon on simulated strips and
+times each press from its timestamp (as physical_button.py takes it on the
+GPIO edge) to the end of the first frame on the strip showing the new state.
+Compares the local fast path (the daemon's socket) with a PUT /toggle to the
+Flask server on a fresh HTTP connection
+"""
+import time
+import socket
+import argparse
+import threading
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+
+DEFAULT_PRESSES = 100
+PRESS_GAP = 0.1  # Seconds between presses (longer than the draw coalescing interval)
+TARGET_MS = 10.0
+
+def photon_time(strip, pressed_at, timeout=5.0):
+    """When the first frame shown after ``pressed_at`` finished clocking out of the strip"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for shown_at, frame in list(strip.frames):
+            if shown_at >= pressed_at:
+                finished = shown_at + strip.wire_time(len(frame))
+                while time.monotonic() < finished:
+                    time.sleep(0.0002)
+                return finished
+        time.sleep(0.0002)
+    return None
+
+def press_loop(strip, press, presses):
+    """Press ``presses`` times; returns press-to-photon and press-to-response samples"""
+    photon, response = [], []
+    for _ in range(presses):
+        time.sleep(PRESS_GAP)
+        pressed_at = time.monotonic()
+        press(pressed_at)
+        responded_at = time.monotonic()
+        finished = photon_time(strip, pressed_at)
+        if finished is not None:
+            photon.append(finished - pressed_at)
+        response.append(responded_at - pressed_at)
+    return {
+        "press_to_photon": common.summarize(photon),
+        "press_to_response": common.summarize(response),
+        "missed_frames": presses - len(photon),
+        "under_target": sum(1 for sample in photon if sample * 1000 < TARGET_MS)
+    }
+
+def serve_flask():
+    """Run app.py on a free local port from a background thread; returns its URL"""
+    import app
+    from werkzeug.serving import make_server
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = make_server("127.0.0.1", port, app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="bench-flask")
+    thread.daemon = True
+    thread.start()
+    return f"http://127.0.0.1:{port}"
+
+def run(presses=DEFAULT_PRESSES):
+    """Press-to-photon latency for the local and the HTTP path"""
+    from led_client import LEDClient
+    daemon = common.start_daemon()
+    led = LEDClient()
+    led.set_muted(False)
+    daemon.controller.open()
+    strip = daemon.controller.strips[0]
+
+    results = {"target_ms": TARGET_MS, "led_count": len(strip)}
+    results["local"] = press_loop(strip, lambda pressed_at: led.toggle(pressed_at=pressed_at), presses)
+    results["local"]["daemon_reported"] = daemon.press_stats()
+
+    try:
+        import requests
+        url = serve_flask()
+        # The old physical_button.py path: a new connection per press
+        results["http"] = press_loop(strip, lambda pressed_at: requests.put(f"{url}/toggle", timeout=5), presses)
+    except ImportError as e:
+        results["http"] = {"skipped": f"missing dependency: {e}"}
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark button press-to-photon latency")
+    parser.add_argument("--presses", type=int, default=DEFAULT_PRESSES)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({"environment": common.environment(), "button": run(args.presses)}, args.output)
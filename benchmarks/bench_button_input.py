@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Button edge pipeline benchmark
+Replays edge traces (synthetic presses with contact bounce, or traces
+recorded with `python button_input.py --record`) through the gesture state
+machine and checks the gestures it recognizes. Compares the presses caught
+with the old 300 ms falling-edge debounce, and replays the traces in real
+time on a simulated pin to time detection through the whole pipeline
+"""
+import time
+import random
+import argparse
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+from button_input import ButtonGestures, ButtonInput, ReplayPin, load_trace
+
+LEGACY_DEBOUNCE = 0.3  # The old bouncetime=300 and DEBOUNCE_TIME = 0.3
+MAX_BOUNCE = 0.004  # Seconds of contact bounce after each press and release
+
+def bounce(t, level, rng):
+    """Edges for one contact change at ``t``, with up to 8 bounces before settling on ``level``"""
+    count = rng.randrange(0, 5) * 2
+    times = sorted(t + rng.uniform(0, MAX_BOUNCE) for _ in range(count))
+    edges = [(t, level)]
+    for i, bounce_t in enumerate(times):
+        edges.append((bounce_t, 1 - level if i % 2 == 0 else level))
+    return edges
+
+def presses(rng, *holds_and_gaps, start=0.1):
+    """Edges for presses held for ``holds_and_gaps[0]``, released for ``[1]``, held for ``[2]``..."""
+    edges, t, level = [], start, 0
+    for duration in holds_and_gaps:
+        edges += bounce(t, level, rng)
+        t += duration
+        level = 1 - level
+    edges += bounce(t, level, rng)
+    return edges, t
+
+def scenarios(rng):
+    """(name, edges, expected gestures, presses) for each synthetic trace"""
+    cases = []
+
+    def add(name, expected, press_count, *holds_and_gaps, repeat=1, every=1.0):
+        edges = []
+        for i in range(repeat):
+            edges += presses(rng, *holds_and_gaps, start=0.1 + i * every)[0]
+        cases.append((name, edges, expected * repeat, press_count * repeat))
+
+    add("single", ["single"], 1, 0.08)
+    add("double", ["double"], 2, 0.08, 0.12, 0.08)
+    add("long", ["long"], 1, 1.2)
+    add("singles_500ms", ["single"], 1, 0.08, repeat=6, every=0.5)
+    add("doubles_fast", ["double"], 2, 0.06, 0.08, 0.06, repeat=3)
+    add("mixed", ["single", "double", "long"], 4, 0.08, 0.6, 0.08, 0.12, 0.08, 0.6, 1.2)
+    return cases
+
+def recognize(edges, idle_level=1):
+    """Gestures for a trace in virtual time: [(kind, pressed_at, detected_at)]"""
+    gestures = ButtonGestures(idle_level=idle_level)
+    found = []
+    for t, level in edges:
+        while gestures.deadline() is not None and gestures.deadline() <= t:
+            deadline = gestures.deadline()
+            found += [(kind, pressed_at, deadline) for kind, pressed_at in gestures.poll(deadline)]
+        found += [(kind, pressed_at, t) for kind, pressed_at in gestures.edge(level, t)]
+    while gestures.deadline() is not None:
+        deadline = gestures.deadline()
+        found += [(kind, pressed_at, deadline) for kind, pressed_at in gestures.poll(deadline)]
+    return found, gestures
+
+def legacy_presses(edges, idle_level=1):
+    """Presses the old falling-edge callback acted on"""
+    last, count = None, 0
+    for t, level in edges:
+        if level != idle_level and (last is None or t - last >= LEGACY_DEBOUNCE):
+            last = t
+            count += 1
+    return count
+
+def replay(edges, idle_level=1):
+    """Replay in real time through ButtonInput; returns [(kind, pressed_at, seen_at)] on the monotonic clock"""
+    seen = []
+    pin = ReplayPin(edges, idle_level)
+    button = ButtonInput(pin, lambda kind, pressed_at: seen.append((kind, pressed_at, time.monotonic())))
+    started = time.monotonic()
+    button.start()
+    pin.done.wait()
+    gestures = button.gestures
+    time.sleep(max(gestures.debounce, gestures.double_press, gestures.long_press) + 0.1)
+    button.stop()
+    return [(kind, pressed_at - started, seen_at - started) for kind, pressed_at, seen_at in seen]
+
+def run(traces=(), realtime=True, seed=1):
+    rng = random.Random(seed)
+    results = {"cases": {}}
+    for name, edges, expected, press_count in scenarios(rng):
+        found, gestures = recognize(edges)
+        kinds = [kind for kind, _, _ in found]
+        results["cases"][name] = {
+            "edges": gestures.edges,
+            "bounces": gestures.bounces,
+            "expected": expected,
+            "detected": kinds,
+            "correct": kinds == expected,
+            "detection_ms": common.summarize([detected - pressed for _, pressed, detected in found]),
+            "presses": press_count,
+            "legacy_presses_seen": legacy_presses(edges)
+        }
+        if realtime:
+            # Lag behind the ideal detection time, from queueing and thread wake-ups
+            seen = replay(edges)
+            results["cases"][name]["realtime_correct"] = [kind for kind, _, _ in seen] == expected
+            results["cases"][name]["realtime_lag_ms"] = common.summarize(
+                [max(0.0, s[2] - f[2]) for s, f in zip(seen, found)]) if seen else None
+    results["all_correct"] = all(case["correct"] for case in results["cases"].values())
+
+    for path in traces:
+        pin = load_trace(path)
+        found, gestures = recognize(pin.edges, pin.idle_level)
+        results.setdefault("traces", {})[path] = {
+            "edges": gestures.edges,
+            "bounces": gestures.bounces,
+            "detected": [(kind, round(pressed, 3)) for kind, pressed, _ in found],
+            "legacy_presses_seen": legacy_presses(pin.edges, pin.idle_level)
+        }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay button edge traces through the gesture pipeline")
+    parser.add_argument("--trace", nargs="*", default=[], help="recorded traces to replay as well")
+    parser.add_argument("--no-realtime", action="store_true", help="skip the real-time replays")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({
+        "environment": common.environment(),
+        "button_input": run(args.trace, not args.no_realtime)
+    }, args.output)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Button panel benchmark
+Replays presses on every button of buttons.example.json through one
+ButtonPanel, with an action that stands in for a slow network call.
+Checks every press is recognized on the right pin and reports the loop lag
+(how late edges and timers are handled), the dispatch latency and the
+actions dropped when the queue is full. A burst case presses every button
+at once, repeatedly, against a small queue. The loop lag includes the
+wake-up jitter of the replay threads that stand in for lgpio
+"""
+import os
+import time
+import random
+import argparse
+import threading
+from benchmarks import common
+from benchmarks.bench_button_input import presses
+from button_input import ReplayPin
+from button_panel import ButtonPanel, load_buttons
+
+DEFAULT_PRESSES = 10  # Per button
+DEFAULT_ACTION_MS = 50.0
+PRESS_GAP = 0.4  # Shortest time between presses of one button
+CONFIG = os.path.join(common.REPO_ROOT, "buttons.example.json")
+
+def traces(buttons, count, rng, together=False):
+    """Edges for ``count`` presses of each button, at random times (or all at once)"""
+    result = {}
+    for button in buttons:
+        edges, t = [], 0.1
+        for _ in range(count):
+            start = t if together else t + rng.uniform(0, PRESS_GAP)
+            press_edges, end = presses(rng, rng.uniform(0.05, 0.12), start=start)
+            edges += press_edges
+            t = max(end, start) + PRESS_GAP
+        result[button.pin] = edges
+    return result
+
+def run_panel(buttons, edges, action_ms, queue_size, workers=1):
+    """Replay ``edges`` per pin through a ButtonPanel; returns its stats and the panel's thread count"""
+    pins = {pin: ReplayPin(pin_edges, pin=pin) for pin, pin_edges in edges.items()}
+    done = []
+
+    def perform(action, pressed_at):
+        time.sleep(action_ms / 1000)
+        done.append(action)
+        return True
+
+    panel = ButtonPanel(buttons, perform, pin_factory=pins.get, queue_size=queue_size, workers=workers)
+    panel.start()
+    threads = 0
+    for pin in pins.values():
+        pin.done.wait()
+        threads = max(threads, sum(1 for t in threading.enumerate() if t.name.startswith("button-")))
+    # Let the last releases settle and the queue drain
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and not drained(panel.stats()):
+        time.sleep(0.05)
+    panel.stop()
+    return panel.stats(), threads
+
+def drained(stats):
+    """Every recognized gesture has been dispatched or dropped"""
+    pins = stats["pins"].values()
+    recognized = sum(sum(p["gestures"].values()) for p in pins)
+    return recognized and sum(p["dispatched"] + p["dropped"] for p in pins) >= recognized
+
+def summarize_case(buttons, stats, threads, expected):
+    pins = stats["pins"]
+    # Latency figures are for the worst pin
+    worst = lambda key, field: max((p[key][field] for p in pins.values() if p[key]), default=None)
+    return {
+        "buttons": len(buttons),
+        "panel_threads": threads,
+        "presses": expected * len(buttons),
+        "recognized": sum(p["gestures"]["single"] for p in pins.values()),
+        "every_pin_correct": all(p["gestures"]["single"] == expected for p in pins.values()),
+        "dispatched": sum(p["dispatched"] for p in pins.values()),
+        "dropped": sum(p["dropped"] for p in pins.values()),
+        "lag_p99_ms": worst("lag_ms", "p99_ms"),
+        "lag_max_ms": worst("lag_ms", "max_ms"),
+        "dispatch_p50_ms": worst("dispatch_ms", "p50_ms"),
+        "dispatch_max_ms": worst("dispatch_ms", "max_ms"),
+        "pins": pins
+    }
+
+def run(count=DEFAULT_PRESSES, action_ms=DEFAULT_ACTION_MS, seed=1):
+    rng = random.Random(seed)
+    buttons = load_buttons(CONFIG)
+    results = {"action_ms": action_ms}
+
+    # Random presses on every button: the queue absorbs the slow actions
+    stats, threads = run_panel(buttons, traces(buttons, count, rng), action_ms, queue_size=16)
+    results["random"] = summarize_case(buttons, stats, threads, count)
+
+    # Every button at once, three times, with a queue too small for the burst
+    stats, threads = run_panel(buttons, traces(buttons, 3, rng, together=True), action_ms * 4, queue_size=4)
+    results["burst"] = summarize_case(buttons, stats, threads, 3)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the multi-button panel on replayed presses")
+    parser.add_argument("--presses", type=int, default=DEFAULT_PRESSES, help="presses per button")
+    parser.add_argument("--action-ms", type=float, default=DEFAULT_ACTION_MS, help="time each action takes")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({
+        "environment": common.environment(),
+        "button_panel": run(args.presses, args.action_ms)
+    }, args.output)
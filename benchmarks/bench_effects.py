@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Effect frame-rate benchmark
+Plays every effect on simulated strips of several lengths and reports the
+render loop statistics, plus the raw frame generation rate of the pixel pipeline
+"""
+import time
+import argparse
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+
+from led_controller import LEDController, RED, BLUE, GREEN, WHITE
+from led_backends import SimulatedBackend
+from strip_topology import StripConfig
+import pixel_pipeline
+
+DEFAULT_LED_COUNTS = (30, 150, 300)
+
+# Shortened parameters so a full run stays under a minute
+EFFECTS = {
+    "rainbow": lambda lc: lc.rainbow_cycle(),
+    "pulse": lambda lc: lc.pulse(BLUE, cycles=1),
+    "theater": lambda lc: lc.theater_chase(WHITE, iterations=5),
+    "wipe": lambda lc: lc.color_wipe(GREEN, wait=0.01)
+}
+
+def generation_rate(led_count, frames=200):
+    """Frames per second the pixel pipeline can generate, ignoring SPI"""
+    start = time.perf_counter()
+    for step in range(frames):
+        pixel_pipeline.to_wire(pixel_pipeline.rainbow_frame(step, led_count), (1, 0, 2), 0.5)
+    return round(frames / (time.perf_counter() - start), 1)
+
+def play(controller, name):
+    """Play one effect on a fresh engine state and collect its statistics"""
+    controller.set_all_strips(RED)
+    engine = controller.engine
+    pushed, dropped = engine.frames_pushed, engine.frames_dropped
+    render_time, transfer_time = engine.render_time_total, engine.transfer_time_total
+    strip = controller.strips[0]
+    shows, spi_time = strip.shows, strip.transfer_time
+
+    start = time.perf_counter()
+    EFFECTS[name](controller)
+    duration = time.perf_counter() - start
+
+    frames = engine.frames_pushed - pushed
+    per_frame = 1000 / frames if frames else 0.0
+    return {
+        "duration_s": round(duration, 4),
+        "frames": frames,
+        "fps": round(frames / duration, 2) if duration else 0.0,
+        "frames_dropped": engine.frames_dropped - dropped,
+        "avg_render_ms": round((engine.render_time_total - render_time) * per_frame, 4),
+        "avg_transfer_ms": round((engine.transfer_time_total - transfer_time) * per_frame, 4),
+        "spi_transfers": strip.shows - shows,
+        "modeled_spi_ms": round((strip.transfer_time - spi_time) * 1000, 3)
+    }
+
+def run(led_counts=DEFAULT_LED_COUNTS):
+    """Run the effect benchmark for each strip length"""
+    results = {}
+    for led_count in led_counts:
+        controller = LEDController(topology=[StripConfig("bench", length=led_count)],
+                                   backend=SimulatedBackend())
+        sizes = {"generation_fps": generation_rate(led_count)}
+        for name in EFFECTS:
+            # First run compiles the frames, second replays them from the cache
+            sizes[name] = {
+                "cold": play(controller, name),
+                "warm": play(controller, name)
+            }
+        sizes["frame_cache"] = controller.cache_stats()
+        results[str(led_count)] = sizes
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LED effect frame rates")
+    parser.add_argument("--leds", type=int, nargs="+", default=list(DEFAULT_LED_COUNTS),
+                        help="strip lengths to benchmark")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({"environment": common.environment(), "effects": run(args.leds)}, args.output)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Button HTTP client benchmark
+Round-trip latency per toggle against a local HTTPS stand-in for the API
+Gateway prod stage, behind a proxy that adds network delay. Compares bare
+requests calls (a new TCP and TLS handshake per toggle, as the button
+clients used to send them) with the pooled api_client, over HTTP/1.1 and
+HTTP/2, and the share of toggles that succeed when the stand-in answers
+some requests with 503
+"""
+import os
+import ssl
+import time
+import json
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+from benchmarks.tcp_proxy import TCPProxy
+
+DEFAULT_TOGGLES = 100
+DEFAULT_RTT_MS = 20.0
+DEFAULT_FAIL_RATE = 0.1
+STAGE = "/prod"
+API_KEY = "bench-api-key"
+
+class StandIn:
+    """API Gateway stand-in state shared by the HTTP/1.1 and HTTP/2 servers"""
+
+    def __init__(self):
+        self.muted = False
+        self.fail_rate = 0.0
+        self._lock = threading.Lock()
+        self._random = random.Random(7)
+
+    def handle(self, method, path, api_key):
+        """Returns (status, body)"""
+        if api_key != API_KEY:
+            return 403, {"message": "Forbidden"}
+        with self._lock:
+            if self._random.random() < self.fail_rate:
+                return 503, {"message": "Service Unavailable"}
+            if method == "PUT" and path == f"{STAGE}/toggle":
+                self.muted = not self.muted
+            elif method != "GET" or path != f"{STAGE}/status":
+                return 404, {"message": "Not Found"}
+            return 200, {"status": "success", "message": "Mute toggled", "muted": self.muted}
+
+def make_certificate(directory):
+    """Self-signed certificate for 127.0.0.1; returns (certfile, keyfile)"""
+    certfile, keyfile = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                    "-keyout", keyfile, "-out", certfile],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return certfile, keyfile
+
+def serve_http1(stand_in, certfile, keyfile):
+    """HTTPS/1.1 keep-alive server on a free port; returns the port"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body are separate writes
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            status, body = stand_in.handle(self.command, self.path, self.headers.get("x-api-key"))
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_PUT = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, name="bench-https")
+    thread.daemon = True
+    thread.start()
+    return server.server_address[1]
+
+def serve_http2(stand_in, certfile, keyfile):
+    """HTTPS server offering HTTP/2 (hypercorn); returns the port"""
+    from hypercorn.config import Config
+    from hypercorn.asyncio import serve
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        while (await receive()).get("more_body"):
+            pass
+        headers = dict(scope["headers"])
+        status, body = stand_in.handle(scope["method"], scope["path"], headers.get(b"x-api-key", b"").decode())
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(body).encode('utf-8')})
+
+    port = free_port()
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.certfile, config.keyfile = certfile, keyfile
+    config.alpn_protocols = ["h2", "http/1.1"]
+    config.accesslog = config.errorlog = None
+    never = lambda: asyncio.get_running_loop().create_future()  # No signal handlers outside the main thread
+    thread = threading.Thread(target=lambda: asyncio.run(serve(app, config, shutdown_trigger=never)), name="bench-h2")
+    thread.daemon = True
+    thread.start()
+    wait_for_port(port)
+    return port
+
+def free_port():
+    """A local port nothing is listening on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=10.0):
+    """Wait for a server to accept connections on ``port``"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def toggles(call, count):
+    """Time ``count`` toggles; returns the latency summary and the number that succeeded"""
+    succeeded = 0
+
+    def one():
+        nonlocal succeeded
+        try:
+            if call().status_code == 200:
+                succeeded += 1
+        except Exception:
+            pass
+
+    samples = common.timed(one, count)
+    return dict(common.summarize(samples), succeeded=succeeded)
+
+def run(count=DEFAULT_TOGGLES, rtt_ms=DEFAULT_RTT_MS, fail_rate=DEFAULT_FAIL_RATE):
+    """Per-toggle round trip before and after the pooled client"""
+    import requests
+    from api_client import APIClient
+    stand_in = StandIn()
+    directory = tempfile.mkdtemp(prefix="blinkysign-bench-")
+    try:
+        certfile, keyfile = make_certificate(directory)
+    except (OSError, subprocess.CalledProcessError) as e:
+        return {"skipped": f"could not create a test certificate with openssl: {e}"}
+
+    delay = rtt_ms / 2000
+    proxy = TCPProxy("127.0.0.1", serve_http1(stand_in, certfile, keyfile), delay=delay)
+    endpoint = f"https://127.0.0.1:{proxy.port}{STAGE}"
+    results = {"rtt_ms": rtt_ms, "toggles": count}
+
+    def bare_toggle():
+        return requests.put(f"{endpoint}/toggle", headers={"x-api-key": API_KEY}, verify=certfile, timeout=10)
+
+    def case(call):
+        before = proxy.connections
+        result = toggles(call, count)
+        result["connections"] = proxy.connections - before
+        return result
+
+    pooled = APIClient(endpoint, api_key=API_KEY, verify=certfile, retries=0)
+    results["before"] = case(bare_toggle)
+    results["pooled"] = case(pooled.toggle)
+
+    try:
+        h2_proxy = TCPProxy("127.0.0.1", serve_http2(stand_in, certfile, keyfile), delay=delay)
+        h2 = APIClient(f"https://127.0.0.1:{h2_proxy.port}{STAGE}", api_key=API_KEY, verify=certfile,
+                       retries=0, http2=True)
+        before = h2_proxy.connections
+        results["pooled_http2"] = toggles(h2.toggle, count)
+        results["pooled_http2"]["connections"] = h2_proxy.connections - before
+        h2.close()
+    except ImportError as e:
+        results["pooled_http2"] = {"skipped": f"missing dependency: {e}"}
+    except RuntimeError as e:
+        results["pooled_http2"] = {"skipped": str(e)}
+
+    # Some requests answered 503: bare calls fail, the pooled client retries with backoff
+    stand_in.fail_rate = fail_rate
+    retrying = APIClient(endpoint, api_key=API_KEY, verify=certfile)
+    results["with_503s"] = {
+        "fail_rate": fail_rate,
+        "before": case(bare_toggle),
+        "pooled": dict(case(retrying.toggle), client=retrying.stats())
+    }
+    pooled.close()
+    retrying.close()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pooled button HTTP client against an HTTPS stand-in")
+    parser.add_argument("--toggles", type=int, default=DEFAULT_TOGGLES)
+    parser.add_argument("--rtt-ms", type=float, default=DEFAULT_RTT_MS, help="simulated network round trip")
+    parser.add_argument("--fail-rate", type=float, default=DEFAULT_FAIL_RATE, help="share of requests answered 503")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({
+        "environment": common.environment(),
+        "http_client": run(args.toggles, args.rtt_ms, args.fail_rate)
+    }, args.output)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the BlinkySign API servers
+Starts an LED daemon on simulated strips, then runs mixed /status and /toggle
+traffic from many concurrent clients against the Flask server (app.py) and
+the async server (asgi_app.py) and reports latency percentiles for each
+Usage: python -m benchmarks.bench_load --clients 200 --duration 10
+"""
+import os
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+import subprocess
+from urllib.parse import urlsplit
+from benchmarks import common
+
+SERVERS = {
+    "flask": "app.py",
+    "asgi": "asgi_app.py"
+}
+DEFAULT_CLIENTS = 100
+DEFAULT_DURATION = 10.0
+DEFAULT_TOGGLE_RATIO = 0.05  # Share of requests that are toggles; the rest poll /status
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until(check, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.05)
+    return False
+
+def server_ready(port):
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+def start_process(script, env):
+    return subprocess.Popen([sys.executable, os.path.join(common.REPO_ROOT, script)], env=env,
+                            cwd=common.REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def http_request(host, port, method, path):
+    """One HTTP/1.1 request on a fresh connection; returns the status code"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: 0\r\n"
+                     f"Connection: close\r\n\r\n".encode('ascii'))
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+async def load(url, clients, duration, toggle_ratio):
+    """Run the mixed workload against ``url`` and collect per-operation latencies"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    samples = {"status": [], "toggle": []}
+    errors = {"status": 0, "toggle": 0}
+    deadline = time.perf_counter() + duration
+
+    async def client(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            operation = "toggle" if rng.random() < toggle_ratio else "status"
+            method, path = ("PUT", "/toggle") if operation == "toggle" else ("GET", "/status")
+            start = time.perf_counter()
+            try:
+                code = await http_request(host, port, method, path)
+            except OSError:
+                code = None
+            if code == 200:
+                samples[operation].append(time.perf_counter() - start)
+            else:
+                errors[operation] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(seed) for seed in range(clients)))
+    elapsed = time.perf_counter() - started
+    completed = sum(len(values) for values in samples.values())
+    return {
+        "status": common.summarize(samples["status"]),
+        "toggle": common.summarize(samples["toggle"]),
+        "errors": errors,
+        "requests_per_s": round(completed / elapsed, 1)
+    }
+
+def run(servers=tuple(SERVERS), clients=DEFAULT_CLIENTS, duration=DEFAULT_DURATION,
+        toggle_ratio=DEFAULT_TOGGLE_RATIO, url=None):
+    """Load test each server in turn (or an already running server at ``url``)"""
+    if url:
+        return {"external": asyncio.run(load(url, clients, duration, toggle_ratio))}
+
+    env = dict(os.environ, LED_BACKEND="simulated", PYTHONUNBUFFERED="1")
+    daemon = start_process("led_daemon.py", env)
+    results = {}
+    try:
+        if not wait_until(lambda: os.path.exists(env["LED_SOCKET"])):
+            raise RuntimeError("LED daemon did not start")
+        for name in servers:
+            port = free_port()
+            server = start_process(SERVERS[name], dict(env, PORT=str(port)))
+            try:
+                if not wait_until(lambda: server_ready(port)):
+                    results[name] = {"skipped": f"{SERVERS[name]} did not start (missing dependency?)"}
+                    continue
+                results[name] = asyncio.run(load(f"http://127.0.0.1:{port}", clients, duration, toggle_ratio))
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        daemon.terminate()
+        daemon.wait()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the BlinkySign API servers")
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=list(SERVERS))
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds per server")
+    parser.add_argument("--toggle-ratio", type=float, default=DEFAULT_TOGGLE_RATIO)
+    parser.add_argument("--url", help="load test a server that is already running instead")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    results = run(args.servers, args.clients, args.duration, args.toggle_ratio, args.url)
+    common.write_results({"environment": common.environment(), "load": results}, args.output)
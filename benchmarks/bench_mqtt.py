@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+MQTT callback latency benchmark
+Feeds synthetic messages straight into the iot_client callbacks (no broker)
+through a local LED daemon on simulated strips and reports per-callback
+latency percentiles: time for the callback to return, and end to end until
+the dispatcher has run the message. Checks that bursts of mute messages and
+of toggles larger than the queue still leave the sign in the right state
+"""
+import json
+import time
+import argparse
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+
+DEFAULT_ITERATIONS = 200
+BURST = 51  # Toggles sent back to back in the burst case (odd, so the state changes)
+
+class RecordingClient:
+    """Stands in for the MQTT client and counts publishes"""
+
+    def __init__(self):
+        self.published = 0
+
+    def publish(self, topic, payload, qos):
+        self.published += 1
+        return True
+
+class Message:
+    """Minimal stand-in for an MQTT message"""
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = json.dumps(payload).encode('utf-8')
+
+def run(iterations=DEFAULT_ITERATIONS):
+    """Measure callback latency for status, toggle and effect messages"""
+    import iot_client
+    daemon = common.start_daemon()
+
+    recorder = RecordingClient()
+    iot_client.mqtt_client = recorder
+    thing = iot_client.THING_NAME
+
+    status_messages = [Message(f"{thing}/status", {"muted": bool(i % 2)}) for i in range(2)]
+    counter = {"i": 0}
+
+    def status():
+        counter["i"] += 1
+        iot_client.status_callback(None, None, status_messages[counter["i"] % 2])
+
+    toggle_message = Message(f"{thing}/toggle", {})
+    off_message = Message(f"{thing}/effect", {"effect": "off"})
+
+    cases = {
+        "status": status,
+        "toggle": lambda: iot_client.toggle_callback(None, None, toggle_message),
+        "effect_off": lambda: iot_client.effect_callback(None, None, off_message)
+    }
+    results = {}
+    for name, callback in cases.items():
+        results[name] = common.summarize(common.timed(callback, iterations))
+        results[f"{name}_end_to_end"] = common.summarize(common.timed(
+            lambda: (callback(), iot_client.dispatcher.join()), iterations))
+
+    # A backlog of effects followed by a toggle: the toggle must not wait behind them
+    effect_message = Message(f"{thing}/effect", {"effect": "pulse", "cycles": 1})
+
+    def backlog():
+        for _ in range(20):
+            iot_client.effect_callback(None, None, effect_message)
+        iot_client.toggle_callback(None, None, toggle_message)
+        iot_client.dispatcher.join()
+
+    results["effect_backlog_then_toggle"] = common.summarize(common.timed(backlog, 10))
+
+    # A burst of toggles publishes the state at most once per interval
+    interval = iot_client.state_publisher.stats()["interval_ms"] / 1000
+    time.sleep(interval)
+    before = recorder.published
+    for _ in range(BURST):
+        iot_client.toggle_callback(None, None, toggle_message)
+    iot_client.dispatcher.join()
+    time.sleep(interval * 1.5)
+    results["toggle_burst"] = {"messages": BURST, "publishes": recorder.published - before}
+
+    # More mute messages than the queue holds, the last one unmuting: the sign must end unmuted
+    burst = iot_client.dispatcher.max_pending * 2
+    dropped = iot_client.dispatcher.stats()["dropped"]
+    for _ in range(burst):
+        iot_client.status_callback(None, None, status_messages[1])
+    iot_client.status_callback(None, None, status_messages[0])
+    iot_client.dispatcher.join()
+    results["status_overflow"] = {
+        "messages": burst + 1,
+        "dropped": iot_client.dispatcher.stats()["dropped"] - dropped,
+        "final_muted": daemon.state["muted"],
+        "correct": daemon.state["muted"] is False
+    }
+
+    # An odd number of toggles, more than the queue holds: the mute state must flip once
+    muted = daemon.state["muted"]
+    dropped = iot_client.dispatcher.stats()["dropped"]
+    for _ in range(burst + 1):
+        iot_client.toggle_callback(None, None, toggle_message)
+    iot_client.dispatcher.join()
+    results["toggle_overflow"] = {
+        "messages": burst + 1,
+        "dropped": iot_client.dispatcher.stats()["dropped"] - dropped,
+        "correct": daemon.state["muted"] is not muted
+    }
+
+    results["dispatch"] = iot_client.dispatcher.stats()
+    results["state_publisher"] = iot_client.state_publisher.stats()
+    results["publishes"] = recorder.published
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MQTT callback latency")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({"environment": common.environment(), "mqtt": run(args.iterations)}, args.output)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Button outbox benchmark
+Presses button_client.py's toggle against the Flask server through a proxy
+that is cut to simulate an outage. Counts the presses kept while offline
+and the entries they collapse into, checks they survive a restart of the
+outbox, then times the drain on reconnect and checks the sign ends in the
+state the presses asked for on top of a change another front end made
+during the outage. Compares the same outage without the outbox, and times
+the durable append
+"""
+import os
+import time
+import argparse
+import tempfile
+from urllib.parse import urlparse
+from benchmarks import common
+from benchmarks.bench_button import serve_flask
+from benchmarks.tcp_proxy import TCPProxy
+
+os.environ["BUTTON_OUTBOX"] = ""  # The benchmark makes its own outboxes
+
+DEFAULT_PRESSES = 21
+RETRY = 0.2  # Seconds between delivery attempts (BUTTON_OUTBOX_RETRY)
+
+def wait_for(condition, timeout=10.0):
+    """Seconds until ``condition()`` holds, or None"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if condition():
+            return time.monotonic() - started
+        time.sleep(0.01)
+    return None
+
+def outage(button_client, proxy, led, presses, box):
+    """Toggle ``presses`` times while the API is unreachable, then restore it"""
+    led.set_muted(False)
+    button_client.outbox = box
+    if box:
+        box.start(button_client.send_action)
+    proxy.cut(refuse=True)
+    samples = common.timed(button_client.send_toggle_request, presses)
+    result = {"presses": presses, "press_ms": common.summarize(samples)}
+    if box:
+        result["kept_entries"] = [entry["action"] for entry in box.entries()]
+        # Restart: the entries are read back from disk by a new outbox
+        box.close()
+        box = type(box)(box.path, retry=RETRY)
+        button_client.outbox = box
+        result["entries_after_restart"] = box.pending()
+        box.start(button_client.send_action)
+    led.set_muted(True)  # Meanwhile another front end (the web UI, MQTT) mutes the sign
+    proxy.restore()
+    expected = presses % 2 == 0  # Each kept toggle applies to the state the sign is in by then
+    result["drain_s"] = wait_for(lambda: (box is None or not box.pending()) and led.status()["state"]["muted"] == expected,
+                                 timeout=3.0 if box is None else 10.0)
+    result["sent_on_reconnect"] = box.delivered if box else 0
+    result["final_muted"] = led.status()["state"]["muted"]
+    result["expected_muted"] = expected
+    result["correct"] = result["final_muted"] == expected
+    if box:
+        box.close()
+    return result
+
+def run(presses=DEFAULT_PRESSES):
+    import button_client
+    from api_client import APIClient
+    from led_client import LEDClient
+    from outbox import Outbox
+    common.start_daemon()
+    led = LEDClient()
+    url = urlparse(serve_flask())
+    proxy = TCPProxy(url.hostname, url.port)
+    button_client.api_client = APIClient(f"http://127.0.0.1:{proxy.port}", retries=0, timeout=1.0)
+    directory = tempfile.mkdtemp(prefix="blinkysign-bench-")
+
+    results = {
+        "outbox": outage(button_client, proxy, led, presses, Outbox(os.path.join(directory, "outbox.db"), retry=RETRY)),
+        "without_outbox": outage(button_client, proxy, led, presses, None)
+    }
+
+    # Durable append: each add is committed (and synced) before it returns
+    box = Outbox(os.path.join(directory, "append.db"))
+    samples = common.timed(lambda: box.add("toggle"), 200)
+    results["append"] = dict(common.summarize(samples), entries_after=box.pending())
+    box.close()
+
+    # Bounded: distinct actions beyond max_entries drop the oldest
+    box = Outbox(os.path.join(directory, "bounded.db"), max_entries=3)
+    for action in ("effect:rainbow", "effect:pulse", "effect:theater", "effect:wipe", "off"):
+        box.add(action)
+    results["bounded"] = {"max_entries": 3, "kept": [entry["action"] for entry in box.entries()],
+                          "dropped": box.dropped}
+    box.close()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the button outbox across a simulated outage")
+    parser.add_argument("--presses", type=int, default=DEFAULT_PRESSES, help="toggles pressed while offline")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({"environment": common.environment(), "outbox": run(args.presses)}, args.output)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Device Shadow sync benchmark
+Runs iot_client's shadow mode (shadow_sync.py) against an in-memory broker
+that emulates the shadow service, through a local LED daemon on simulated
+strips. Measures how fast a restarted sign converges to the desired state,
+and the messages and bytes sent for remote and local changes
+"""
+import json
+import time
+import argparse
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+from benchmarks.local_mqtt import LocalBroker
+
+THING = "blinkysign"
+DEFAULT_CHANGES = 20
+REPORT_INTERVAL = 0.05  # Seconds between reported-state updates (STATE_PUBLISH_INTERVAL in production)
+
+def wait_until(check, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.002)
+    return False
+
+def run(changes=DEFAULT_CHANGES):
+    """Converge on start, then apply remote changes and report local ones"""
+    from led_client import LEDClient
+    from mqtt_dispatcher import MQTTDispatcher
+    from shadow_sync import ShadowSync
+    common.start_daemon()
+
+    led = LEDClient()
+    led.set_muted(False)  # The sign comes up unmuted after a reboot...
+
+    # ...while the shadow says it was muted remotely
+    broker = LocalBroker()
+    broker.shadows[THING] = {
+        "state": {"desired": {"muted": True, "led_on": True}, "reported": {"muted": False, "led_on": True}},
+        "version": 7
+    }
+    device = broker.client("device")
+    sync = ShadowSync(device, THING, led=led, dispatcher=MQTTDispatcher(), interval=REPORT_INTERVAL)
+
+    def muted():
+        return led.status()["state"]["muted"]
+
+    def in_sync():
+        broker.drain()
+        state = broker.shadow(THING)["state"]
+        current = led.status()["state"]
+        return all(state["desired"].get(key) == state["reported"].get(key) == current[key]
+                   for key in ("muted", "led_on"))
+
+    started = time.perf_counter()
+    sync.start()
+    wait_until(muted)
+    results = {"converge_ms": round((time.perf_counter() - started) * 1000, 3), "start": sync.stats()}
+    wait_until(in_sync)
+
+    # Remote changes: one delta each, applied and reported back
+    sent, size = device.published, device.bytes_out
+    samples = []
+    for i in range(changes):
+        target = bool(i % 2)
+        start = time.perf_counter()
+        broker.set_desired(THING, muted=target)
+        wait_until(lambda: muted() == target)
+        samples.append(time.perf_counter() - start)
+        wait_until(in_sync)
+    results["remote_change"] = common.summarize(samples)
+    results["remote_change"]["messages_out"] = device.published - sent
+    results["remote_change"]["bytes_out"] = device.bytes_out - size
+
+    # Local changes (web API, button): reported and written to desired, with no delta sent back
+    sent, size, deltas = device.published, device.bytes_out, broker.deltas
+    for _ in range(changes):
+        led.toggle()
+        time.sleep(REPORT_INTERVAL * 2)
+    wait_until(in_sync)
+    results["local_change"] = {
+        "changes": changes,
+        "messages_out": device.published - sent,
+        "bytes_out": device.bytes_out - size,
+        "deltas_back": broker.deltas - deltas
+    }
+
+    # The same changes as full snapshots on <thing>/state, for comparison
+    snapshot = json.dumps(dict(led.status()["state"], seq=1000, ts=time.time()))
+    results["snapshot_bytes_per_change"] = len(snapshot)
+    results["in_sync"] = in_sync()
+    results["shadow"] = sync.stats()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Device Shadow sync")
+    parser.add_argument("--changes", type=int, default=DEFAULT_CHANGES)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({"environment": common.environment(), "shadow": run(args.changes)}, args.output)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+MQTT transport benchmark
+Runs the asyncio MQTT transport (mqtt_transport.py) against a local broker
+such as mosquitto. Measures QoS 1 throughput per inflight window, the
+bounded offline queue across an outage, and a reconnect storm of many
+clients whose connections are all cut at once. Connections go through a
+local TCP proxy that can cut them and refuse new ones (the "outage")
+"""
+import time
+import socket
+import argparse
+import threading
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+from benchmarks.tcp_proxy import TCPProxy
+
+DEFAULT_BROKER = "localhost:1883"
+DEFAULT_MESSAGES = 2000
+DEFAULT_CLIENTS = 50
+DEFAULT_STORMS = 3
+INFLIGHT_WINDOWS = (1, 10, 100)
+OFFLINE_QUEUE = 50
+TOPIC = "blinkysign-bench"
+
+def wait_until(check, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.005)
+    return False
+
+def client(name, port, host="127.0.0.1", **options):
+    from mqtt_transport import AsyncMQTTClient
+    return AsyncMQTTClient(f"{TOPIC}-{name}-{int(time.time() * 1000)}", host, port, **options)
+
+def throughput(host, port, messages):
+    """QoS 1 publishes per second, pipelined, for each inflight window"""
+    results = {}
+    received = []
+    subscriber = client("sub", port, host)
+    subscriber.subscribe(f"{TOPIC}/throughput/#", 1, lambda c, u, m: received.append(m))
+    subscriber.connect()
+    for window in INFLIGHT_WINDOWS:
+        publisher = client(f"pub{window}", port, host, inflight=window, offline_queue=messages)
+        publisher.connect()
+        received.clear()
+        acked = threading.Semaphore(0)
+        started = time.perf_counter()
+        for i in range(messages):
+            publisher.publishAsync(f"{TOPIC}/throughput/{window}", str(i), 1, lambda mid: acked.release())
+        for _ in range(messages):
+            acked.acquire(timeout=30)
+        elapsed = time.perf_counter() - started
+        wait_until(lambda: len(received) >= messages, 10)
+        results[f"inflight_{window}"] = {
+            "messages": messages,
+            "msgs_per_s": round(messages / elapsed, 1),
+            "received": len(received),
+            "transport": publisher.stats()
+        }
+        publisher.disconnect()
+
+    # Blocking publishes (one at a time, as iot_client's heartbeat sends them)
+    publisher = client("pubsync", port, host)
+    publisher.connect()
+    count = min(messages, 200)
+    samples = common.timed(lambda: publisher.publish(f"{TOPIC}/throughput/sync", "x", 1), count)
+    results["blocking_qos1"] = common.summarize(samples)
+    publisher.disconnect()
+    subscriber.disconnect()
+    return results
+
+def offline_queue(host, port, messages, drop):
+    """Publish through an outage: only the newest (or oldest) OFFLINE_QUEUE messages arrive"""
+    proxy = TCPProxy(host, port)
+    received = []
+    subscriber = client("offline-sub", port, host)
+    subscriber.subscribe(f"{TOPIC}/offline/{drop}", 1, lambda c, u, m: received.append(int(m.payload)))
+    subscriber.connect()
+    publisher = client(f"offline-{drop}", proxy.port, offline_queue=OFFLINE_QUEUE, drop=drop)
+    publisher.connect()
+
+    proxy.cut(refuse=True)
+    wait_until(lambda: not publisher.connected)
+    for i in range(messages):
+        publisher.publish(f"{TOPIC}/offline/{drop}", str(i), 1)
+    proxy.restore()
+    started = time.perf_counter()
+    wait_until(lambda: publisher.connected and len(received) >= OFFLINE_QUEUE, 60)
+    result = {
+        "published_offline": messages,
+        "queue_size": OFFLINE_QUEUE,
+        "drop": drop,
+        "received": len(received),
+        "first": received[0] if received else None,
+        "last": received[-1] if received else None,
+        "drain_ms": round((time.perf_counter() - started) * 1000, 3),
+        "transport": publisher.stats()
+    }
+    publisher.disconnect()
+    subscriber.disconnect()
+    return result
+
+def reconnect_storm(host, port, clients, storms):
+    """Cut every connection at once; time until all clients are back, and count lost messages"""
+    proxy = TCPProxy(host, port)
+    received = {}
+    signs = []
+    for index in range(clients):
+        sign = client(f"storm{index}", proxy.port)
+        received[index] = 0
+
+        def on_message(c, u, m, index=index):
+            received[index] += 1
+        sign.subscribe(f"{TOPIC}/storm/{index}", 1, on_message)
+        sign.connect()
+        signs.append(sign)
+    sender = client("storm-sender", port, host)
+    sender.connect()
+
+    samples = []
+    for _ in range(storms):
+        proxy.cut(refuse=True)
+        wait_until(lambda: not any(sign.connected for sign in signs))
+        # Commands sent while the signs are away wait in their persistent sessions
+        for index in range(clients):
+            sender.publish(f"{TOPIC}/storm/{index}", "toggle", 1)
+        started = time.perf_counter()
+        proxy.restore()
+        wait_until(lambda: all(sign.connected for sign in signs), 120)
+        samples.append(time.perf_counter() - started)
+    wait_until(lambda: sum(received.values()) >= clients * storms, 10)
+    result = {
+        "clients": clients,
+        "storms": storms,
+        "all_reconnected": common.summarize(samples),
+        "reconnects": sum(sign.reconnects for sign in signs),
+        "resumed_sessions": sum(sign.stats()["resumed_sessions"] for sign in signs),
+        "messages_sent_while_offline": clients * storms,
+        "messages_received": sum(received.values())
+    }
+    for sign in signs:
+        sign.disconnect()
+    sender.disconnect()
+    return result
+
+def run(broker=DEFAULT_BROKER, messages=DEFAULT_MESSAGES, clients=DEFAULT_CLIENTS, storms=DEFAULT_STORMS):
+    """Run every transport scenario; skipped when no broker is listening"""
+    import paho.mqtt.client  # noqa: F401 (the asyncio transport needs paho-mqtt)
+    host, _, port = broker.partition(":")
+    port = int(port or 1883)
+    try:
+        socket.create_connection((host, port), timeout=2).close()
+    except OSError as e:
+        return {"skipped": f"no MQTT broker at {broker}: {e}"}
+    if host == "localhost":
+        host = "127.0.0.1"
+    return {
+        "broker": broker,
+        "throughput": throughput(host, port, messages),
+        "offline_queue": {drop: offline_queue(host, port, OFFLINE_QUEUE * 3, drop) for drop in ("oldest", "newest")},
+        "reconnect_storm": reconnect_storm(host, port, clients, storms)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the asyncio MQTT transport against a local broker")
+    parser.add_argument("--broker", default=DEFAULT_BROKER, help="host:port of a local broker (mosquitto)")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES)
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument("--storms", type=int, default=DEFAULT_STORMS)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    common.write_results({
+        "environment": common.environment(),
+        "transport": run(args.broker, args.messages, args.clients, args.storms)
+    }, args.output)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the BlinkySign benchmarks
+Forces the simulated LED backend and formats machine-readable results
+"""
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+
+# Benchmarks never touch real hardware; this must run before led_controller is imported
+os.environ['LED_BACKEND'] = 'simulated'
+
+# Front ends talk to an in-process LED daemon on a private socket (see start_daemon)
+os.environ['LED_SOCKET'] = os.path.join(tempfile.mkdtemp(prefix="blinkysign-bench-"), "led.sock")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import logging  # noqa: E402
+logging.disable(logging.INFO)
+
+RESULTS_VERSION = 1
+
+_daemon_server = None
+
+def start_daemon():
+    """Serve an LED daemon from a background thread (once per process)"""
+    global _daemon_server
+    if _daemon_server is None:
+        import led_daemon
+        _daemon_server = led_daemon.LEDServer(os.environ['LED_SOCKET'], led_daemon.LEDDaemon())
+        thread = threading.Thread(target=_daemon_server.serve_forever, name="led-daemon")
+        thread.daemon = True
+        thread.start()
+    return _daemon_server.led_daemon
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p):
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 4)
+
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 4)
+    }
+
+def timed(func, iterations):
+    """Call ``func`` repeatedly and return each call's duration in seconds"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT,
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def environment():
+    """Metadata that identifies where and on what revision results were taken"""
+    import pixel_pipeline
+    return {
+        "results_version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "pixel_pipeline": pixel_pipeline.BACKEND
+    }
+
+def write_results(results, path=None):
+    """Write results as JSON to ``path`` (or stdout)"""
+    document = json.dumps(results, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files
+Usage: python -m benchmarks.compare baseline.json candidate.json
+"""
+import json
+import argparse
+
+def flatten(document, prefix=""):
+    """Flatten nested results into {"a.b.c": number}"""
+    values = {}
+    for key, value in document.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            values.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+def compare(baseline, candidate):
+    """Rows of (metric, baseline, candidate, percent change) for shared metrics"""
+    old = flatten({k: v for k, v in baseline.items() if k != "environment"})
+    new = flatten({k: v for k, v in candidate.items() if k != "environment"})
+    rows = []
+    for metric in sorted(set(old) & set(new)):
+        change = ((new[metric] - old[metric]) / old[metric] * 100) if old[metric] else None
+        rows.append((metric, old[metric], new[metric], change))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--filter", default="", help="only show metrics containing this text")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline:  {baseline.get('environment', {}).get('revision')}")
+    print(f"candidate: {candidate.get('environment', {}).get('revision')}")
+    for metric, old, new, change in compare(baseline, candidate):
+        if args.filter not in metric:
+            continue
+        delta = f"{change:+.1f}%" if change is not None else "n/a"
+        print(f"{metric:70} {old:>12} {new:>12} {delta:>9}")
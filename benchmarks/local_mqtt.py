@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+In-memory MQTT broker stand-in for benchmarks
+Delivers messages between LocalClients on a broker thread (like a network
+round trip) and emulates the AWS IoT classic Device Shadow service
+"""
+import json
+import queue
+import threading
+
+class Message:
+    """Minimal stand-in for an MQTT message"""
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload if isinstance(payload, bytes) else payload.encode('utf-8')
+
+def topic_matches(pattern, topic):
+    """MQTT topic filter matching with + and # wildcards"""
+    pattern_parts, topic_parts = pattern.split("/"), topic.split("/")
+    for index, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts) or (part != "+" and part != topic_parts[index]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+class LocalClient:
+    """The publish/subscribe subset of AWSIoTMQTTClient, connected to a LocalBroker"""
+
+    def __init__(self, broker, client_id):
+        self.broker = broker
+        self.client_id = client_id
+        self.published = 0
+        self.bytes_out = 0
+
+    def publish(self, topic, payload, qos):
+        self.published += 1
+        self.bytes_out += len(payload)
+        self.broker.publish(topic, payload, sender=self)
+        return True
+
+    def subscribe(self, topic, qos, callback):
+        self.broker.subscribe(topic, self, callback)
+        return True
+
+class LocalBroker:
+    """Routes messages and keeps classic shadow documents per thing
+
+    Shadow requests (``get`` and ``update``) are answered on the
+    ``get/accepted``, ``get/rejected``, ``update/accepted`` and
+    ``update/delta`` topics like AWS IoT does.
+    """
+
+    def __init__(self):
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self.shadows = {}
+        self.delivered = 0
+        self.deltas = 0
+        self._thread = threading.Thread(target=self._run, name="local-broker")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def client(self, client_id):
+        return LocalClient(self, client_id)
+
+    def subscribe(self, topic, client, callback):
+        with self._lock:
+            self._subscriptions.append((topic, client, callback))
+
+    def publish(self, topic, payload, sender=None):
+        self._queue.put((topic, payload, sender))
+
+    def drain(self):
+        """Wait until every message published so far has been delivered"""
+        self._queue.join()
+
+    def set_desired(self, thing, **fields):
+        """Update the desired state as the cloud side would (console, API)"""
+        self.publish(f"$aws/things/{thing}/shadow/update", json.dumps({"state": {"desired": fields}}))
+
+    def shadow(self, thing):
+        """The current shadow document of ``thing``"""
+        with self._lock:
+            return json.loads(json.dumps(self.shadows.get(thing)))
+
+    def _run(self):
+        while True:
+            topic, payload, sender = self._queue.get()
+            try:
+                parts = topic.split("/")
+                if topic.startswith("$aws/things/") and parts[3:] == ["shadow", "get"]:
+                    self._shadow_get(parts[2])
+                elif topic.startswith("$aws/things/") and parts[3:] == ["shadow", "update"]:
+                    self._shadow_update(parts[2], json.loads(payload))
+                self._deliver(topic, payload, sender)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, topic, payload, sender):
+        with self._lock:
+            targets = [(client, callback) for pattern, client, callback in self._subscriptions
+                       if client is not sender and topic_matches(pattern, topic)]
+        for client, callback in targets:
+            self.delivered += 1
+            callback(client, None, Message(topic, payload))
+
+    def _shadow_get(self, thing):
+        base = f"$aws/things/{thing}/shadow"
+        with self._lock:
+            document = self.shadows.get(thing)
+        if document is None:
+            self._deliver(f"{base}/get/rejected", json.dumps({"code": 404, "message": "No shadow exists"}), None)
+        else:
+            self._deliver(f"{base}/get/accepted", json.dumps(document), None)
+
+    def _shadow_update(self, thing, request):
+        base = f"$aws/things/{thing}/shadow"
+        with self._lock:
+            document = self.shadows.setdefault(thing, {"state": {"desired": {}, "reported": {}}, "version": 0})
+            state = document["state"]
+            for section in ("desired", "reported"):
+                for key, value in request.get("state", {}).get(section, {}).items():
+                    if value is None:
+                        state[section].pop(key, None)
+                    else:
+                        state[section][key] = value
+            document["version"] += 1
+            version = document["version"]
+            delta = {key: value for key, value in state["desired"].items() if state["reported"].get(key) != value}
+        self._deliver(f"{base}/update/accepted", json.dumps(dict(request, version=version)), None)
+        if delta and "desired" in request.get("state", {}):
+            self.deltas += 1
+            self._deliver(f"{base}/update/delta", json.dumps({"state": delta, "version": version}), None)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Run every BlinkySign benchmark and write one JSON results document
+Usage: python -m benchmarks.run_all --output results.json
+"""
+import argparse
+from benchmarks import common  # noqa: F401 (selects the simulated backend)
+
+SUITES = ("effects", "api", "mqtt", "shadow", "transport", "button", "button_input", "button_panel", "http", "outbox")
+
+def run_suite(name):
+    """Run one suite, recording a skip if its dependencies are missing"""
+    try:
+        if name == "effects":
+            from benchmarks import bench_effects
+            return bench_effects.run()
+        if name == "api":
+            from benchmarks import bench_api
+            return bench_api.run()
+        if name == "mqtt":
+            from benchmarks import bench_mqtt
+            return bench_mqtt.run()
+        if name == "shadow":
+            from benchmarks import bench_shadow
+            return bench_shadow.run()
+        if name == "transport":
+            from benchmarks import bench_transport
+            return bench_transport.run()
+        if name == "button":
+            from benchmarks import bench_button
+            return bench_button.run()
+        if name == "button_input":
+            from benchmarks import bench_button_input
+            return bench_button_input.run()
+        if name == "button_panel":
+            from benchmarks import bench_button_panel
+            return bench_button_panel.run()
+        if name == "http":
+            from benchmarks import bench_http_client
+            return bench_http_client.run()
+        if name == "outbox":
+            from benchmarks import bench_outbox
+            return bench_outbox.run()
+    except ImportError as e:
+        return {"skipped": f"missing dependency: {e}"}
+    raise ValueError(f"Unknown suite: {name}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the BlinkySign benchmark suite")
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = {"environment": common.environment()}
+    for suite in args.suite:
+        results[suite] = run_suite(suite)
+    common.write_results(results, args.output)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Local TCP proxy for benchmarks
+Forwards connections to a server, optionally adding network delay, and can
+cut every connection and refuse new ones to simulate an outage
+"""
+import time
+import queue
+import socket
+import threading
+
+class TCPProxy:
+    """Forwards local connections to ``host:port``; ``cut()`` drops them all
+
+    ``delay`` is added to every chunk in each direction (half the simulated
+    round trip), so handshakes cost what they would over a real network.
+    """
+
+    def __init__(self, host, port, delay=0.0):
+        self.target = (host, port)
+        self.delay = delay
+        self.refusing = False
+        self.connections = 0
+        self._connections = []
+        self._lock = threading.Lock()
+        self._listen(0)
+
+    def _listen(self, port):
+        self._server = socket.create_server(("127.0.0.1", port))
+        self.port = self._server.getsockname()[1]
+        self._start(self._accept, "bench-proxy", self._server)
+
+    def _start(self, target, name, *args):
+        thread = threading.Thread(target=target, args=args, name=name)
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self, server):
+        while True:
+            try:
+                client, _ = server.accept()
+            except OSError:
+                return  # Stopped listening (cut with refuse)
+            try:
+                upstream = socket.create_connection(self.target)
+            except OSError:
+                client.close()
+                continue
+            for sock in (client, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self.connections += 1
+                self._connections += [client, upstream]
+            for source, destination in ((client, upstream), (upstream, client)):
+                if self.delay:
+                    chunks = queue.Queue()
+                    self._start(self._read, "bench-proxy-read", source, chunks)
+                    self._start(self._write, "bench-proxy-write", chunks, destination)
+                else:
+                    self._start(self._pipe, "bench-proxy-pipe", source, destination)
+
+    def _pipe(self, source, destination):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                destination.sendall(data)
+        except OSError:
+            pass
+        self._close(source, destination)
+
+    def _read(self, source, chunks):
+        """Timestamp each chunk; the writer sends it ``delay`` later"""
+        try:
+            while True:
+                data = source.recv(65536)
+                chunks.put((time.monotonic() + self.delay, data))
+                if not data:
+                    break
+        except OSError:
+            chunks.put((0, b""))
+
+    def _write(self, chunks, destination):
+        while True:
+            due, data = chunks.get()
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            if not data:
+                break
+            try:
+                destination.sendall(data)
+            except OSError:
+                break
+        self._close(destination)
+
+    def _close(self, *sockets):
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def cut(self, refuse=False):
+        """Drop every open connection; with ``refuse``, keep refusing new ones until ``restore()``
+
+        Refusing closes the listening socket, so clients see the connection
+        refused rather than accepted and then closed.
+        """
+        if refuse and not self.refusing:
+            self.refusing = True
+            self._close(self._server)  # Wakes the accept thread
+            self._server.close()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for sock in connections:
+            self._close(sock)
+            sock.close()
+
+    def restore(self):
+        if self.refusing:
+            self.refusing = False
+            self._listen(self.port)
@@ -3,12 +3,12 @@
 Button Client for BlinkySign
 Simple client to send HTTP requests when a button is pressed
 """
-import os
 import time
 import json
 import logging
-import requests
 from dotenv import load_dotenv
+from api_client import api_client, API_ENDPOINT, RETRY_STATUS, REFUSED_STATUS
+from outbox import Outbox, Undelivered, outbox_path, REPEATABLE_ACTIONS
 
 # Load environment variables
 load_dotenv()
@@ -20,47 +20,56 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Configuration
-API_ENDPOINT = os.getenv('API_ENDPOINT', 'http://localhost:5000')
+# Requests that cannot reach the API wait on disk until it is back (sent from the first request on)
+OUTBOX_PATH = outbox_path("button_client")
+outbox = Outbox(OUTBOX_PATH) if OUTBOX_PATH else None
 
-def send_toggle_request():
-    """Send a toggle request to the API"""
+def send_action(action):
+    """Send toggle, mute or unmute to the API; raises Undelivered when the API is not reachable"""
     try:
-        response = requests.put(f"{API_ENDPOINT}/toggle")
-        if response.status_code == 200:
-            data = response.json()
-            logger.info(f"Toggle successful: {data['message']}")
-            return True
+        if action == "toggle":
+            response = api_client.toggle()
         else:
-            logger.error(f"Toggle failed with status code {response.status_code}")
-            return False
+            response = api_client.set_muted(action == "mute")
     except Exception as e:
-        logger.error(f"Error sending toggle request: {e}")
+        if action not in REPEATABLE_ACTIONS and not api_client.never_sent(e):
+            # It may have been carried out; sending it again could undo it
+            logger.error(f"Error sending {action} request, not kept: {e}")
+            return False
+        raise Undelivered(f"Error sending {action} request: {e}")
+    if response.status_code == 200:
+        data = response.json()
+        logger.info(f"{action.capitalize()} successful: {data['message']}")
+        return True
+    # A toggle or effect is kept only if refused (429, 503); other server errors may follow its effect
+    unsent = RETRY_STATUS if action in REPEATABLE_ACTIONS else REFUSED_STATUS
+    if response.status_code in unsent or (action in REPEATABLE_ACTIONS and response.status_code >= 500):
+        raise Undelivered(f"{action.capitalize()} failed with status code {response.status_code}")
+    logger.error(f"{action.capitalize()} failed with status code {response.status_code}")
+    return False
+
+def deliver(action):
+    """Send an action now, or keep it in the outbox; returns True if it was carried out now"""
+    if outbox:
+        return outbox.submit(action, send_action) is True
+    try:
+        return send_action(action)
+    except Undelivered as e:
+        logger.error(str(e))
         return False
 
+def send_toggle_request():
+    """Send a toggle request to the API"""
+    return deliver("toggle")
+
 def send_set_request(muted=True):
     """Send a request to set the mute status explicitly"""
-    try:
-        response = requests.put(
-            f"{API_ENDPOINT}/set",
-            json={"muted": muted},
-            headers={"Content-Type": "application/json"}
-        )
-        if response.status_code == 200:
-            data = response.json()
-            logger.info(f"Set status successful: {data['message']}")
-            return True
-        else:
-            logger.error(f"Set status failed with status code {response.status_code}")
-            return False
-    except Exception as e:
-        logger.error(f"Error sending set request: {e}")
-        return False
+    return deliver("mute" if muted else "unmute")
 
 def get_current_status():
     """Get the current status from the API"""
     try:
-        response = requests.get(f"{API_ENDPOINT}/status")
+        response = api_client.status()
         if response.status_code == 200:
             data = response.json()
             logger.info(f"Current status: {'muted' if data['muted'] else 'unmuted'}")
@@ -75,7 +84,9 @@ def get_current_status():
 if __name__ == "__main__":
     logger.info("Button client started")
     logger.info(f"API endpoint: {API_ENDPOINT}")
-    
+    if outbox:
+        outbox.start(send_action)  # Also sends what was kept before a restart
+
     # Simple demo - toggle every 5 seconds
     try:
         while True:
@@ -84,4 +95,7 @@ if __name__ == "__main__":
             send_toggle_request()
             time.sleep(5)
     except KeyboardInterrupt:
-        logger.info("Button client stopped")
\ No newline at end of file
+        logger.info("Button client stopped")
+    finally:
+        if outbox:
+            outbox.close()
\ No newline at end of file
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Button Input for BlinkySign
+GPIO edge pipeline for physical buttons: kernel-timestamped edge alerts
+(lgpio), a debounce state machine on the monotonic clock, and single,
+double and long press detection. A replay pin stands in for the GPIO pin
+with recorded edge traces
+"""
+import os
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Gesture configuration
+GPIO_CHIP = int(os.getenv('GPIO_CHIP', 0))  # /dev/gpiochip<N> with the button pins (4 on a Pi 5 with older kernels)
+BUTTON_DEBOUNCE_MS = float(os.getenv('BUTTON_DEBOUNCE_MS', 20))  # Edges ignored after a press or release (contact bounce)
+BUTTON_DOUBLE_PRESS_MS = float(os.getenv('BUTTON_DOUBLE_PRESS_MS', 250))  # Wait for a second press (0: no double press)
+BUTTON_LONG_PRESS_MS = float(os.getenv('BUTTON_LONG_PRESS_MS', 800))  # Hold time for a long press (0: no long press)
+
+GESTURES = ("single", "double", "long")
+
+class ButtonGestures:
+    """Debounce and gesture state machine for one button
+
+    Fed with edges (level, monotonic timestamp) in order through ``edge()``
+    and with the passing time through ``poll()``; both return the gestures
+    completed so far as ``(kind, pressed_at)`` tuples, ``pressed_at`` being
+    the first press of the gesture. ``deadline()`` is when ``poll()`` next
+    has something to do.
+
+    A level change counts on its first edge, so a press is seen without
+    waiting for the contacts to settle; edges in the following ``debounce``
+    seconds are bounce. If the level at the end of that window differs,
+    the change counts then, as it does for a bounce reported after its
+    window closed. A release completes a single press once
+    ``double_press`` seconds pass without a second press, or a double press
+    right away. A press held for ``long_press`` seconds is a long press.
+    With neither double nor long presses (both 0) there is nothing to wait
+    for, and a single press completes on the press itself.
+    """
+
+    def __init__(self, debounce=BUTTON_DEBOUNCE_MS / 1000, double_press=BUTTON_DOUBLE_PRESS_MS / 1000,
+                 long_press=BUTTON_LONG_PRESS_MS / 1000, idle_level=1):
+        self.debounce = debounce
+        self.double_press = double_press
+        self.long_press = long_press
+        self.idle_level = idle_level  # 1 with a pull-up and the button to ground
+        self.level = idle_level  # Debounced level
+        self.edges = 0
+        self.bounces = 0
+        self._raw = idle_level
+        self._settle_at = None
+        self._settled_at = float("-inf")  # End of the last debounce window
+        self._click_deadline = None
+        self._long_deadline = None
+        self._long_fired = False
+        self._clicks = 0
+        self._first_press = None
+
+    def deadline(self):
+        deadlines = [d for d in (self._settle_at, self._long_deadline, self._click_deadline) if d is not None]
+        return min(deadlines) if deadlines else None
+
+    def edge(self, level, t):
+        gestures = self.poll(t)
+        self.edges += 1
+        self._raw = level
+        if self._settle_at is not None:
+            self.bounces += 1
+        elif t < self._settled_at:
+            # Bounce from a window that closed before the edge arrived (reported late); check the level again
+            self.bounces += 1
+            if level != self.level:
+                self._settle_at = self._settled_at
+        elif level != self.level:
+            gestures += self._change(level, t)
+        return gestures
+
+    def poll(self, t):
+        gestures = []
+        while True:
+            deadline = self.deadline()
+            if deadline is None or deadline > t:
+                return gestures
+            if deadline == self._settle_at:
+                self._settle_at = None
+                self._settled_at = deadline
+                if self._raw != self.level:
+                    gestures += self._change(self._raw, deadline)
+            elif deadline == self._long_deadline:
+                self._long_deadline = None
+                self._long_fired = True
+                self._clicks = 0
+                gestures.append(("long", self._first_press))
+            else:
+                self._click_deadline = None
+                self._clicks = 0
+                gestures.append(("single", self._first_press))
+
+    def _change(self, level, t):
+        """A debounced level change at ``t``"""
+        self.level = level
+        self._settle_at = t + self.debounce if self.debounce else None
+        if level != self.idle_level:
+            if not self.double_press and not self.long_press:
+                return [("single", t)]
+            if not self._clicks:
+                self._first_press = t
+            self._click_deadline = None
+            self._long_deadline = t + self.long_press if self.long_press else None
+            return []
+        if not self.double_press and not self.long_press:
+            return []  # Already counted on the press
+        self._long_deadline = None
+        if self._long_fired:
+            self._long_fired = False
+            return []
+        self._clicks += 1
+        if self._clicks == 2 or not self.double_press:
+            kind = "double" if self._clicks == 2 else "single"
+            self._clicks = 0
+            return [(kind, self._first_press)]
+        self._click_deadline = t + self.double_press
+        return []
+
+def kernel_to_monotonic(tick_ns):
+    """Convert a kernel edge timestamp in nanoseconds to the ``time.monotonic()`` clock
+
+    lgpio reports CLOCK_REALTIME or CLOCK_MONOTONIC timestamps depending on
+    the build; the nearer clock is the one it used. Only the edge's age is
+    taken from it, so a wall clock jump cannot move the edge.
+    """
+    now_monotonic, now_real = time.monotonic_ns(), time.time_ns()
+    reference = now_real if abs(now_real - tick_ns) < abs(now_monotonic - tick_ns) else now_monotonic
+    return (now_monotonic - (reference - tick_ns)) / 1e9
+
+class LgpioPin:
+    """A GPIO input pin with kernel-timestamped edge alerts"""
+
+    def __init__(self, pin, chip=GPIO_CHIP, pull_up=True):
+        try:
+            import lgpio
+        except ImportError:
+            raise RuntimeError("lgpio is required for GPIO buttons (sudo apt-get install -y python3-lgpio)")
+        self._lgpio = lgpio
+        self.pin = pin
+        self.idle_level = 1 if pull_up else 0
+        self._handle = lgpio.gpiochip_open(chip)
+        lgpio.gpio_claim_alert(self._handle, pin, lgpio.BOTH_EDGES,
+                               lgpio.SET_PULL_UP if pull_up else lgpio.SET_PULL_DOWN)
+        self._callback = None
+
+    def start(self, on_edge):
+        """Call ``on_edge(level, t)`` for every edge (on lgpio's thread)"""
+        def alert(chip, gpio, level, tick):
+            if level in (0, 1):  # 2 is a watchdog timeout
+                on_edge(level, kernel_to_monotonic(tick))
+        self._callback = self._lgpio.callback(self._handle, self.pin, self._lgpio.BOTH_EDGES, alert)
+
+    def close(self):
+        if self._callback:
+            self._callback.cancel()
+        self._lgpio.gpio_free(self._handle, self.pin)
+        self._lgpio.gpiochip_close(self._handle)
+
+class ReplayPin:
+    """Replays an edge trace in real time in place of a GPIO pin
+
+    ``edges`` is a list of ``(seconds, level)`` from the start of the
+    trace. Each edge is reported with the time it was due, as the kernel
+    would timestamp it. ``done`` is set after the last edge.
+    """
+
+    def __init__(self, edges, idle_level=1, pin=None):
+        self.edges = edges
+        self.idle_level = idle_level
+        self.pin = pin
+        self.done = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self, on_edge):
+        def replay():
+            started = time.monotonic()
+            for offset, level in self.edges:
+                due = started + offset
+                if self._stop.wait(max(0, due - time.monotonic())):
+                    return
+                on_edge(level, due)
+            self.done.set()
+        thread = threading.Thread(target=replay, name=f"replay-pin-{self.pin}")
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        self._stop.set()
+
+def load_trace(path):
+    """Read a recorded trace; returns a ReplayPin"""
+    with open(path) as f:
+        trace = json.load(f)
+    return ReplayPin([tuple(edge) for edge in trace["edges"]], trace.get("idle_level", 1), trace.get("pin"))
+
+def save_trace(path, edges, idle_level=1, pin=None):
+    with open(path, "w") as f:
+        json.dump({"pin": pin, "idle_level": idle_level, "edges": edges}, f)
+
+class ButtonInput:
+    """Runs a pin's edges through ButtonGestures on a thread of its own
+
+    ``on_gesture(kind, pressed_at)`` is called on that thread. Edges are
+    queued with their timestamps, so a slow ``on_gesture`` delays the
+    gestures that follow but does not change how they are recognized.
+    """
+
+    def __init__(self, pin, on_gesture, gestures=None):
+        self.pin = pin
+        self.on_gesture = on_gesture
+        self.gestures = gestures or ButtonGestures(idle_level=pin.idle_level)
+        self.counts = dict.fromkeys(GESTURES, 0)
+        self._edges = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"button-{self.pin.pin}")
+        self._thread.daemon = True
+        self._thread.start()
+        self.pin.start(lambda level, t: self._edges.put((level, t)))
+
+    def stop(self):
+        self.pin.close()
+        self._edges.put(None)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            deadline = self.gestures.deadline()
+            try:
+                item = self._edges.get(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                found = self.gestures.poll(time.monotonic())
+            else:
+                if item is None:
+                    return
+                found = self.gestures.edge(*item)
+            for kind, pressed_at in found:
+                self.counts[kind] += 1
+                try:
+                    self.on_gesture(kind, pressed_at)
+                except Exception as e:
+                    logger.error(f"Error handling {kind} press: {e}")
+
+    def stats(self):
+        return {
+            "edges": self.gestures.edges,
+            "bounces": self.gestures.bounces,
+            "gestures": dict(self.counts)
+        }
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Record a button's edges, or replay a recorded trace")
+    parser.add_argument("--pin", type=int, default=int(os.getenv('BUTTON_PIN', 17)))
+    parser.add_argument("--record", metavar="TRACE", help="record edges to this file until Ctrl+C")
+    parser.add_argument("--replay", metavar="TRACE", help="print the gestures in a recorded trace")
+    args = parser.parse_args()
+
+    if args.record:
+        pin = LgpioPin(args.pin)
+        edges = []
+        pin.start(lambda level, t: edges.append((t, level)))
+        logger.info(f"Recording GPIO {args.pin} to {args.record} (Press Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        pin.close()
+        start = edges[0][0] if edges else 0
+        save_trace(args.record, [(round(t - start, 6), level) for t, level in edges], pin.idle_level, args.pin)
+        logger.info(f"Recorded {len(edges)} edges")
+    elif args.replay:
+        pin = load_trace(args.replay)
+        started = time.monotonic()
+        button = ButtonInput(pin, lambda kind, pressed_at: logger.info(
+            f"{kind} press at {pressed_at - started:.3f}s (detected after {(time.monotonic() - pressed_at) * 1000:.1f} ms)"))
+        button.start()
+        pin.done.wait()
+        time.sleep(max(BUTTON_DOUBLE_PRESS_MS, BUTTON_LONG_PRESS_MS, BUTTON_DEBOUNCE_MS) / 1000 + 0.1)
+        button.stop()
+        logger.info(f"Stats: {button.stats()}")
+    else:
+        parser.print_help()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Button Panel for BlinkySign
+Several GPIO buttons on one Pi, each mapped to actions by a declarative
+config, handled on one event loop with a bounded dispatch queue
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from effect_registry import get_effect, EFFECTS
+from strip_topology import read_document
+from button_input import ButtonGestures, LgpioPin, GESTURES
+
+logger = logging.getLogger(__name__)
+
+# Panel configuration: a path to a JSON/YAML file or an inline JSON document (see buttons.example.json).
+# Without it physical_button.py runs the single BUTTON_PIN button.
+BUTTON_CONFIG = os.getenv('BUTTON_CONFIG', '')
+BUTTON_QUEUE_SIZE = int(os.getenv('BUTTON_QUEUE_SIZE', 16))  # Actions waiting to be sent before new ones are dropped
+BUTTON_WORKERS = int(os.getenv('BUTTON_WORKERS', 1))  # Actions sent at once (1 keeps them in press order)
+LATENCY_SAMPLES = 256  # Recent dispatches kept per pin for the latency figures
+
+# Actions a gesture can trigger, besides "effect:<name>"
+ACTIONS = ("toggle", "mute", "unmute", "off")
+
+def check_action(action, button):
+    """Raise ValueError unless ``action`` is a known action"""
+    if action in ACTIONS:
+        return
+    if isinstance(action, str) and action.startswith("effect:"):
+        if get_effect(action[len("effect:"):]) is None:
+            raise ValueError(f"Button '{button}' has an unknown effect '{action}' "
+                             f"(available: {', '.join(sorted(EFFECTS))})")
+        return
+    raise ValueError(f"Button '{button}' has an unknown action '{action}' "
+                     f"(use {', '.join(ACTIONS)} or effect:<name>)")
+
+class ButtonConfig:
+    """One button: its pin and the action for each gesture
+
+    Without a ``double`` action a press acts as soon as it is released
+    rather than waiting to see if a second press follows; without a
+    ``long`` action holding the button is just a press. With neither, it
+    acts on the press itself.
+    """
+
+    def __init__(self, pin, action, double=None, long=None, name=None):
+        self.pin = int(pin)
+        self.name = name or f"gpio{self.pin}"
+        self.actions = {"single": action, "double": double, "long": long}
+        for gesture_action in self.actions.values():
+            if gesture_action is not None:
+                check_action(gesture_action, self.name)
+
+    def gestures(self, idle_level=1):
+        """A ButtonGestures that only waits for the gestures this button uses"""
+        kwargs = {}
+        if self.actions["double"] is None:
+            kwargs["double_press"] = 0
+        if self.actions["long"] is None:
+            kwargs["long_press"] = 0
+        return ButtonGestures(idle_level=idle_level, **kwargs)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "pin": self.pin,
+            "action": self.actions["single"],
+            "double": self.actions["double"],
+            "long": self.actions["long"]
+        }
+
+def parse_buttons(document):
+    """Build button configs from a parsed document
+
+    Accepts either a list of buttons or ``{"buttons": [...]}``. Each button
+    takes ``pin`` (BCM number), ``action`` (single press), optional
+    ``double`` and ``long`` actions, and an optional ``name``.
+    """
+    entries = document.get("buttons", []) if isinstance(document, dict) else document
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Button config must contain a non-empty list of buttons")
+
+    buttons = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Button entry {index} must be an object")
+        unknown = set(entry) - {"name", "pin", "action", "double", "long"}
+        if unknown:
+            raise ValueError(f"Button entry {index} has unknown fields: {', '.join(sorted(unknown))}")
+        if "pin" not in entry or "action" not in entry:
+            raise ValueError(f"Button entry {index} needs a 'pin' and an 'action'")
+        buttons.append(ButtonConfig(entry["pin"], entry["action"], entry.get("double"), entry.get("long"),
+                                    entry.get("name")))
+
+    pins = [button.pin for button in buttons]
+    if len(set(pins)) != len(pins):
+        raise ValueError("Button pins must be unique")
+    return buttons
+
+def load_buttons(source=BUTTON_CONFIG, default=None):
+    """Load the button panel, falling back to ``default``"""
+    if not source:
+        return default
+    buttons = parse_buttons(read_document(source))
+    logger.info(f"Loaded panel with {len(buttons)} buttons")
+    return buttons
+
+def _latency(samples):
+    """Summary of latency samples in seconds"""
+    if not samples:
+        return None
+    samples = sorted(samples)
+
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000, 3)
+
+    return {"p50_ms": percentile(50), "p99_ms": percentile(99), "max_ms": round(samples[-1] * 1000, 3)}
+
+class _PinState:
+    """A button's gesture state machine, timer and counters"""
+
+    def __init__(self, config):
+        self.config = config
+        self.pin = None
+        self.gestures = None
+        self.timer = None
+        self.counts = dict.fromkeys(GESTURES, 0)
+        self.dispatched = 0
+        self.failed = 0
+        self.dropped = 0
+        self.lag = deque(maxlen=LATENCY_SAMPLES)
+        self.dispatch = deque(maxlen=LATENCY_SAMPLES)
+
+class ButtonPanel:
+    """Runs every button of the panel on one asyncio event loop
+
+    lgpio delivers the edges of all pins on its own thread; they are handed
+    to the loop, which runs each button's ButtonGestures and keeps one timer
+    per button for its next deadline. Recognized gestures go into a bounded
+    queue. ``workers`` tasks take actions from it and run
+    ``perform(action, pressed_at)`` in a small thread pool, so a slow
+    network call never holds up edges or timers. When the queue is full,
+    the new action is dropped and logged. ``pin_factory(pin)`` opens a pin
+    (LgpioPin, or a ReplayPin for replays).
+    """
+
+    def __init__(self, buttons, perform, pin_factory=LgpioPin, queue_size=BUTTON_QUEUE_SIZE,
+                 workers=BUTTON_WORKERS):
+        self.perform = perform
+        self.pin_factory = pin_factory
+        self.queue_size = queue_size
+        self.workers = workers
+        self._pins = {button.pin: _PinState(button) for button in buttons}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="button-panel")
+        self._thread.daemon = True
+        self._thread.start()
+        ready.wait()
+        for number, state in self._pins.items():
+            state.pin = self.pin_factory(number)
+            state.gestures = state.config.gestures(state.pin.idle_level)
+            state.pin.start(lambda level, t, state=state: self._loop.call_soon_threadsafe(self._edge, state, level, t))
+
+    def stop(self):
+        for state in self._pins.values():
+            if state.pin:
+                state.pin.close()
+        if self._thread and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(self.queue_size)
+        executor = ThreadPoolExecutor(self.workers, thread_name_prefix="button-action")
+        tasks = [self._loop.create_task(self._dispatch(executor)) for _ in range(self.workers)]
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+            executor.shutdown(wait=False)
+
+    def _edge(self, state, level, t):
+        state.lag.append(time.monotonic() - t)
+        self._handle(state, state.gestures.edge(level, t))
+
+    def _poll(self, state, deadline):
+        state.timer = None
+        now = time.monotonic()
+        state.lag.append(now - deadline)
+        self._handle(state, state.gestures.poll(now))
+
+    def _handle(self, state, found):
+        """Queue the actions for ``found`` gestures and set the button's timer"""
+        for kind, pressed_at in found:
+            action = state.config.actions[kind]
+            with self._lock:
+                state.counts[kind] += 1
+            try:
+                self._queue.put_nowait((state, action, pressed_at, time.monotonic()))
+            except asyncio.QueueFull:
+                with self._lock:
+                    state.dropped += 1
+                logger.warning(f"Dispatch queue full, dropped {action} from button {state.config.name}")
+
+        deadline = state.gestures.deadline()
+        if state.timer and (deadline is None or state.timer.when() != deadline):
+            state.timer.cancel()
+            state.timer = None
+        if deadline is not None and state.timer is None:
+            state.timer = self._loop.call_at(deadline, self._poll, state, deadline)
+
+    async def _dispatch(self, executor):
+        while True:
+            state, action, pressed_at, queued_at = await self._queue.get()
+            try:
+                succeeded = await self._loop.run_in_executor(executor, self.perform, action, pressed_at)
+            except Exception as e:
+                logger.error(f"Error running {action} for button {state.config.name}: {e}")
+                succeeded = False
+            with self._lock:
+                state.dispatched += 1
+                if succeeded is False:
+                    state.failed += 1
+                state.dispatch.append(time.monotonic() - queued_at)
+
+    def stats(self):
+        """Per-pin gesture counts, drops, loop lag and dispatch latency"""
+        with self._lock:
+            pins = {}
+            for number, state in self._pins.items():
+                pins[number] = {
+                    "name": state.config.name,
+                    "edges": state.gestures.edges if state.gestures else 0,
+                    "bounces": state.gestures.bounces if state.gestures else 0,
+                    "gestures": dict(state.counts),
+                    "dispatched": state.dispatched,
+                    "failed": state.failed,
+                    "dropped": state.dropped,
+                    # Edge timestamp (or timer deadline) to handling on the loop
+                    "lag_ms": _latency(list(state.lag)),
+                    # Gesture recognized to action done, including time in the queue
+                    "dispatch_ms": _latency(list(state.dispatch))
+                }
+        return {
+            "pins": pins,
+            "queue": {"waiting": self._queue.qsize() if self._queue else 0, "max": self.queue_size}
+        }
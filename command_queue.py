@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Command Queue for BlinkySign
+Coalesces bursts of display commands so the strip only draws the latest
+desired state, at most once per frame interval
+"""
+import os
+import time
+import logging
+import threading
+from render_engine import RENDER_FPS
+
+logger = logging.getLogger(__name__)
+
+# Queue configuration
+COMMAND_COALESCE_MS = float(os.getenv('COMMAND_COALESCE_MS', 1000 / RENDER_FPS))  # Defaults to one frame
+
+class CommandQueue:
+    """Applies only the newest of the commands submitted within one interval
+
+    Each command is a complete description of what the strip should show, so
+    skipping older ones loses nothing. ``apply(command)`` runs on a worker
+    thread. A command arriving after a quiet period is applied immediately;
+    commands arriving within ``interval`` of the last draw wait for the end of
+    the interval and only the newest one is drawn. Commands are numbered on
+    submission and an older command is never drawn after a newer one.
+    """
+
+    def __init__(self, apply, interval=COMMAND_COALESCE_MS / 1000):
+        self._apply = apply
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._apply_lock = threading.Lock()
+        self._pending = None
+        self._pending_since = None
+        self._sequence = 0
+        self._applied_sequence = 0
+        self._last_applied = 0.0
+        self.depth = 0
+        self.max_depth = 0
+        self.submitted = 0
+        self.applied = 0
+        self.coalesced = 0
+        self._latency_last = 0.0
+        self._latency_max = 0.0
+        self._latency_total = 0.0
+        self._thread = threading.Thread(target=self._run, name="command-queue")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, command):
+        """Queue a command, replacing any that has not been drawn yet"""
+        with self._cond:
+            self._sequence += 1
+            self.submitted += 1
+            if self._pending is not None:
+                self.coalesced += 1
+            else:
+                self._pending_since = time.perf_counter()
+            self._pending = (self._sequence, command)
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+            self._cond.notify()
+            return self._sequence
+
+    def barrier(self, func=None):
+        """Draw any pending command now, then run ``func`` after it
+
+        For actions that must stay ordered after earlier commands, such as
+        starting an effect, which a later draw of an older command would
+        otherwise cancel.
+        """
+        with self._apply_lock:
+            with self._cond:
+                pending, since = self._take()
+            if pending is not None:
+                self._apply_pending(pending, since)
+            if func is not None:
+                return func()
+
+    def _take(self):
+        pending, since = self._pending, self._pending_since
+        self._pending = None
+        self._pending_since = None
+        self.depth = 0
+        return pending, since
+
+    def _apply_pending(self, pending, since):
+        sequence, command = pending
+        if sequence <= self._applied_sequence:
+            return
+        try:
+            self._apply(command)
+        except Exception as e:
+            logger.error(f"Error applying command {command}: {e}")
+        latency = time.perf_counter() - since
+        with self._cond:
+            self._applied_sequence = sequence
+            self._last_applied = time.perf_counter()
+            self.applied += 1
+            self._latency_last = latency
+            self._latency_max = max(self._latency_max, latency)
+            self._latency_total += latency
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                # Hold off until one interval after the last draw, collecting newer commands
+                delay = self._last_applied + self.interval - time.perf_counter()
+                while delay > 0 and self._pending is not None:
+                    self._cond.wait(delay)
+                    delay = self._last_applied + self.interval - time.perf_counter()
+                if self._pending is None:
+                    continue
+            with self._apply_lock:
+                with self._cond:
+                    pending, since = self._take()
+                if pending is not None:
+                    self._apply_pending(pending, since)
+
+    def stats(self):
+        """Return queue statistics"""
+        with self._cond:
+            applied = self.applied or 1
+            return {
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "applied": self.applied,
+                "coalesced": self.coalesced,
+                "coalesce_ratio": round(self.coalesced / self.submitted, 3) if self.submitted else 0.0,
+                "interval_ms": round(self.interval * 1000, 3),
+                "latency_ms": {
+                    "last": round(self._latency_last * 1000, 3),
+                    "avg": round(self._latency_total / applied * 1000, 3),
+                    "max": round(self._latency_max * 1000, 3)
+                }
+            }
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Effect Registry for BlinkySign
+One table of effects and colors shared by every transport (HTTP, MQTT, batches)
+"""
+import re
+import colorsys
+from functools import lru_cache
+
+# Named colors
+PALETTE = {
+    "red": (255, 0, 0),
+    "green": (0, 255, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "purple": (128, 0, 128),
+    "cyan": (0, 255, 255),
+    "white": (255, 255, 255)
+}
+
+_HEX = re.compile(r"#?([0-9a-f]{6})")
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_HSV = re.compile(rf"hsv\(\s*{_NUMBER}\s*,\s*{_NUMBER}%?\s*,\s*{_NUMBER}%?\s*\)")
+
+class EffectError(ValueError):
+    """Raised for effect parameters that cannot be used"""
+
+@lru_cache(maxsize=256)
+def _parse_color_string(text):
+    text = text.strip().lower()
+    if text in PALETTE:
+        return PALETTE[text]
+    match = _HEX.fullmatch(text)
+    if match:
+        value = int(match.group(1), 16)
+        return (value >> 16 & 0xFF, value >> 8 & 0xFF, value & 0xFF)
+    match = _HSV.fullmatch(text)
+    if match:
+        # Hue in degrees, saturation and value in percent
+        hue, saturation, value = (float(part) for part in match.groups())
+        if hue <= 360 and saturation <= 100 and value <= 100:
+            rgb = colorsys.hsv_to_rgb(hue / 360 % 1.0, saturation / 100, value / 100)
+            return tuple(int(round(channel * 255)) for channel in rgb)
+    raise EffectError(f"Unknown color: {text}")
+
+def parse_color(value):
+    """RGB tuple for a color name, ``#RRGGBB``, ``hsv(h, s%, v%)`` or an ``[r, g, b]`` list"""
+    if isinstance(value, str):
+        return _parse_color_string(value)
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        if all(isinstance(channel, int) and 0 <= channel <= 255 for channel in value):
+            return tuple(value)
+    raise EffectError(f"Unknown color: {value}")
+
+class Param:
+    """An integer effect parameter with a default and an allowed range"""
+
+    def __init__(self, default, minimum=1, maximum=1000):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def parse(self, name, value):
+        if value is None:
+            return self.default
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise EffectError(f"'{name}' must be an integer")
+        if not self.minimum <= number <= self.maximum:
+            raise EffectError(f"'{name}' must be between {self.minimum} and {self.maximum}")
+        return number
+
+class EffectSpec:
+    """How to call one effect on the LED controller
+
+    ``method`` is the LEDController method, ``color`` the default color (None
+    for effects without one) and ``params`` the integer keyword parameters.
+    """
+
+    def __init__(self, name, method, color=None, params=None):
+        self.name = name
+        self.method = method
+        self.color = parse_color(color) if color is not None else None
+        self.params = params or {}
+
+    def bind(self, controller, request):
+        """Parse ``request`` into (controller method, args, kwargs); unknown fields are ignored"""
+        args = []
+        if self.color is not None:
+            color = request.get("color")
+            args.append(parse_color(color) if color not in (None, "") else self.color)
+        kwargs = {name: param.parse(name, request.get(name)) for name, param in self.params.items()}
+        return getattr(controller, self.method), args, kwargs
+
+    def describe(self):
+        """Serializable view of the effect and its parameters"""
+        return {
+            "effect": self.name,
+            "color": self.color is not None,
+            "params": {
+                name: {"default": param.default, "min": param.minimum, "max": param.maximum}
+                for name, param in self.params.items()
+            }
+        }
+
+# Effects by name
+EFFECTS = {}
+
+def register(name, method, color=None, **params):
+    """Make an effect available on every transport"""
+    EFFECTS[name] = EffectSpec(name, method, color, params)
+    return EFFECTS[name]
+
+def get_effect(name):
+    """The EffectSpec for ``name``, or None"""
+    return EFFECTS.get(name)
+
+register("rainbow", "rainbow_cycle")
+register("pulse", "pulse", color="blue", cycles=Param(3, maximum=100))
+register("theater", "theater_chase", color="white", iterations=Param(10))
+register("wipe", "color_wipe", color="blue")
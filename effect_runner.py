@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Effect Runner for BlinkySign
+Runs LED effects on a background worker so API handlers can return right away
+"""
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Runner configuration
+MAX_PENDING_EFFECTS = int(os.getenv('MAX_PENDING_EFFECTS', 10))  # Queued effects before rejecting
+EFFECT_HISTORY = int(os.getenv('EFFECT_HISTORY', 50))  # Finished effects kept for polling
+
+# Effect statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+FAILED = "failed"
+
+# The job running on the current thread, see current_job()
+_running = threading.local()
+
+def current_job():
+    """The job whose effect is running on the calling thread, or None"""
+    return getattr(_running, "job", None)
+
+class RunnerFull(Exception):
+    """Raised when too many effects are already waiting to run"""
+
+class EffectJob:
+    """A single effect submitted to the runner"""
+
+    def __init__(self, name, func, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.error = None
+        self.cancel_requested = False
+        self.stop_requested = False
+        self.restore = False  # Call on_finished even if interrupted
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.steps = None  # Per-step results for batches
+        self.done = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status not in (QUEUED, RUNNING)
+
+    def to_dict(self):
+        """Serializable view of the job"""
+        return {
+            "id": self.id,
+            "effect": self.name,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            **({"steps": self.steps} if self.steps is not None else {})
+        }
+
+class EffectRunner:
+    """Runs effects one at a time on a background thread
+
+    ``stop`` aborts the effect currently drawing (for LEDController this is
+    ``engine.stop``). ``on_finished(job)`` runs after each effect that ended on
+    its own or was cancelled through the runner, so the caller can restore the
+    normal sign state. Effects superseded by a state change are marked
+    ``interrupted``; they call ``on_finished`` too when ``interrupt`` asks for
+    it. ``stop`` only aborts an effect that is already playing, so an effect
+    that is still starting up must check ``current_job().stop_requested``
+    before it draws (LEDController._play does).
+    """
+
+    def __init__(self, stop, on_finished=None, max_pending=MAX_PENDING_EFFECTS,
+                 history=EFFECT_HISTORY):
+        self._stop = stop
+        self._on_finished = on_finished
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+        self._current = None
+        self._thread = threading.Thread(target=self._run, name="effect-runner")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, name, func, *args, **kwargs):
+        """Queue an effect and return its job without waiting for it"""
+        return self.enqueue(EffectJob(name, func, args, kwargs))
+
+    def enqueue(self, job):
+        """Queue a job built by the caller"""
+        name = job.name
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise RunnerFull(f"{self._queue.qsize()} effects already pending")
+            self._jobs[job.id] = job
+            self._trim_history()
+        logger.info(f"Effect '{name}' queued as {job.id}")
+        return job
+
+    def get(self, job_id):
+        """Look up a job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """All known jobs, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a queued or running effect; returns the job or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+            elif self._current is job:
+                # The worker records the outcome once the effect returns
+                job.stop_requested = True
+                self._stop()
+            return job
+
+    def interrupt(self, restore=True):
+        """Drop every pending effect and abort the running one
+
+        Used for state changes (mute, unmute, off) that must take over the
+        strip immediately. The state change itself draws the new frame; with
+        ``restore`` the running effect also calls ``on_finished`` once it
+        stopped, so the state is drawn again after anything it drew.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == QUEUED:
+                    self._finish(job, INTERRUPTED)
+            if self._current is not None:
+                self._current.stop_requested = True
+                self._current.restore = self._current.restore or restore
+                self._stop()
+
+    def _trim_history(self):
+        while len(self._jobs) > self._history:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.finished:
+                break
+            self._jobs.popitem(last=False)
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        job.done.set()
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.finished:
+                    continue
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._current = job
+
+            status, error = COMPLETED, None
+            _running.job = job
+            try:
+                result = job.func(*job.args, **job.kwargs)
+                if getattr(result, "cancelled", False) or job.stop_requested:
+                    status = CANCELLED if job.cancel_requested else INTERRUPTED
+            except Exception as e:
+                logger.error(f"Error in effect '{job.name}': {e}")
+                status, error = FAILED, str(e)
+            finally:
+                _running.job = None
+
+            with self._lock:
+                self._current = None
+                self._finish(job, status, error)
+            logger.info(f"Effect '{job.name}' ({job.id}) {status}")
+
+            restore = status in (COMPLETED, CANCELLED) or (status == INTERRUPTED and job.restore)
+            if restore and self._on_finished:
+                try:
+                    self._on_finished(job)
+                except Exception as e:
+                    logger.error(f"Error restoring state after effect: {e}")
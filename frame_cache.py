@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Frame Cache for BlinkySign
+Keeps compiled effect frame sequences in wire format so repeated effects
+replay without any per-pixel work
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from render_engine import Animation
+import pixel_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+FRAME_CACHE_MAX_BYTES = int(os.getenv('FRAME_CACHE_MAX_BYTES', 8 * 1024 * 1024))  # 0 disables the cache
+
+class CompiledEffect:
+    """Every frame of an effect, concatenated in the strips' wire format
+
+    ``blobs`` maps each strip wire profile (byte order, brightness) to the
+    frames encoded for it, so strips with different settings share one
+    compiled effect.
+    """
+
+    def __init__(self, name, frame_size, blobs, final_pixels):
+        self.name = name
+        self.frame_size = frame_size
+        self.blobs = blobs
+        self.final_pixels = final_pixels
+
+    @property
+    def frames(self):
+        blob = next(iter(self.blobs.values()), b"")
+        return len(blob) // self.frame_size if self.frame_size else 0
+
+    @property
+    def nbytes(self):
+        return sum(len(blob) for blob in self.blobs.values())
+
+    def animation(self, source):
+        """Build an animation that replays these frames with ``source``'s timing"""
+        views = {profile: memoryview(blob) for profile, blob in self.blobs.items()}
+        size = self.frame_size
+        last = self.frames - 1
+
+        def draw(step, frame):
+            frame.wire = {profile: view[step * size:(step + 1) * size]
+                          for profile, view in views.items()}
+            if step == last:
+                # Leave the frame buffer describing what the strip shows
+                frame.pixels = pixel_pipeline.copy_frame(self.final_pixels)
+
+        animation = Animation(source.name, self.frames, source.step_time, draw)
+        animation.key = source.key
+        return animation
+
+class FrameCache:
+    """Memory-bounded LRU cache of compiled effects"""
+
+    def __init__(self, max_bytes=FRAME_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key):
+        """Return the compiled effect for ``key`` (or None), counting hits and misses"""
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+
+    def put(self, key, compiled):
+        """Store a compiled effect, evicting least recently used entries to fit"""
+        if compiled.nbytes > self.max_bytes:
+            logger.info(f"Compiled '{compiled.name}' ({compiled.nbytes} bytes) exceeds cache limit, not cached")
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= previous.nbytes
+            while self._entries and self.bytes_used + compiled.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= evicted.nbytes
+                self.evictions += 1
+            self._entries[key] = compiled
+            self.bytes_used += compiled.nbytes
+        return True
+
+    def clear(self):
+        """Drop every cached effect"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def stats(self):
+        """Return cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions
+            }
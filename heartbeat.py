@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Heartbeat for BlinkySign
+Adaptive MQTT heartbeat: skipped while other messages show the sign is
+alive, slower while the link is idle and healthy, and compact
+"""
+import os
+import json
+import time
+import zlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Heartbeat configuration
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', 60))  # Seconds between heartbeats while active
+HEARTBEAT_MAX_INTERVAL = float(os.getenv('HEARTBEAT_MAX_INTERVAL', 600))  # Longest interval once idle and healthy
+HEARTBEAT_SLOW_RTT_MS = float(os.getenv('HEARTBEAT_SLOW_RTT_MS', 1000))  # Publish round trip that counts as unhealthy
+HEARTBEAT_RETRY = 5.0  # Seconds before retrying a failed heartbeat
+
+def state_hash(state):
+    """Short, stable hash of a state dict (8 hex digits)"""
+    return format(zlib.crc32(json.dumps(state, sort_keys=True).encode('utf-8')), '08x')
+
+class AdaptiveHeartbeat:
+    """Sends a heartbeat only when nothing else has been published for a while
+
+    ``publish(payload)`` sends one heartbeat and should wait for the broker's
+    acknowledgement (QoS 1), so its duration is the publish round trip.
+    ``state()`` returns the current state. Other publishers call
+    ``note_publish()``; any publish within the current interval replaces the
+    heartbeat. The interval doubles after each heartbeat on a healthy, idle
+    link (no reconnect, fast round trip, same state) up to ``max_interval``
+    and drops back to ``interval`` on any change or failure.
+
+    Payload: ``seq``, ``up`` (uptime in seconds), ``sh`` (state hash),
+    ``rtt`` (last publish round trip in ms), ``rc`` (reconnects) and ``iv``
+    (the current interval in seconds).
+    """
+
+    def __init__(self, publish, state, interval=HEARTBEAT_INTERVAL, max_interval=HEARTBEAT_MAX_INTERVAL,
+                 slow_rtt_ms=HEARTBEAT_SLOW_RTT_MS):
+        self._publish = publish
+        self._state = state
+        self.base_interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.slow_rtt = slow_rtt_ms / 1000
+        self.interval = interval
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_activity = time.monotonic()
+        self._last_hash = None
+        self._reconnects_seen = 0
+        self.seq = 0
+        self.sent = 0
+        self.suppressed = 0
+        self.failed = 0
+        self.connects = 0
+        self.rtt = None
+        self._rtt_max = 0.0
+
+    @property
+    def reconnects(self):
+        return max(self.connects - 1, 0)
+
+    def note_publish(self):
+        """Another message went out; the next heartbeat can wait"""
+        with self._lock:
+            self._last_activity = time.monotonic()
+
+    def note_online(self):
+        """The MQTT connection came (back) up"""
+        with self._lock:
+            self.connects += 1
+            self.interval = self.base_interval
+        self._wake.set()
+
+    def note_offline(self):
+        """The MQTT connection dropped"""
+        with self._lock:
+            self.interval = self.base_interval
+        logger.warning("MQTT connection lost")
+
+    def _payload(self, state):
+        return json.dumps({
+            "seq": self.seq,
+            "up": int(time.monotonic() - self.started_at),
+            "sh": state_hash(state),
+            "rtt": round(self.rtt * 1000, 1) if self.rtt is not None else None,
+            "rc": self.reconnects,
+            "iv": int(self.interval)
+        }, separators=(',', ':'))
+
+    def beat(self):
+        """Send a heartbeat now and adapt the interval; returns False on failure"""
+        try:
+            state = self._state()
+            with self._lock:
+                self.seq += 1
+                payload = self._payload(state)
+            started = time.perf_counter()
+            self._publish(payload)
+            rtt = time.perf_counter() - started
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                self.interval = self.base_interval
+            logger.error(f"Error sending heartbeat: {e}")
+            return False
+
+        current_hash = state_hash(state)
+        with self._lock:
+            self.sent += 1
+            self.rtt = rtt
+            self._rtt_max = max(self._rtt_max, rtt)
+            self._last_activity = time.monotonic()
+            healthy = rtt < self.slow_rtt and self.reconnects == self._reconnects_seen
+            if healthy and current_hash == self._last_hash:
+                self.interval = min(self.interval * 2, self.max_interval)
+            else:
+                self.interval = self.base_interval
+            self._last_hash = current_hash
+            self._reconnects_seen = self.reconnects
+        return True
+
+    def run(self):
+        """Heartbeat loop (blocks; run it on a daemon thread)"""
+        while True:
+            with self._lock:
+                due = self._last_activity + self.interval
+            if self._wake.wait(max(due - time.monotonic(), 0)):
+                self._wake.clear()  # Reconnected: start over with the base interval
+                continue
+            with self._lock:
+                replaced = self._last_activity + self.interval > due
+                if replaced:
+                    # Another publish inside the interval already showed the sign is alive
+                    self.suppressed += 1
+            if not replaced and not self.beat():
+                time.sleep(HEARTBEAT_RETRY)
+
+    def stats(self):
+        """Return heartbeat and link statistics"""
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "suppressed": self.suppressed,
+                "failed": self.failed,
+                "interval_s": self.interval,
+                "reconnects": self.reconnects,
+                "publish_rtt_ms": {
+                    "last": round(self.rtt * 1000, 3) if self.rtt is not None else None,
+                    "max": round(self._rtt_max * 1000, 3)
+                }
+            }
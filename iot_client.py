@@ -8,9 +8,13 @@ import json
 import time
 import logging
 import threading
-from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTClient
 from dotenv import load_dotenv
-from led_controller import led_controller
+from led_client import led_client, LEDDaemonUnavailable
+from mqtt_dispatcher import MQTTDispatcher, PRIORITY_STATE, PRIORITY_EFFECT, SET, TOGGLE, OFF
+from state_publisher import StatePublisher
+from shadow_sync import ShadowSync
+from heartbeat import AdaptiveHeartbeat
+from mqtt_transport import create_client, MQTT_TRANSPORT, MQTT_TLS, MQTT_PORT
 
 # Load environment variables
 load_dotenv()
@@ -25,22 +29,74 @@ logger = logging.getLogger(__name__)
 # Configuration
 IOT_ENDPOINT = os.getenv('IOT_ENDPOINT')
 THING_NAME = os.getenv('IOT_THING_NAME', 'blinkysign')
+IOT_SYNC_MODE = os.getenv('IOT_SYNC_MODE', 'topics')  # "topics" (<thing>/state messages) or "shadow" (Device Shadow)
 
-# Current state
-current_state = {
-    "muted": False,
-    "led_on": False
-}
-
-def update_led_state():
-    """Update the LED based on current state"""
-    if current_state["muted"]:
-        led_controller.set_muted()
-        current_state["led_on"] = True
+# Callbacks run on the MQTT client's thread; they only parse and queue,
+# so a slow LED daemon call never holds up delivery of later messages
+dispatcher = MQTTDispatcher()
+
+def send_state(payload):
+    """Send one state message (called by the state publisher)"""
+    mqtt_client.publish(f"{THING_NAME}/state", payload, 0)
+    heartbeat.note_publish()
+
+def send_heartbeat(payload):
+    """Send one heartbeat; QoS 1 waits for the broker, which times the round trip"""
+    mqtt_client.publish(f"{THING_NAME}/heartbeat", payload, 1)
+
+# Heartbeats only go out when nothing else has been published for a while
+heartbeat = AdaptiveHeartbeat(send_heartbeat, lambda: led_client.status()["state"])
+
+# A burst of commands publishes only the final state
+state_publisher = StatePublisher(send_state)
+
+# Set in shadow mode, which reports state through the Device Shadow instead
+shadow_sync = None
+
+def publish_state(state):
+    """Publish the sign state reported by the LED daemon"""
+    if shadow_sync is None:
+        state_publisher.update(state)
+
+def set_muted(muted):
+    """Set the mute state (runs on the dispatcher)"""
+    response = led_client.set_muted(muted)
+    publish_state(response["state"])
+
+def toggle():
+    """Toggle the mute state (runs on the dispatcher)"""
+    response = led_client.toggle()
+    publish_state(response["state"])
+
+def turn_off():
+    """Turn the LEDs off (runs on the dispatcher)"""
+    response = led_client.off()
+    publish_state(response["state"])
+
+def start_effect(effect, payload):
+    """Queue an effect on the LED daemon (runs on the dispatcher)"""
+    # The daemon parses the parameters and plays the effect in the background,
+    # restoring the state afterwards
+    response = led_client.effect(effect, payload)
+    if response["status"] == "error":
+        logger.error(f"Effect rejected: {response['message']}")
+    publish_state(led_client.status()["state"])
+
+def publish_diagnostics():
+    """Publish detailed client statistics (runs on the dispatcher)"""
+    diagnostics = {
+        "timestamp": time.time(),
+        "dispatch": dispatcher.stats(),
+        "heartbeat": heartbeat.stats()
+    }
+    if hasattr(mqtt_client, "stats"):
+        diagnostics["transport"] = mqtt_client.stats()
+    if shadow_sync is None:
+        diagnostics["state_publisher"] = state_publisher.stats()
     else:
-        led_controller.set_unmuted()
-        current_state["led_on"] = True
-    logger.info(f"LED state updated: {'MUTED' if current_state['muted'] else 'UNMUTED'}")
+        diagnostics["shadow"] = shadow_sync.stats()
+    mqtt_client.publish(f"{THING_NAME}/diagnostics", json.dumps(diagnostics), 0)
+    heartbeat.note_publish()
 
 def status_callback(client, userdata, message):
     """Callback when status messages are received"""
@@ -49,15 +105,7 @@ def status_callback(client, userdata, message):
         logger.info(f"Received message: {payload}")
         
         if "muted" in payload:
-            current_state["muted"] = bool(payload["muted"])
-            update_led_state()
-            
-            # Publish state update
-            mqtt_client.publish(
-                f"{THING_NAME}/state",
-                json.dumps(current_state),
-                0
-            )
+            dispatcher.submit(SET, PRIORITY_STATE, set_muted, payload["muted"])
     except Exception as e:
         logger.error(f"Error processing message: {e}")
 
@@ -65,15 +113,7 @@ def toggle_callback(client, userdata, message):
     """Callback when toggle messages are received"""
     try:
         logger.info("Received toggle command")
-        current_state["muted"] = not current_state["muted"]
-        update_led_state()
-        
-        # Publish state update
-        mqtt_client.publish(
-            f"{THING_NAME}/state",
-            json.dumps(current_state),
-            0
-        )
+        dispatcher.submit(TOGGLE, PRIORITY_STATE, toggle)
     except Exception as e:
         logger.error(f"Error processing toggle: {e}")
 
@@ -85,42 +125,17 @@ def effect_callback(client, userdata, message):
         
         effect = payload.get("effect", "")
         
-        if effect == "rainbow":
-            led_controller.rainbow_cycle()
-        elif effect == "pulse":
-            color_name = payload.get("color", "blue").lower()
-            cycles = int(payload.get("cycles", 3))
-            
-            # Map color names to RGB values
-            color_map = {
-                "red": (255, 0, 0),
-                "green": (0, 255, 0),
-                "blue": (0, 0, 255),
-                "yellow": (255, 255, 0),
-                "purple": (128, 0, 128),
-                "cyan": (0, 255, 255),
-                "white": (255, 255, 255)
-            }
-            
-            rgb_color = color_map.get(color_name, (0, 0, 255))  # Default to blue
-            led_controller.pulse(rgb_color, cycles=cycles)
-        elif effect == "off":
-            led_controller.turn_off()
-            current_state["led_on"] = False
-        
-        # Return to normal state after effect (unless turned off)
-        if effect != "off":
-            update_led_state()
-        
-        # Publish state update
-        mqtt_client.publish(
-            f"{THING_NAME}/state",
-            json.dumps(current_state),
-            0
-        )
+        if effect == "off":
+            dispatcher.submit(OFF, PRIORITY_STATE, turn_off)
+        else:
+            dispatcher.submit(effect, PRIORITY_EFFECT, start_effect, effect, payload)
     except Exception as e:
         logger.error(f"Error processing effect: {e}")
 
+def diagnostics_callback(client, userdata, message):
+    """Callback when diagnostics are requested"""
+    dispatcher.submit("diagnostics", PRIORITY_EFFECT, publish_diagnostics)
+
 def download_root_ca():
     """Download Amazon Root CA certificate if it doesn't exist"""
     root_ca_path = "certs/AmazonRootCA1.pem"
@@ -143,76 +158,51 @@ def download_root_ca():
     return root_ca_path
 
 def connect_to_iot():
-    """Connect to AWS IoT Core"""
+    """Connect to AWS IoT Core (or a local broker)"""
     # Ensure we have the Amazon Root CA certificate
-    root_ca_path = download_root_ca()
+    credentials = None
+    if MQTT_TLS:
+        root_ca_path = download_root_ca()
+        credentials = (root_ca_path, "certs/private.key", "certs/certificate.pem")
     
-    # Initialize MQTT client
-    mqtt_client = AWSIoTMQTTClient(THING_NAME)
-    mqtt_client.configureEndpoint(IOT_ENDPOINT, 8883)
-    mqtt_client.configureCredentials(
-        root_ca_path,
-        "certs/private.key",
-        "certs/certificate.pem"
-    )
-    
-    # Configure MQTT client
-    mqtt_client.configureAutoReconnectBackoffTime(1, 32, 20)
-    mqtt_client.configureOfflinePublishQueueing(-1)
-    mqtt_client.configureDrainingFrequency(2)
-    mqtt_client.configureConnectDisconnectTimeout(10)
-    mqtt_client.configureMQTTOperationTimeout(5)
+    # Initialize MQTT client (MQTT_TRANSPORT selects the AWS IoT SDK or the asyncio client)
+    mqtt_client = create_client(THING_NAME, IOT_ENDPOINT, MQTT_PORT, credentials)
+    mqtt_client.onOnline = heartbeat.note_online
+    mqtt_client.onOffline = heartbeat.note_offline
     
     # Connect
-    logger.info(f"Connecting to AWS IoT Core at {IOT_ENDPOINT}...")
-    led_controller.set_connecting()  # Show connecting state
+    logger.info(f"Connecting to {IOT_ENDPOINT}:{MQTT_PORT} ({MQTT_TRANSPORT} transport)...")
+    led_client.indicate("connecting")  # Show connecting state
     mqtt_client.connect()
-    logger.info("Connected to AWS IoT Core")
+    logger.info(f"Connected to {IOT_ENDPOINT}")
     
     # Subscribe to topics
     mqtt_client.subscribe(f"{THING_NAME}/status", 1, status_callback)
     mqtt_client.subscribe(f"{THING_NAME}/toggle", 1, toggle_callback)
     mqtt_client.subscribe(f"{THING_NAME}/effect", 1, effect_callback)
+    mqtt_client.subscribe(f"{THING_NAME}/diagnostics/get", 1, diagnostics_callback)
     logger.info(f"Subscribed to {THING_NAME} topics")
     
-    # Publish initial state
-    mqtt_client.publish(
-        f"{THING_NAME}/state",
-        json.dumps(current_state),
-        0
-    )
-    
     return mqtt_client
 
-def heartbeat_task(mqtt_client):
-    """Send periodic heartbeat messages"""
-    while True:
-        try:
-            mqtt_client.publish(
-                f"{THING_NAME}/heartbeat",
-                json.dumps({
-                    "timestamp": time.time(),
-                    "state": current_state
-                }),
-                0
-            )
-            time.sleep(60)  # Send heartbeat every minute
-        except Exception as e:
-            logger.error(f"Error sending heartbeat: {e}")
-            time.sleep(5)  # Retry after 5 seconds on error
-
 if __name__ == "__main__":
     try:
-        # Connect to AWS IoT Core
+        # Connect to AWS IoT Core, then sync the shadow or publish the initial state
         mqtt_client = connect_to_iot()
+        if IOT_SYNC_MODE == "shadow":
+            shadow_sync = ShadowSync(mqtt_client, THING_NAME, dispatcher=dispatcher,
+                                     on_publish=heartbeat.note_publish)
+            shadow_sync.start()
+        else:
+            publish_state(led_client.status()["state"])
         
         # Start heartbeat thread
-        heartbeat_thread = threading.Thread(target=heartbeat_task, args=(mqtt_client,))
+        heartbeat_thread = threading.Thread(target=heartbeat.run, name="heartbeat")
         heartbeat_thread.daemon = True
         heartbeat_thread.start()
         
-        # Initial LED state
-        update_led_state()
+        # Back to the mute state after the connecting indicator
+        led_client.refresh()
         
         # Keep the main thread alive
         while True:
@@ -220,6 +210,12 @@ if __name__ == "__main__":
             
     except Exception as e:
         logger.error(f"Error: {e}")
-        led_controller.set_error()
-        time.sleep(2)
-        led_controller.turn_off()
\ No newline at end of file
+        try:
+            # Flash the error indicator, then leave the sign to the other front ends
+            led_client.indicate("error")
+            time.sleep(2)
+            led_client.refresh()
+        except LEDDaemonUnavailable:
+            pass
+    finally:
+        led_client.close()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+LED Backends for BlinkySign
+Pluggable strip drivers: real WS2812B strips over SPI, or an in-memory
+simulation for benchmarking and development without a Raspberry Pi
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Backend configuration
+LED_BACKEND = os.getenv('LED_BACKEND', 'spi')  # "spi" or "simulated"
+SIM_SPI_CLOCK = int(os.getenv('SIM_SPI_CLOCK', 6400000))  # Modeled SPI clock in Hz
+SIM_FRAME_HISTORY = int(os.getenv('SIM_FRAME_HISTORY', 1000))  # Frames kept per simulated strip
+SIM_REALTIME = os.getenv('SIM_REALTIME', 'true').lower() == 'true'  # Sleep for the modeled transfer time
+
+# SPI buses by name: (clock pin, MOSI pin) on the board
+SPI_BUSES = {
+    "spi0": ("SCK", "MOSI"),
+    "spi1": ("SCK_1", "MOSI_1")
+}
+
+# WS2812B over SPI: every data bit becomes one SPI byte, framed by 80us resets
+NEOPIXEL_RESET_TIME = 80e-6
+
+class SPIBackend:
+    """Drives WS2812B strips with neopixel_spi on the Pi's SPI buses"""
+
+    name = "spi"
+
+    def __init__(self):
+        self._buses = {}
+
+    def _open_bus(self, bus):
+        import board
+        import busio
+        if bus not in SPI_BUSES:
+            raise ValueError(f"Unknown SPI bus '{bus}' (expected one of {', '.join(SPI_BUSES)})")
+        if bus not in self._buses:
+            clock, mosi = SPI_BUSES[bus]
+            self._buses[bus] = busio.SPI(clock=getattr(board, clock), MOSI=getattr(board, mosi))
+        return self._buses[bus]
+
+    def _attach_chip_select(self, pixels, pin_name):
+        """Gate a strip behind an auxiliary chip-select pin on a shared bus"""
+        import board
+        import digitalio
+        chip_select = digitalio.DigitalInOut(getattr(board, pin_name))
+        chip_select.switch_to_output(value=True)
+        pixels._spi.chip_select = chip_select
+
+    def open_strip(self, config):
+        """Create the NeoPixel_SPI object for a strip"""
+        import neopixel_spi
+        pixels = neopixel_spi.NeoPixel_SPI(
+            self._open_bus(config.bus), config.length, brightness=config.brightness, auto_write=False
+        )
+        if config.chip_select:
+            self._attach_chip_select(pixels, config.chip_select)
+        return pixels
+
+    def close(self):
+        """Release every SPI bus opened so far"""
+        for bus, spi in self._buses.items():
+            try:
+                spi.deinit()
+            except Exception as e:
+                logger.error(f"Error releasing SPI bus {bus}: {e}")
+        self._buses = {}
+
+class SimulatedStrip:
+    """In-memory WS2812B strip that records every frame it is shown
+
+    Mirrors the parts of ``adafruit_pixelbuf.PixelBuf`` the controller uses
+    (GRB byte buffers, brightness, slice assignment) so the same fast paths
+    run as on hardware. ``show()`` models the SPI transfer time from the
+    number of bytes and the clock rate.
+    """
+
+    _byteorder = (1, 0, 2)  # GRB
+    bpp = 3
+    _offset = 0
+
+    def __init__(self, n, brightness=1.0, clock_hz=SIM_SPI_CLOCK, realtime=SIM_REALTIME,
+                 history=SIM_FRAME_HISTORY, name=None):
+        self.name = name
+        self._n = n
+        self._brightness = 1.0
+        self._pre_brightness_buffer = None
+        self._post_brightness_buffer = bytearray(n * 3)
+        self.clock_hz = clock_hz
+        self.realtime = realtime
+        self.frames = deque(maxlen=history)
+        self.shows = 0
+        self.bytes_sent = 0
+        self.transfer_time = 0.0
+        self.brightness = brightness
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, value):
+        value = min(max(value, 0.0), 1.0)
+        if self._pre_brightness_buffer is None:
+            self._pre_brightness_buffer = bytearray(self._post_brightness_buffer)
+        self._brightness = value
+        for i, byte in enumerate(self._pre_brightness_buffer):
+            self._post_brightness_buffer[i] = int(byte * value)
+
+    def _set_pixel(self, index, color):
+        r, g, b = color[:3]
+        offset = index * 3
+        for position, value in zip(self._byteorder, (r, g, b)):
+            if self._pre_brightness_buffer is not None:
+                self._pre_brightness_buffer[offset + position] = value
+            self._post_brightness_buffer[offset + position] = int(value * self._brightness)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            for i, color in zip(range(*index.indices(self._n)), value):
+                self._set_pixel(i, color)
+        else:
+            self._set_pixel(index, value)
+
+    def __getitem__(self, index):
+        buffer = self._pre_brightness_buffer
+        if buffer is None:
+            buffer = self._post_brightness_buffer
+        offset = index * 3
+        return tuple(buffer[offset + position] for position in self._byteorder)
+
+    def fill(self, color):
+        for i in range(self._n):
+            self._set_pixel(i, color)
+
+    def wire_time(self, nbytes=None):
+        """Modeled time to clock a frame of ``nbytes`` pixel bytes out over SPI"""
+        nbytes = len(self._post_brightness_buffer) if nbytes is None else nbytes
+        reset_bytes = round(self.clock_hz * NEOPIXEL_RESET_TIME / 8)
+        spi_bytes = nbytes * 8 + 2 * reset_bytes
+        return spi_bytes * 8 / self.clock_hz
+
+    def show(self):
+        """Record the frame and wait out the modeled transfer time"""
+        frame = bytes(self._post_brightness_buffer)
+        duration = self.wire_time(len(frame))
+        self.frames.append((time.monotonic(), frame))
+        self.shows += 1
+        self.bytes_sent += len(frame)
+        self.transfer_time += duration
+        if self.realtime:
+            time.sleep(duration)
+
+    def deinit(self):
+        self.fill((0, 0, 0))
+        self.show()
+
+class SimulatedBackend:
+    """Creates simulated strips instead of touching any hardware"""
+
+    name = "simulated"
+
+    def __init__(self, clock_hz=SIM_SPI_CLOCK, realtime=SIM_REALTIME):
+        self.clock_hz = clock_hz
+        self.realtime = realtime
+        self.strips = []
+        self._lock = threading.Lock()
+
+    def open_strip(self, config):
+        strip = SimulatedStrip(config.length, brightness=config.brightness, clock_hz=self.clock_hz,
+                               realtime=self.realtime, name=config.name)
+        with self._lock:
+            self.strips.append(strip)
+        return strip
+
+    def close(self):
+        """Nothing to release; recorded frames stay available for inspection"""
+
+BACKENDS = {
+    "spi": SPIBackend,
+    "simulated": SimulatedBackend
+}
+
+def get_backend(name=LED_BACKEND):
+    """Create a backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LED backend '{name}' (expected one of {', '.join(BACKENDS)})")
+    logger.info(f"Using '{name}' LED backend")
+    return BACKENDS[name]()
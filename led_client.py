@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+LED Client for BlinkySign
+Talks to the LED daemon over its Unix domain socket (line-delimited JSON)
+"""
+import os
+import json
+import socket
+import logging
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Client configuration
+LED_SOCKET = os.getenv('LED_SOCKET', '/tmp/blinkysign-led.sock')  # Must match the daemon
+LED_CLIENT_TIMEOUT = float(os.getenv('LED_CLIENT_TIMEOUT', 5.0))  # Seconds to wait for a response
+LED_STREAM_TIMEOUT = float(os.getenv('LED_STREAM_TIMEOUT', 60.0))  # Silence on a state stream before giving up
+
+# HTTP status for each daemon error code (used by the web front ends)
+HTTP_STATUS = {
+    "invalid": 400,
+    "not_found": 404,
+    "busy": 429
+}
+
+class LEDDaemonUnavailable(ConnectionError):
+    """Raised when the LED daemon cannot be reached"""
+
+class LEDClient:
+    """Persistent, thread-safe connection to the LED daemon
+
+    Requests and responses are single JSON lines. Responses keep the
+    daemon's ``{"status": ..., "message": ...}`` shape; failures carry a
+    ``code`` (``invalid``, ``not_found``, ``busy``, ``internal``).
+    """
+
+    def __init__(self, path=LED_SOCKET, timeout=LED_CLIENT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise LEDDaemonUnavailable(f"LED daemon not reachable at {self.path}: {e}")
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+
+    def close(self):
+        """Drop the connection (the next request reconnects)"""
+        with self._lock:
+            self._disconnect()
+
+    def _disconnect(self):
+        for resource in (self._file, self._sock):
+            try:
+                if resource is not None:
+                    resource.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._file = None
+
+    def _exchange(self, message):
+        self._file.write(message)
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionResetError("LED daemon closed the connection")
+        return json.loads(line)
+
+    def request(self, cmd, **params):
+        """Send one command and return the daemon's response"""
+        return self.send(cmd, params)
+
+    def send(self, cmd, params):
+        """Like request(), with the parameters as a dict (for arbitrary user-supplied fields)"""
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            params = {key: value for key, value in params.items() if value is not None}
+            message = json.dumps(dict(params, cmd=cmd, id=request_id)).encode('utf-8') + b"\n"
+
+            # A kept-alive connection may be stale after a daemon restart; retry once on a fresh one
+            reused = self._sock is not None
+            for attempt in range(2):
+                if self._sock is None:
+                    self._connect()
+                try:
+                    response = self._exchange(message)
+                    break
+                except (OSError, ValueError) as e:
+                    self._disconnect()
+                    if attempt or not reused:
+                        raise LEDDaemonUnavailable(f"LED daemon request '{cmd}' failed: {e}")
+                    logger.info("LED daemon connection lost, reconnecting")
+
+            if response.pop("id", request_id) != request_id:
+                self._disconnect()
+                raise LEDDaemonUnavailable("LED daemon response out of sequence")
+            return response
+
+    def subscribe(self):
+        """Yield state events from the daemon as they happen
+
+        Uses its own connection, so it can run alongside requests. The first
+        event is the current state. Raises LEDDaemonUnavailable when the
+        stream breaks.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+            sock.sendall(b'{"cmd": "subscribe"}\n')
+            sock.settimeout(LED_STREAM_TIMEOUT)
+            with sock.makefile("rb") as stream:
+                for line in stream:
+                    event = json.loads(line)
+                    if event.get("event") == "state":
+                        yield event
+            raise ConnectionResetError("LED daemon closed the state stream")
+        except (OSError, ValueError) as e:
+            raise LEDDaemonUnavailable(f"LED daemon state stream failed: {e}")
+        finally:
+            sock.close()
+
+    def status(self):
+        return self.request("status")
+
+    def toggle(self, pressed_at=None):
+        """Toggle the mute state; with ``pressed_at`` (a button press), respond once it is drawn"""
+        return self.request("toggle", pressed_at=pressed_at)
+
+    def set_muted(self, muted, pressed_at=None):
+        return self.request("set", muted=bool(muted), pressed_at=pressed_at)
+
+    def off(self):
+        return self.request("off")
+
+    def refresh(self):
+        return self.request("refresh")
+
+    def indicate(self, indicator):
+        """Show the "connecting" or "error" indicator"""
+        return self.request("indicate", indicator=indicator)
+
+    def effect(self, name, params=None, **kwargs):
+        """Queue an effect; parameters left out (or None) use the effect's defaults"""
+        params = dict(params or {}, **kwargs)
+        params["effect"] = name
+        return self.send("effect", params)
+
+    def effects(self):
+        return self.request("effects")
+
+    def effect_types(self):
+        return self.request("effect_types")
+
+    def batch(self, steps):
+        """Queue an ordered list of operations to run as one timeline"""
+        return self.request("batch", steps=steps)
+
+    def effect_status(self, effect_id, wait=None):
+        """Status of an effect; ``wait`` blocks up to that many seconds for it to finish"""
+        return self.request("effect_status", effect_id=effect_id, wait=wait)
+
+    def cancel_effect(self, effect_id):
+        return self.request("cancel_effect", effect_id=effect_id)
+
+    def metrics(self):
+        return self.request("metrics")
+
+# Shared client for this process
+led_client = LEDClient()
@@ -2,14 +2,25 @@
 """
 LED Controller for BlinkySign
 Controls WS2812B LED strips connected to Raspberry Pi using SPI interface
+(or simulated strips, see led_backends.py)
 """
 import os
 import time
 import logging
-import board
-import busio
-import neopixel_spi
+import threading
+
+# Reference point for the startup timing report
+_IMPORT_STARTED = time.perf_counter()
+
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from strip_topology import load_topology
+from led_backends import get_backend
+from render_engine import RenderEngine, Animation, FrameBuffer
+from frame_cache import FrameCache, CompiledEffect
+from effect_runner import current_job
+import pixel_pipeline
+from pixel_pipeline import wheel
 
 # Load environment variables
 load_dotenv()
@@ -21,7 +32,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# LED Configuration
+# LED Configuration (defaults for the single-strip topology, see strip_topology.py)
 LED_COUNT = int(os.getenv('LED_COUNT', 30))  # Number of LED pixels per strip
 LED_BRIGHTNESS = float(os.getenv('LED_BRIGHTNESS', 0.5))  # Brightness (0.0 to 1.0)
 
@@ -41,48 +52,295 @@ UNMUTED_COLOR = GREEN
 CONNECTING_COLOR = BLUE
 ERROR_COLOR = YELLOW
 
+def _process_age():
+    """Seconds since this process started (Linux only), or None"""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces; fields resume after ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+
 class LEDController:
     """Controller for WS2812B LED strips using SPI interface"""
     
-    def __init__(self):
-        """Initialize LED strips using SPI"""
+    def __init__(self, topology=None, backend=None):
+        """Prepare the controller; the strips are opened on first draw or by open()"""
+        self.backend = backend or get_backend()
+        self.topology = topology or load_topology()
         self.strips = []
+        self.strip_configs = []
         self.active_strips = 0
+        self.is_open = False
+        self._open_lock = threading.Lock()
+        self._bus_groups = {}
+        self._push_pool = None
+        self._created_at = time.perf_counter()
+        self._timings = {}
         
-        # Try to initialize SPI bus
-        try:
-            # Initialize main SPI bus
-            spi = busio.SPI(clock=board.SCK, MOSI=board.MOSI)
-            
-            # Create NeoPixel_SPI object
-            pixels = neopixel_spi.NeoPixel_SPI(
-                spi, LED_COUNT, brightness=LED_BRIGHTNESS, auto_write=False
-            )
+        # All frames reach the strips through the render engine
+        frame_size = max((config.length for config in self.topology), default=LED_COUNT)
+        self.engine = RenderEngine(self._push_frame, frame_size)
+        self.frame_cache = FrameCache()
+        self._reset_counters()
+    
+    def _reset_counters(self):
+        # Last output sent to each strip, used to skip redundant transfers
+        count = len(self.strips)
+        self._last_pushed = [None] * count
+        self.transfers_sent = [0] * count
+        self.transfers_skipped = [0] * count
+        self._push_last = [0.0] * count
+        self._push_max = [0.0] * count
+        self._push_total = [0.0] * count
+    
+    def open(self):
+        """Open the LED strips and their SPI buses (does nothing if already open)"""
+        with self._open_lock:
+            if self.is_open:
+                return
+            started = time.perf_counter()
+            strips, configs = [], []
             
-            self.strips.append(pixels)
-            self.active_strips += 1
-            logger.info("SPI NeoPixel strip initialized")
+            for config in self.topology:
+                # Try to initialize the strip (and its SPI bus the first time it is used)
+                try:
+                    strips.append(self.backend.open_strip(config))
+                    configs.append(config)
+                    logger.info(f"NeoPixel strip '{config.name}' initialized on {config.bus} "
+                                f"({config.length} LEDs, {self.backend.name} backend)")
+                except Exception as e:
+                    logger.error(f"Failed to initialize LED strip '{config.name}': {e}")
             
-            # Additional strips could be added here if multiple SPI buses are available
-            # For now, we'll use a single strip as demonstrated in boardtest.py
+            # Strips on different buses are pushed in parallel, strips sharing a bus in order
+            bus_groups = {}
+            for index, config in enumerate(configs):
+                bus_groups.setdefault(config.bus, []).append(index)
+            if len(bus_groups) > 1:
+                self._push_pool = ThreadPoolExecutor(max_workers=len(bus_groups),
+                                                     thread_name_prefix="strip-push")
             
-        except Exception as e:
-            logger.error(f"Failed to initialize LED strip: {e}")
+            self.strips = strips
+            self.strip_configs = configs
+            self.active_strips = len(strips)
+            self._bus_groups = bus_groups
+            self._reset_counters()
+            self.is_open = True
+            self._timings.setdefault("open_ms", (time.perf_counter() - started) * 1000)
+            logger.info(f"Initialized {self.active_strips} LED strips")
+    
+    def close(self):
+        """Stop any animation and release the strips and SPI buses"""
+        with self.engine.lock:
+            self.engine.stop()
+            with self._open_lock:
+                if not self.is_open:
+                    return
+                if self._push_pool is not None:
+                    self._push_pool.shutdown(wait=True)
+                    self._push_pool = None
+                try:
+                    self.backend.close()
+                except Exception as e:
+                    logger.error(f"Error closing LED backend: {e}")
+                self.strips = []
+                self.strip_configs = []
+                self.active_strips = 0
+                self._bus_groups = {}
+                self._reset_counters()
+                self.is_open = False
+        logger.info("LED strips closed")
+    
+    def startup_report(self):
+        """Startup timings: import, strip open and time to the first frame"""
+        report = {
+            "import_ms": round((_IMPORT_FINISHED - _IMPORT_STARTED) * 1000, 3),
+            "open": self.is_open
+        }
+        for name, value in self._timings.items():
+            report[name] = round(value, 3)
+        if _PROCESS_AGE_AT_IMPORT is not None:
+            # Interpreter startup and earlier imports, 10 ms resolution
+            report["process_age_at_import_ms"] = round(_PROCESS_AGE_AT_IMPORT * 1000, 3)
+        return report
+    
+    def _push_strip(self, index, frame):
+        """Write a frame into one strip and send it if its output changed"""
+        strip = self.strips[index]
+        config = self.strip_configs[index]
+        start = time.perf_counter()
+        if frame.wire is not None:
+            pixel_pipeline.write_wire(strip, frame.wire[self._wire_profile(index)])
+        else:
+            brightness = config.brightness if frame.brightness is None else frame.brightness
+            pixel_pipeline.write_frame(strip, frame.pixels, brightness)
+        
+        output = pixel_pipeline.output_bytes(strip)
+        if output is not None and output == self._last_pushed[index]:
+            self.transfers_skipped[index] += 1
+            return
+        pixel_pipeline.show(strip)
+        self._last_pushed[index] = output
+        self.transfers_sent[index] += 1
         
-        logger.info(f"Initialized {self.active_strips} LED strips")
+        elapsed = time.perf_counter() - start
+        self._push_last[index] = elapsed
+        self._push_max[index] = max(self._push_max[index], elapsed)
+        self._push_total[index] += elapsed
+    
+    def _push_bus(self, indexes, frame):
+        """Push the strips sharing one bus, one after another"""
+        for index in indexes:
+            self._push_strip(index, frame)
+    
+    def _push_frame(self, frame):
+        """Push a rendered frame to every strip whose output changed"""
+        self.open()
+        if "first_frame_ms" not in self._timings:
+            self._timings["first_frame_ms"] = (time.perf_counter() - _IMPORT_STARTED) * 1000
+            logger.info(f"First frame {self._timings['first_frame_ms']:.1f} ms after import")
+        if self._push_pool is None:
+            self._push_bus(range(len(self.strips)), frame)
+            return
+        futures = [self._push_pool.submit(self._push_bus, indexes, frame)
+                   for indexes in self._bus_groups.values()]
+        for future in futures:
+            future.result()
+    
+    def invalidate(self):
+        """Forget what the strips show so the next frame is always sent"""
+        with self.engine.lock:
+            self._last_pushed = [None] * len(self.strips)
+    
+    def transfer_stats(self):
+        """Get strip transfer counts (sent and skipped because nothing changed) and push latency"""
+        with self.engine.lock:
+            sent = sum(self.transfers_sent)
+            skipped = sum(self.transfers_skipped)
+            total = sent + skipped
+            per_strip = []
+            for index, config in enumerate(self.strip_configs):
+                pushes = self.transfers_sent[index] or 1
+                per_strip.append({
+                    "strip": index,
+                    "name": config.name,
+                    "bus": config.bus,
+                    "length": config.length,
+                    "sent": self.transfers_sent[index],
+                    "skipped": self.transfers_skipped[index],
+                    "push_ms": {
+                        "last": round(self._push_last[index] * 1000, 3),
+                        "avg": round(self._push_total[index] / pushes * 1000, 3),
+                        "max": round(self._push_max[index] * 1000, 3)
+                    }
+                })
+            return {
+                "sent": sent,
+                "skipped": skipped,
+                "skip_ratio": round(skipped / total, 3) if total else 0.0,
+                "parallel_buses": len(self._bus_groups),
+                "per_strip": per_strip
+            }
+    
+    def _wire_profile(self, index):
+        """Wire byte order and brightness of a strip, or None if it can't take wire frames"""
+        order = pixel_pipeline.wire_order(self.strips[index])
+        if order is None:
+            return None
+        return (order, self.strip_configs[index].brightness)
+    
+    def _wire_profiles(self):
+        """Distinct wire profiles of all strips, or None if frames can't be precompiled"""
+        profiles = [self._wire_profile(index) for index in range(len(self.strips))]
+        if not profiles or None in profiles:
+            return None
+        return tuple(sorted(set(profiles)))
+    
+    def _compile(self, animation, profiles, background):
+        """Render every step of an animation into one wire-format blob per strip profile"""
+        frame = FrameBuffer(self.engine.frame.size)
+        if background is not None:
+            frame.pixels = background
+        blobs = {profile: bytearray() for profile in profiles}
+        for step in range(animation.steps):
+            animation.draw(step, frame)
+            for (order, brightness), blob in blobs.items():
+                if frame.brightness is not None:
+                    brightness = frame.brightness
+                blob += pixel_pipeline.to_wire(frame.pixels, order, brightness)
+        frame_size = frame.size * 3
+        return CompiledEffect(animation.name, frame_size,
+                              {profile: bytes(blob) for profile, blob in blobs.items()},
+                              frame.pixels)
+    
+    def _precompiled(self, animation):
+        """Swap an animation for a cached replay of its compiled frames"""
+        self.open()
+        profiles = self._wire_profiles()
+        if animation.key is None or not animation.steps or profiles is None or not self.frame_cache.enabled:
+            return animation
+        
+        key = animation.key + (self.engine.frame.size, profiles)
+        background = None
+        if animation.uses_background:
+            with self.engine.lock:
+                background = pixel_pipeline.copy_frame(self.engine.frame.pixels)
+            key += (pixel_pipeline.frame_bytes(background),)
+        
+        compiled = self.frame_cache.get(key)
+        if compiled is None:
+            compiled = self._compile(animation, profiles, background)
+            self.frame_cache.put(key, compiled)
+            logger.info(f"Compiled '{animation.name}' into {compiled.frames} frames ({compiled.nbytes} bytes)")
+        return compiled.animation(animation)
+    
+    def _play(self, animation, token=None):
+        """Play an animation on the render engine and wait for it to end
+
+        ``token`` (by default the effect runner job running this effect) is
+        checked under the engine lock right before playing, so a stop that
+        arrived while the animation was being compiled is not lost.
+        """
+        token = token or current_job()
+        animation = self._precompiled(animation)
+        with self.engine.lock:
+            if token is not None and token.stop_requested:
+                animation.cancelled = True
+                animation.done.set()
+                logger.info(f"Animation '{animation.name}' stopped before it started")
+                return animation
+            self.engine.play(animation)
+        animation.wait()
+        return animation
+    
+    def render_stats(self):
+        """Get render loop statistics (FPS, dropped frames, timings)"""
+        stats = self.engine.stats()
+        stats["pixel_pipeline"] = pixel_pipeline.BACKEND
+        stats["backend"] = self.backend.name
+        return stats
+    
+    def cache_stats(self):
+        """Get compiled effect cache statistics (hits, misses, bytes used)"""
+        return self.frame_cache.stats()
     
     def set_all_strips(self, color):
         """Set all strips to the same color"""
-        for strip in self.strips:
-            strip.fill(color)
-            strip.show()
+        self.engine.show(color)
         logger.info(f"All strips set to color: {color}")
     
     def set_strip(self, strip_index, color):
         """Set a specific strip to a color"""
+        self.open()
         if 0 <= strip_index < len(self.strips):
-            self.strips[strip_index].fill(color)
-            self.strips[strip_index].show()
+            with self.engine.lock:
+                self.engine.stop()
+                self.strips[strip_index].fill(color)
+                self.strips[strip_index].show()
+                self._last_pushed[strip_index] = pixel_pipeline.output_bytes(self.strips[strip_index])
             logger.info(f"Strip {strip_index} set to color: {color}")
         else:
             logger.error(f"Invalid strip index: {strip_index}")
@@ -112,82 +370,58 @@ class LEDController:
         self.set_all_strips(OFF)
         logger.info("All LEDs turned off")
     
+    def hold(self, duration):
+        """Keep the current frame for ``duration`` seconds (a pause that can be interrupted)"""
+        return self._play(Animation("hold", 1, duration, lambda step, frame: None))
+    
     def rainbow_cycle(self, wait=0.01):
         """Rainbow cycle animation across all strips"""
-        def wheel(pos):
-            # Generate rainbow colors across 0-255 positions
-            if pos < 85:
-                return (pos * 3, 255 - pos * 3, 0)
-            elif pos < 170:
-                pos -= 85
-                return (255 - pos * 3, 0, pos * 3)
-            else:
-                pos -= 170
-                return (0, pos * 3, 255 - pos * 3)
-        
-        for j in range(255):
-            for strip in self.strips:
-                for i in range(len(strip)):
-                    strip[i] = wheel((i + j) & 255)
-                strip.show()
-            time.sleep(wait)
+        def draw(step, frame):
+            frame.pixels = pixel_pipeline.rainbow_frame(step, frame.size)
+        
+        return self._play(Animation("rainbow", 255, wait, draw, key=("rainbow",)))
     
     def theater_chase(self, color, wait=0.05, iterations=10):
         """Movie theater light style chaser animation."""
-        for j in range(iterations):
-            for q in range(3):
-                for i in range(0, LED_COUNT, 3):
-                    if i + q < LED_COUNT:
-                        for strip in self.strips:
-                            strip[i + q] = color
-                
-                for strip in self.strips:
-                    strip.show()
-                    
-                time.sleep(wait)
-                
-                for i in range(0, LED_COUNT, 3):
-                    if i + q < LED_COUNT:
-                        for strip in self.strips:
-                            strip[i + q] = OFF
+        color = tuple(color)
+        
+        def draw(step, frame):
+            frame.pixels = pixel_pipeline.chase_frame(step, frame.size, color)
+        
+        return self._play(Animation("theater", iterations * 3, wait, draw,
+                                    key=("theater", color, iterations)))
     
     def color_wipe(self, color, wait=0.05):
         """Fill the dots one after the other with a color."""
-        for i in range(LED_COUNT):
-            for strip in self.strips:
-                strip[i] = color
-                strip.show()
-            time.sleep(wait)
+        color = tuple(color)
+        
+        def draw(step, frame):
+            # Pixels past the wipe keep whatever the frame showed before
+            pixel_pipeline.fill_range(frame.pixels, step + 1, color)
+        
+        return self._play(Animation("wipe", self.engine.frame.size, wait, draw,
+                                    key=("wipe", color), uses_background=True))
     
     def pulse(self, color, cycles=3, duration=1.0):
         """Pulse effect on all strips"""
         steps = 50
-        for _ in range(cycles):
-            # Fade in
-            for i in range(steps):
-                brightness = i / steps
-                for strip in self.strips:
-                    strip.brightness = brightness
-                    strip.fill(color)
-                    strip.show()
-                time.sleep(duration / (2 * steps))
-            
-            # Fade out
-            for i in range(steps, 0, -1):
-                brightness = i / steps
-                for strip in self.strips:
-                    strip.brightness = brightness
-                    strip.fill(color)
-                    strip.show()
-                time.sleep(duration / (2 * steps))
-        
-        # Reset brightness
-        for strip in self.strips:
-            strip.brightness = LED_BRIGHTNESS
+        color = tuple(color)
+        
+        def draw(step, frame):
+            # Fade in over the first half of each cycle, fade out over the second
+            i = step % (2 * steps)
+            frame.brightness = i / steps if i < steps else (2 * steps - i) / steps
+            frame.fill(color)
+        
+        return self._play(Animation("pulse", cycles * 2 * steps, duration / (2 * steps), draw,
+                                    key=("pulse", color, cycles)))
 
-# Singleton instance
+# Singleton instance (cheap: no hardware is touched until the first draw)
 led_controller = LEDController()
 
+_IMPORT_FINISHED = time.perf_counter()
+_PROCESS_AGE_AT_IMPORT = _process_age()
+
 # Test function
 if __name__ == "__main__":
     try:
@@ -238,4 +472,6 @@ if __name__ == "__main__":
         logger.error(f"Test error: {e}")
         led_controller.set_error()
         time.sleep(2)
-        led_controller.turn_off()
\ No newline at end of file
+        led_controller.turn_off()
+    finally:
+        led_controller.close()
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+LED Daemon for BlinkySign
+Owns the LED strips and the authoritative mute state, and serves every front
+end (web API, MQTT client) over a local Unix domain socket
+"""
+import os
+import sys
+import json
+import time
+import queue
+import uuid
+import signal
+import socket
+import logging
+import threading
+import socketserver
+from collections import deque
+from dotenv import load_dotenv
+from led_controller import led_controller
+from effect_runner import EffectRunner, EffectJob, RunnerFull
+from command_queue import CommandQueue
+from effect_registry import EffectError, get_effect, EFFECTS
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Daemon configuration
+LED_SOCKET = os.getenv('LED_SOCKET', '/tmp/blinkysign-led.sock')  # Unix socket the front ends connect to
+LED_SOCKET_MODE = int(os.getenv('LED_SOCKET_MODE', '660'), 8)  # Socket file permissions
+LED_STREAM_KEEPALIVE = float(os.getenv('LED_STREAM_KEEPALIVE', 15))  # Seconds between keepalives on idle state streams
+LED_STREAM_BACKLOG = 16  # Undelivered events kept per state stream (oldest dropped first)
+BATCH_MAX_STEPS = int(os.getenv('BATCH_MAX_STEPS', 50))  # Longest accepted batch
+BATCH_MAX_PAUSE = 60.0  # Longest single pause step in seconds
+EFFECT_MAX_WAIT = 600.0  # Longest a request may block waiting for an effect to finish
+PRESS_SAMPLES = 256  # Recent press-to-photon latencies kept for metrics
+
+class CommandError(Exception):
+    """A request the daemon cannot carry out
+
+    ``code`` tells the front end what went wrong: ``invalid``, ``not_found``,
+    ``busy`` or ``internal``.
+    """
+
+    def __init__(self, message, code="invalid"):
+        super().__init__(message)
+        self.code = code
+
+class LEDDaemon:
+    """Single owner of the LED controller and the mute state
+
+    Every state change goes through ``handle()`` under one lock, so commands
+    from all front ends are applied in the order they arrive. The state is
+    updated right away, while drawing it goes through a CommandQueue: a
+    burst of toggles from several front ends draws only the final state.
+    """
+
+    def __init__(self, controller=led_controller):
+        self.controller = controller
+        self.state = {
+            "muted": False,
+            "led_on": False
+        }
+        self._lock = threading.RLock()
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.clients = 0
+        # State version, counted per daemon instance so clients can tell a restart apart
+        self.instance = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._broadcast_state = dict(self.state)
+        self._subscribers = []
+        self.presses = 0
+        self.press_latency = deque(maxlen=PRESS_SAMPLES)
+
+        # Effects run in the background so commands never wait on an animation
+        self.effects = EffectRunner(controller.engine.stop, on_finished=self._restore)
+        self.display = CommandQueue(self._draw)
+
+        self.commands = {
+            "ping": self.ping,
+            "status": self.status,
+            "toggle": self.toggle,
+            "set": self.set_muted,
+            "off": self.turn_off,
+            "refresh": self.refresh,
+            "indicate": self.indicate,
+            "effect": self.start_effect,
+            "batch": self.start_batch,
+            "effects": self.list_effects,
+            "effect_types": self.effect_types,
+            "effect_status": self.effect_status,
+            "cancel_effect": self.cancel_effect,
+            "metrics": self.metrics
+        }
+
+    def handle(self, request):
+        """Run one request and build its response"""
+        response = {}
+        try:
+            if not isinstance(request, dict):
+                raise CommandError("Request must be a JSON object")
+            command = self.commands.get(request.get("cmd"))
+            if command is None:
+                raise CommandError(f"Unknown command: {request.get('cmd')}")
+            response = command(request)
+        except CommandError as e:
+            response = {"status": "error", "message": str(e), "code": e.code}
+        except Exception as e:
+            logger.error(f"Error handling {request}: {e}")
+            response = {"status": "error", "message": str(e), "code": "internal"}
+
+        with self._lock:
+            self.requests += 1
+            if response.get("status") == "error":
+                self.errors += 1
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def _draw(self, state):
+        """Show a state snapshot on the strips (runs on the command queue)"""
+        if not state["led_on"]:
+            self.controller.turn_off()
+        elif state["muted"]:
+            self.controller.set_muted()
+        else:
+            self.controller.set_unmuted()
+
+    def _state_event(self):
+        return {
+            "event": "state",
+            "instance": self.instance,
+            "version": self.version,
+            "ts": time.time(),
+            "state": dict(self.state)
+        }
+
+    def _broadcast(self):
+        """Push the state to every state stream if it changed (caller holds the lock)"""
+        if self.state == self._broadcast_state:
+            return
+        self.version += 1
+        self._broadcast_state = dict(self.state)
+        event = self._state_event()
+        for stream in self._subscribers:
+            try:
+                stream.put_nowait(event)
+            except queue.Full:
+                # A slow reader only needs the newest state
+                stream.get_nowait()
+                stream.put_nowait(event)
+
+    def subscribe(self):
+        """Register a state stream, primed with the current state"""
+        stream = queue.Queue(maxsize=LED_STREAM_BACKLOG)
+        with self._lock:
+            stream.put_nowait(self._state_event())
+            self._subscribers.append(stream)
+        return stream
+
+    def unsubscribe(self, stream):
+        with self._lock:
+            if stream in self._subscribers:
+                self._subscribers.remove(stream)
+
+    def update_led_state(self):
+        """Update the LED based on current state"""
+        with self._lock:
+            self.state["led_on"] = True
+            self.display.submit(dict(self.state))
+            self._broadcast()
+        logger.info(f"LED state updated: {'MUTED' if self.state['muted'] else 'UNMUTED'}")
+
+    def _restore(self, job):
+        """Return to the normal state after an effect
+
+        Every effect (and batch) ends with one render of the current state,
+        including off: an effect started while the LEDs were off must not
+        stay lit on its last frame, and one interrupted by a state change may
+        have drawn over the frame the state change drew.
+        """
+        with self._lock:
+            self.display.submit(dict(self.state))
+            # Draw before the runner starts the next effect, or the draw would cancel it
+            self.display.barrier(lambda: None)
+
+    def _state_response(self, message):
+        return {
+            "status": "success",
+            "message": message,
+            "state": dict(self.state)
+        }
+
+    def ping(self, request):
+        return {"status": "success", "message": "pong"}
+
+    def status(self, request):
+        with self._lock:
+            return {
+                "status": "success",
+                "state": dict(self.state),
+                "instance": self.instance,
+                "version": self.version
+            }
+
+    def _pressed_at(self, request):
+        """The ``pressed_at`` of a button press (time.monotonic() in the button's process), or None"""
+        pressed_at = request.get("pressed_at")
+        if pressed_at is not None and (isinstance(pressed_at, bool) or not isinstance(pressed_at, (int, float))):
+            raise CommandError("'pressed_at' must be a number")
+        return pressed_at
+
+    def _press_drawn(self, pressed_at, response):
+        """Draw a button press right away and report its press-to-photon latency
+
+        The monotonic clock is shared by every process on the machine, so the
+        latency runs from the button's GPIO edge to the frame leaving the strip.
+        """
+        self.display.barrier()
+        latency = time.monotonic() - pressed_at
+        if latency >= 0:
+            with self._lock:
+                self.presses += 1
+                self.press_latency.append(latency)
+            response["press_to_photon_ms"] = round(latency * 1000, 3)
+        return response
+
+    def toggle(self, request):
+        pressed_at = self._pressed_at(request)
+        with self._lock:
+            self.state["muted"] = not self.state["muted"]
+            self.effects.interrupt()
+            self.update_led_state()
+            response = self._state_response(f"Mute toggled to {'muted' if self.state['muted'] else 'unmuted'}")
+        if pressed_at is not None:
+            return self._press_drawn(pressed_at, response)
+        return response
+
+    def set_muted(self, request):
+        if "muted" not in request:
+            raise CommandError("Expected a 'muted' field")
+        pressed_at = self._pressed_at(request)
+        with self._lock:
+            self.state["muted"] = bool(request["muted"])
+            self.effects.interrupt()
+            self.update_led_state()
+            response = self._state_response(f"Status set to {'muted' if self.state['muted'] else 'unmuted'}")
+        if pressed_at is not None:
+            return self._press_drawn(pressed_at, response)
+        return response
+
+    def turn_off(self, request):
+        with self._lock:
+            self.effects.interrupt()
+            self.state["led_on"] = False
+            self.display.submit(dict(self.state))
+            self._broadcast()
+            return self._state_response("LEDs turned off")
+
+    def refresh(self, request):
+        """Redraw the current state, e.g. after an indicator was shown"""
+        with self._lock:
+            if self.state["led_on"]:
+                self.update_led_state()
+            return self._state_response("LED state refreshed")
+
+    def indicate(self, request):
+        """Show a connecting or error indicator without changing the mute state"""
+        indicators = {
+            "connecting": self.controller.set_connecting,
+            "error": self.controller.set_error
+        }
+        indicator = indicators.get(request.get("indicator"))
+        if indicator is None:
+            raise CommandError(f"Unknown indicator: {request.get('indicator')}")
+        with self._lock:
+            # The indicator stays up until the next state change, so nothing is restored over it
+            self.effects.interrupt(restore=False)
+            self.display.barrier(indicator)
+        return {"status": "success", "message": f"Showing {request['indicator']} indicator"}
+
+    def _effect_call(self, request):
+        """Resolve an effect request to (name, controller method, args, kwargs)"""
+        name = request.get("effect")
+        spec = get_effect(name)
+        if spec is None:
+            raise CommandError(f"Unknown effect: {name}")
+        try:
+            func, args, kwargs = spec.bind(self.controller, request)
+        except EffectError as e:
+            raise CommandError(str(e))
+        return name, func, args, kwargs
+
+    def _queue_job(self, job):
+        """Hand a job to the effect runner"""
+        try:
+            # Draw any pending state first so it cannot cancel the effect later
+            with self._lock:
+                return self.display.barrier(lambda: self.effects.enqueue(job))
+        except RunnerFull as e:
+            raise CommandError(f"Too many effects queued: {e}", code="busy")
+
+    def start_effect(self, request):
+        """Queue an effect on the background runner"""
+        name, func, args, kwargs = self._effect_call(request)
+        job = self._queue_job(EffectJob(name, func, args, kwargs))
+        return {
+            "status": "accepted",
+            "message": f"{name.capitalize()} effect queued",
+            "effect": job.to_dict()
+        }
+
+    def _batch_step(self, step):
+        """Validate one batch step and return (op, argument)"""
+        if not isinstance(step, dict):
+            raise CommandError("Each step must be a JSON object")
+        op = step.get("op")
+        if op == "set":
+            if "muted" not in step:
+                raise CommandError("Expected a 'muted' field")
+            return op, bool(step["muted"])
+        if op in ("toggle", "off"):
+            return op, None
+        if op == "effect":
+            return op, self._effect_call(step)
+        if op == "pause":
+            try:
+                seconds = float(step.get("seconds"))
+            except (TypeError, ValueError):
+                raise CommandError("'seconds' must be a number")
+            if not 0 < seconds <= BATCH_MAX_PAUSE:
+                raise CommandError(f"'seconds' must be between 0 and {BATCH_MAX_PAUSE:g}")
+            return op, seconds
+        raise CommandError(f"Unknown operation: {op}")
+
+    def start_batch(self, request):
+        """Queue an ordered list of operations as one timeline on the effect runner
+
+        Every step is validated before anything runs. State steps update the
+        state (and state streams) without drawing, effects play back to back,
+        and the strips are drawn once at the end.
+        """
+        steps = request.get("steps")
+        if not isinstance(steps, list) or not steps:
+            raise CommandError("Expected a non-empty 'steps' list")
+        if len(steps) > BATCH_MAX_STEPS:
+            raise CommandError(f"A batch can have at most {BATCH_MAX_STEPS} steps")
+
+        plan, errors = [], []
+        for index, step in enumerate(steps):
+            try:
+                plan.append(self._batch_step(step))
+            except CommandError as e:
+                errors.append({"step": index, "message": str(e)})
+        if errors:
+            return {
+                "status": "error",
+                "message": f"{len(errors)} invalid step(s), nothing was run",
+                "code": "invalid",
+                "errors": errors
+            }
+
+        job = EffectJob("batch", self._run_batch, (), {})
+        job.args = (job, plan)
+        job.steps = [{"op": op, "status": "pending"} for op, _ in plan]
+        job = self._queue_job(job)
+        return {
+            "status": "accepted",
+            "message": f"Batch of {len(plan)} steps queued",
+            "effect": job.to_dict()
+        }
+
+    def _run_batch(self, job, plan):
+        """Play a batch timeline (runs on the effect runner thread)
+
+        Stops at the first step that was cancelled or interrupted; the runner
+        then reports the whole batch as cancelled or interrupted.
+        """
+        pending_draw = False
+        for index, (op, argument) in enumerate(plan):
+            result = job.steps[index]
+            with self._lock:
+                # Checked under the lock so a step never overrides a newer state change
+                if job.stop_requested:
+                    for skipped in job.steps[index:]:
+                        skipped["status"] = "skipped"
+                    return None
+                result["status"] = "running"
+                result["started_at"] = time.time()
+                if op in ("set", "toggle", "off"):
+                    if op == "off":
+                        self.state["led_on"] = False
+                    else:
+                        self.state["muted"] = argument if op == "set" else not self.state["muted"]
+                        self.state["led_on"] = True
+                    self._broadcast()
+                    result["state"] = dict(self.state)
+                    pending_draw = True
+
+            animation = None
+            if op == "pause":
+                if pending_draw:
+                    # Show the state reached so far for the length of the pause
+                    with self._lock:
+                        self.display.submit(dict(self.state))
+                        self.display.barrier(lambda: None)
+                    pending_draw = False
+                animation = self.controller.hold(argument)
+            elif op == "effect":
+                _, func, args, kwargs = argument
+                animation = func(*args, **kwargs)
+                pending_draw = False
+
+            result["finished_at"] = time.time()
+            if getattr(animation, "cancelled", False):
+                result["status"] = "cancelled"
+                for skipped in job.steps[index + 1:]:
+                    skipped["status"] = "skipped"
+                return animation
+            result["status"] = "completed"
+        return None
+
+    def list_effects(self, request):
+        return {
+            "status": "success",
+            "effects": [job.to_dict() for job in self.effects.jobs()]
+        }
+
+    def effect_types(self, request):
+        """Effects that can be started, with their parameters"""
+        return {
+            "status": "success",
+            "effects": [spec.describe() for spec in EFFECTS.values()]
+        }
+
+    def effect_status(self, request):
+        """Status of an effect; ``wait`` blocks up to that many seconds for it to finish"""
+        job = self.effects.get(request.get("effect_id"))
+        if job is None:
+            raise CommandError(f"Unknown effect: {request.get('effect_id')}", code="not_found")
+        if request.get("wait"):
+            try:
+                job.done.wait(min(float(request["wait"]), EFFECT_MAX_WAIT))
+            except (TypeError, ValueError):
+                raise CommandError("'wait' must be a number")
+        return {"status": "success", "effect": job.to_dict()}
+
+    def cancel_effect(self, request):
+        effect_id = request.get("effect_id")
+        job = self.effects.cancel(effect_id)
+        if job is None:
+            raise CommandError(f"Unknown effect: {effect_id}", code="not_found")
+        return {
+            "status": "success",
+            "message": f"Cancel requested for effect {effect_id}",
+            "effect": job.to_dict()
+        }
+
+    def daemon_stats(self):
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started_at, 3),
+                "clients": self.clients,
+                "subscribers": len(self._subscribers),
+                "state_version": self.version,
+                "requests": self.requests,
+                "errors": self.errors
+            }
+
+    def press_stats(self):
+        """Press-to-photon latency of recent button presses"""
+        with self._lock:
+            samples = sorted(self.press_latency)
+            last = self.press_latency[-1] if self.press_latency else None
+            presses = self.presses
+        if not samples:
+            return {"presses": presses}
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000, 3)
+
+        return {
+            "presses": presses,
+            "last_ms": round(last * 1000, 3),
+            "p50_ms": percentile(50),
+            "p99_ms": percentile(99),
+            "max_ms": round(samples[-1] * 1000, 3)
+        }
+
+    def metrics(self, request):
+        """Performance metrics for the LED pipeline"""
+        return {
+            "status": "success",
+            "metrics": {
+                "render": self.controller.render_stats(),
+                "frame_cache": self.controller.cache_stats(),
+                "transfers": self.controller.transfer_stats(),
+                "startup": self.controller.startup_report(),
+                "commands": self.display.stats(),
+                "press_to_photon": self.press_stats(),
+                "daemon": self.daemon_stats()
+            }
+        }
+
+class _ClientHandler(socketserver.StreamRequestHandler):
+    """One front-end connection: a JSON request per line, a JSON response per line
+
+    A ``subscribe`` request turns the connection into a state stream: the
+    daemon sends the current state, then one event line per state change
+    (and a keepalive line when idle) until the client disconnects.
+    """
+
+    def handle(self):
+        daemon = self.server.led_daemon
+        with daemon._lock:
+            daemon.clients += 1
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"status": "error", "message": "Malformed JSON", "code": "invalid"}
+                else:
+                    if isinstance(request, dict) and request.get("cmd") == "subscribe":
+                        self._stream(daemon)
+                        return
+                    response = daemon.handle(request)
+                self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with daemon._lock:
+                daemon.clients -= 1
+
+    def _stream(self, daemon):
+        stream = daemon.subscribe()
+        try:
+            while True:
+                try:
+                    event = stream.get(timeout=LED_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    event = {"event": "keepalive"}
+                self.wfile.write(json.dumps(event).encode('utf-8') + b"\n")
+        finally:
+            daemon.unsubscribe(stream)
+
+class LEDServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server for an LEDDaemon"""
+
+    daemon_threads = True
+
+    def __init__(self, path, led_daemon, mode=LED_SOCKET_MODE):
+        self.led_daemon = led_daemon
+        _remove_stale_socket(path)
+        super().__init__(path, _ClientHandler)
+        os.chmod(path, mode)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+def _remove_stale_socket(path):
+    """Delete a socket file left behind by a daemon that is no longer running"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"Another LED daemon is already listening on {path}")
+
+def _exit_on_sigterm(signum, frame):
+    # systemd stops services with SIGTERM; exit through the normal cleanup path
+    sys.exit(0)
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    daemon = LEDDaemon()
+    server = None
+    try:
+        # Show connecting state until the socket is ready
+        led_controller.set_connecting()
+        server = LEDServer(LED_SOCKET, daemon)
+        daemon.update_led_state()
+        logger.info(f"LED daemon listening on {LED_SOCKET}")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("LED daemon stopped")
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        led_controller.set_error()
+        time.sleep(2)
+        led_controller.turn_off()
+    finally:
+        if server is not None:
+            server.server_close()
+        led_controller.close()
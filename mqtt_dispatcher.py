@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+MQTT Dispatcher for BlinkySign
+Runs the work for incoming MQTT messages on a worker thread, most urgent
+first, so the MQTT client's callback thread only parses and queues
+"""
+import os
+import time
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Dispatcher configuration
+MQTT_QUEUE_MAX = int(os.getenv('MQTT_QUEUE_MAX', 100))  # Messages waiting before new effects (or redundant state changes) are dropped
+
+# State messages (by iot_client's names) that can be folded together when the queue is full
+SET, TOGGLE, OFF = "set", "toggle", "off"
+
+# Priorities (lower runs first)
+PRIORITY_STATE = 0  # Mute, unmute, toggle, off
+PRIORITY_EFFECT = 1
+
+class _Timing:
+    """Last, average and maximum of a duration"""
+
+    def __init__(self):
+        self.count = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.last = seconds
+        self.max = max(self.max, seconds)
+        self.total += seconds
+
+    def to_dict(self):
+        return {
+            "last": round(self.last * 1000, 3),
+            "avg": round(self.total / (self.count or 1) * 1000, 3),
+            "max": round(self.max * 1000, 3)
+        }
+
+class MQTTDispatcher:
+    """Bounded priority queue of message handlers with one worker thread
+
+    State changes run before effects, and messages of the same priority run
+    in arrival order. A state change also drops effects queued before it,
+    since the LED daemon would interrupt them anyway. When the queue is full
+    a new effect is dropped. A new state change makes room by removing the
+    queued ones it makes redundant (see ``_collapse``), so the sign still
+    ends in the state all of them lead to; if none are, it is dropped.
+    """
+
+    def __init__(self, max_pending=MQTT_QUEUE_MAX):
+        self.max_pending = max_pending
+        self._heap = []
+        self._cond = threading.Condition()
+        self._sequence = 0
+        self._busy = False
+        self.max_depth = 0
+        self.submitted = 0
+        self.executed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.superseded = 0
+        self._wait = {PRIORITY_STATE: _Timing(), PRIORITY_EFFECT: _Timing()}
+        self._run_time = {PRIORITY_STATE: _Timing(), PRIORITY_EFFECT: _Timing()}
+        self._thread = threading.Thread(target=self._run, name="mqtt-dispatch")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, name, priority, func, *args):
+        """Queue ``func(*args)``; returns False if the message was dropped"""
+        with self._cond:
+            self._sequence += 1
+            self.submitted += 1
+            if priority == PRIORITY_STATE:
+                kept = [item for item in self._heap if item[0] == PRIORITY_STATE]
+                self.superseded += len(self._heap) - len(kept)
+                if len(kept) != len(self._heap):
+                    self._heap = kept
+                    heapq.heapify(self._heap)
+            if len(self._heap) >= self.max_pending:
+                if priority == PRIORITY_STATE:
+                    # Only state changes are left; fold them rather than lose one
+                    if not self._collapse(name):
+                        self.dropped += 1
+                        logger.warning(f"MQTT queue full, dropping '{name}'")
+                        return False
+                else:
+                    evicted = max(self._heap)
+                    if evicted[0] <= priority:
+                        self.dropped += 1
+                        logger.warning(f"MQTT queue full, dropping '{name}'")
+                        return False
+                    self._heap.remove(evicted)
+                    heapq.heapify(self._heap)
+                    self.dropped += 1
+                    logger.warning(f"MQTT queue full, dropping '{evicted[3]}'")
+            heapq.heappush(self._heap, (priority, self._sequence, time.perf_counter(), name, func, args))
+            self.max_depth = max(self.max_depth, len(self._heap))
+            self._cond.notify()
+            return True
+
+    def _collapse(self, name):
+        """Remove queued state changes that ``name`` makes redundant; returns how many
+
+        A set decides both the mute state and that the LEDs are on, so every
+        queued set, toggle and off before it is redundant. An off only
+        replaces earlier offs. A toggle lets two queued toggles cancel out if
+        no set (or other state change) lies between them: an off between
+        them is fine, since the new toggle turns the LEDs on again anyway.
+        """
+        queued = sorted(self._heap)
+        if name == SET:
+            redundant = [item for item in queued if item[3] in (SET, TOGGLE, OFF)]
+        elif name == OFF:
+            redundant = [item for item in queued if item[3] == OFF]
+        elif name == TOGGLE:
+            redundant, first = [], None
+            for item in queued:
+                if item[3] == TOGGLE:
+                    if first is not None:
+                        redundant = [first, item]
+                        break
+                    first = item
+                elif item[3] != OFF:
+                    first = None
+        else:
+            redundant = []
+        if redundant:
+            self._heap = [item for item in self._heap if item not in redundant]
+            heapq.heapify(self._heap)
+            self.superseded += len(redundant)
+        return len(redundant)
+
+    def join(self, timeout=None):
+        """Wait until every queued message has run; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                priority, _, queued_at, name, func, args = heapq.heappop(self._heap)
+                self._busy = True
+            started = time.perf_counter()
+            try:
+                func(*args)
+                failed = False
+            except Exception as e:
+                logger.error(f"Error handling '{name}': {e}")
+                failed = True
+            finished = time.perf_counter()
+            with self._cond:
+                self._busy = False
+                self.executed += 1
+                self.failed += failed
+                self._wait[priority].add(started - queued_at)
+                self._run_time[priority].add(finished - started)
+                self._cond.notify_all()
+
+    def stats(self):
+        """Return queue depth, drop counts and queue wait versus run time per priority"""
+        with self._cond:
+            return {
+                "depth": len(self._heap),
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "executed": self.executed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "superseded": self.superseded,
+                "wait_ms": {
+                    "state": self._wait[PRIORITY_STATE].to_dict(),
+                    "effect": self._wait[PRIORITY_EFFECT].to_dict()
+                },
+                "run_ms": {
+                    "state": self._run_time[PRIORITY_STATE].to_dict(),
+                    "effect": self._run_time[PRIORITY_EFFECT].to_dict()
+                }
+            }
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+MQTT Transport for BlinkySign
+Creates the MQTT client used by iot_client: the AWS IoT SDK client, or
+paho-mqtt driven by an asyncio event loop with a persistent session, a
+bounded offline queue and a configurable inflight window
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Transport configuration
+MQTT_TRANSPORT = os.getenv('MQTT_TRANSPORT', 'awsiot')  # "awsiot" (AWSIoTPythonSDK) or "asyncio" (paho-mqtt on an event loop)
+MQTT_PORT = int(os.getenv('MQTT_PORT', 8883))  # Broker port (8883 for AWS IoT, 1883 for a local broker)
+MQTT_TLS = os.getenv('MQTT_TLS', 'true').lower() == 'true'  # false for a local broker without certificates
+MQTT_CLEAN_SESSION = os.getenv('MQTT_CLEAN_SESSION', 'false').lower() == 'true'  # false keeps subscriptions and QoS 1 messages across reconnects
+MQTT_OFFLINE_QUEUE = int(os.getenv('MQTT_OFFLINE_QUEUE', 100))  # Publishes kept while offline
+MQTT_OFFLINE_DROP = os.getenv('MQTT_OFFLINE_DROP', 'oldest')  # Which publish to drop when the offline queue is full: oldest or newest
+MQTT_INFLIGHT = int(os.getenv('MQTT_INFLIGHT', 20))  # QoS 1 publishes awaiting an acknowledgement (asyncio transport)
+MQTT_KEEPALIVE = 30  # Seconds between MQTT pings on an idle connection
+MQTT_OPERATION_TIMEOUT = 5  # Seconds to wait for a QoS 1 acknowledgement
+MQTT_CONNECT_TIMEOUT = 10  # Seconds to wait for the broker to accept a connection
+MQTT_BACKOFF_MIN = 1.0  # First reconnect delay in seconds
+MQTT_BACKOFF_MAX = 32.0  # Longest reconnect delay in seconds
+
+DROP_POLICIES = ("oldest", "newest")
+
+def create_client(client_id, endpoint, port=MQTT_PORT, credentials=None, transport=MQTT_TRANSPORT):
+    """Return an unconnected MQTT client for ``transport``
+
+    ``credentials`` is ``(root_ca, private_key, certificate)`` for TLS, or
+    None for a plain connection. Both clients offer ``connect()``,
+    ``disconnect()``, ``publish(topic, payload, qos)``, ``subscribe(topic,
+    qos, callback)`` and the ``onOnline``/``onOffline`` hooks of
+    AWSIoTMQTTClient.
+    """
+    if MQTT_OFFLINE_DROP not in DROP_POLICIES:
+        raise ValueError(f"MQTT_OFFLINE_DROP must be one of {', '.join(DROP_POLICIES)}")
+    if transport == "awsiot":
+        return _aws_client(client_id, endpoint, port, credentials)
+    if transport == "asyncio":
+        return AsyncMQTTClient(client_id, endpoint, port, credentials)
+    raise ValueError(f"Unknown MQTT transport: {transport}")
+
+def _aws_client(client_id, endpoint, port, credentials):
+    """AWSIoTMQTTClient with the same session and offline queue settings"""
+    from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTClient, DROP_OLDEST, DROP_NEWEST
+    client = AWSIoTMQTTClient(client_id, cleanSession=MQTT_CLEAN_SESSION)
+    client.configureEndpoint(endpoint, port)
+    if credentials is not None:
+        client.configureCredentials(*credentials)
+    client.configureAutoReconnectBackoffTime(int(MQTT_BACKOFF_MIN), int(MQTT_BACKOFF_MAX), 20)
+    client.configureOfflinePublishQueueing(
+        MQTT_OFFLINE_QUEUE, DROP_OLDEST if MQTT_OFFLINE_DROP == "oldest" else DROP_NEWEST)
+    client.configureDrainingFrequency(2)
+    client.configureConnectDisconnectTimeout(MQTT_CONNECT_TIMEOUT)
+    client.configureMQTTOperationTimeout(MQTT_OPERATION_TIMEOUT)
+    return client
+
+class AsyncMQTTClient:
+    """paho-mqtt client run by an asyncio event loop on its own thread
+
+    The loop watches the socket (paho's external event loop hooks), keeps
+    the connection alive and reconnects with jittered exponential backoff.
+    The session is persistent unless ``MQTT_CLEAN_SESSION`` is set: the
+    broker keeps subscriptions and QoS 1 messages for the sign while it is
+    away. Publishes made while offline wait in a queue of at most
+    ``offline_queue`` messages; when it is full, the oldest (or the newest)
+    is dropped. At most ``inflight`` QoS 1 publishes await an
+    acknowledgement at once, later ones wait in paho's queue. A QoS 1
+    ``publish`` called from another thread blocks until the broker's
+    acknowledgement, like AWSIoTMQTTClient. Subscription callbacks run on
+    the event loop thread and must not block.
+    """
+
+    def __init__(self, client_id, endpoint, port=MQTT_PORT, credentials=None, clean_session=MQTT_CLEAN_SESSION,
+                 offline_queue=MQTT_OFFLINE_QUEUE, drop=MQTT_OFFLINE_DROP, inflight=MQTT_INFLIGHT):
+        try:
+            import paho.mqtt.client as mqtt
+        except ImportError:
+            raise RuntimeError("paho-mqtt is required for MQTT_TRANSPORT=asyncio (pip install paho-mqtt)")
+        if drop not in DROP_POLICIES:
+            raise ValueError(f"drop must be one of {', '.join(DROP_POLICIES)}")
+        self._mqtt = mqtt
+        self.endpoint = endpoint
+        self.port = port
+        self.drop = drop
+        self.onOnline = None
+        self.onOffline = None
+        self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id,
+                                   clean_session=clean_session, protocol=mqtt.MQTTv311)
+        if credentials is not None:
+            root_ca, private_key, certificate = credentials
+            self._client.tls_set(ca_certs=root_ca, certfile=certificate, keyfile=private_key)
+        self._client.max_inflight_messages_set(inflight)
+        self._client.max_queued_messages_set(offline_queue)
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+        self._client.on_publish = self._on_publish
+        self._client.on_socket_open = self._on_socket_open
+        self._client.on_socket_close = self._on_socket_close
+        self._client.on_socket_register_write = self._on_socket_register_write
+        self._client.on_socket_unregister_write = self._on_socket_unregister_write
+
+        self._lock = threading.RLock()
+        self._offline = deque()
+        self._offline_max = offline_queue
+        self._subscriptions = {}
+        self._sent_at = {}
+        self._early_acks = set()
+        self._publishing = 0
+        self._connected = threading.Event()
+        self._closing = False
+        self._loop = None
+        self._thread = None
+        self._wake = None
+        self._misc = None
+        self.connects = 0
+        self.published = 0
+        self.acked = 0
+        self.queued_offline = 0
+        self.dropped = 0
+        self.resumed_sessions = 0
+        self._ack_total = 0.0
+        self._ack_max = 0.0
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    @property
+    def reconnects(self):
+        return max(self.connects - 1, 0)
+
+    def connect(self, timeout=MQTT_CONNECT_TIMEOUT):
+        """Start the event loop and wait for the first connection; returns True"""
+        if self._thread is None:
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,), name="mqtt-loop")
+            self._thread.daemon = True
+            self._thread.start()
+            ready.wait()
+        if not self._connected.wait(timeout):
+            raise TimeoutError(f"No connection to {self.endpoint}:{self.port} after {timeout} seconds")
+        return True
+
+    def disconnect(self):
+        """Disconnect cleanly and stop the event loop"""
+        if self._loop is None:
+            return True
+        self._closing = True
+
+        def close():
+            self._client.disconnect()
+            self._wake.set()
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(close)
+            self._thread.join(MQTT_CONNECT_TIMEOUT)
+        return True
+
+    def subscribe(self, topic, qos, callback):
+        """Subscribe now (or on the next connection); ``callback(client, userdata, message)``"""
+        with self._lock:
+            self._subscriptions[topic] = (qos, callback)
+        self._client.message_callback_add(topic, lambda client, userdata, message: callback(self, userdata, message))
+        if self.connected:
+            self._client.subscribe(topic, qos)
+        return True
+
+    def publish(self, topic, payload, qos):
+        """Publish, or queue while offline; returns False if the message was queued or dropped
+
+        Called from any thread but the event loop's, a QoS 1 publish waits
+        for the broker's acknowledgement.
+        """
+        info = self._send(topic, payload, qos)
+        if info is None:
+            return False
+        if qos > 0 and threading.current_thread() is not self._thread:
+            info.wait_for_publish(MQTT_OPERATION_TIMEOUT)
+            if not info.is_published():
+                raise TimeoutError(f"No acknowledgement for {topic} after {MQTT_OPERATION_TIMEOUT} seconds")
+        return True
+
+    def publishAsync(self, topic, payload, qos, ackCallback=None):
+        """Publish without waiting; ``ackCallback(mid)`` runs on the acknowledgement
+
+        Returns the message id, or None if the message was queued offline or dropped.
+        """
+        info = self._send(topic, payload, qos, ackCallback)
+        return info.mid if info is not None else None
+
+    def _send(self, topic, payload, qos, on_ack=None):
+        with self._lock:
+            if not self.connected:
+                self._enqueue_offline((topic, payload, qos))
+                return None
+            self._publishing += 1
+        sent_at = time.perf_counter()
+        try:
+            info = self._client.publish(topic, payload, qos)
+        except Exception:
+            with self._lock:
+                self._publishing -= 1
+            raise
+        with self._lock:
+            self._publishing -= 1
+            # The acknowledgement may already have arrived on the event loop
+            early = info.mid in self._early_acks
+            self._early_acks.discard(info.mid)
+            if info.rc == self._mqtt.MQTT_ERR_QUEUE_SIZE:
+                self.dropped += 1
+                logger.warning(f"MQTT publish queue full; dropped a message for {topic}")
+                return None
+            self.published += 1
+            if qos == 0:
+                return info
+            if early:
+                self._record_ack(sent_at)
+            else:
+                self._sent_at[info.mid] = (sent_at, on_ack)
+        if early and on_ack is not None:
+            on_ack(info.mid)
+        return info
+
+    def _enqueue_offline(self, message):
+        """Queue a publish until the next connection (caller holds the lock)"""
+        if len(self._offline) >= self._offline_max:
+            self.dropped += 1
+            if self.drop == "newest" or not self._offline:
+                return
+            self._offline.popleft()
+        self._offline.append(message)
+        self.queued_offline += 1
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wake = asyncio.Event()
+        ready.set()
+        try:
+            self._loop.run_until_complete(self._maintain())
+        finally:
+            self._loop.close()
+
+    async def _maintain(self):
+        """Connect, then reconnect with backoff whenever the connection drops"""
+        delay = MQTT_BACKOFF_MIN
+        while not self._closing:
+            self._wake.clear()
+            try:
+                await self._loop.run_in_executor(None, self._client.connect, self.endpoint, self.port, MQTT_KEEPALIVE)
+            except OSError as e:
+                logger.error(f"MQTT connection to {self.endpoint}:{self.port} failed: {e}")
+            else:
+                # Wait for CONNACK, then for the connection to drop
+                try:
+                    await asyncio.wait_for(self._wake.wait(), MQTT_CONNECT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.error(f"No CONNACK from {self.endpoint}:{self.port}")
+                    self._client.disconnect()
+                if self.connected:
+                    delay = MQTT_BACKOFF_MIN
+                    self._wake.clear()
+                    await self._wake.wait()
+            if self._closing:
+                break
+            # Spread reconnects out so a broker restart is not met by every client at once
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay * random.uniform(0.5, 1.0))
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, MQTT_BACKOFF_MAX)
+
+    async def _misc_loop(self):
+        """Keepalive pings and retries (paho's periodic housekeeping)"""
+        while self._client.loop_misc() == self._mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+    def _on_loop(self, func, *args):
+        """Run ``func`` on the event loop thread (socket hooks may fire on others)"""
+        if threading.current_thread() is self._thread:
+            func(*args)
+        else:
+            self._loop.call_soon_threadsafe(func, *args)
+
+    def _on_socket_open(self, client, userdata, sock):
+        def register():
+            self._loop.add_reader(sock, client.loop_read)
+            self._misc = self._loop.create_task(self._misc_loop())
+        self._on_loop(register)
+
+    def _on_socket_close(self, client, userdata, sock):
+        def unregister():
+            self._loop.remove_reader(sock)
+            self._loop.remove_writer(sock)
+            if self._misc is not None:
+                self._misc.cancel()
+        self._on_loop(unregister)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._on_loop(self._loop.add_writer, sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._on_loop(self._loop.remove_writer, sock)
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            logger.error(f"MQTT connection refused: {reason_code}")
+            self._wake.set()
+            return
+        with self._lock:
+            self.connects += 1
+            if flags.session_present:
+                self.resumed_sessions += 1
+            else:
+                for topic, (qos, _) in self._subscriptions.items():
+                    client.subscribe(topic, qos)
+            self._connected.set()
+            # Send the offline queue before any new publish can overtake it
+            offline = list(self._offline)
+            self._offline.clear()
+            for topic, payload, qos in offline:
+                self._send(topic, payload, qos)
+        logger.info(f"MQTT connected to {self.endpoint}:{self.port} (session {'resumed' if flags.session_present else 'new'}, "
+                    f"{len(offline)} queued messages sent)")
+        self._wake.set()
+        if self.onOnline is not None:
+            self.onOnline()
+
+    def _on_disconnect(self, client, userdata, disconnect_flags, reason_code, properties):
+        was_connected = self.connected
+        self._connected.clear()
+        self._wake.set()
+        if was_connected and self.onOffline is not None:
+            self.onOffline()
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        with self._lock:
+            sent_at, on_ack = self._sent_at.pop(mid, (None, None))
+            if sent_at is not None:
+                self._record_ack(sent_at)
+            elif self._publishing:
+                self._early_acks.add(mid)
+        if on_ack is not None:
+            on_ack(mid)
+
+    def _record_ack(self, sent_at):
+        elapsed = time.perf_counter() - sent_at
+        self.acked += 1
+        self._ack_total += elapsed
+        self._ack_max = max(self._ack_max, elapsed)
+
+    def stats(self):
+        """Return connection, queue and acknowledgement statistics"""
+        with self._lock:
+            return {
+                "connected": self.connected,
+                "reconnects": self.reconnects,
+                "resumed_sessions": self.resumed_sessions,
+                "published": self.published,
+                "acked": self.acked,
+                "inflight": len(self._sent_at),
+                "offline_queue": len(self._offline),
+                "queued_offline": self.queued_offline,
+                "dropped": self.dropped,
+                "ack_ms": {
+                    "mean": round(self._ack_total / self.acked * 1000, 3) if self.acked else None,
+                    "max": round(self._ack_max * 1000, 3)
+                }
+            }
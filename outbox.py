@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Outbox for BlinkySign
+Durable queue (SQLite in WAL mode) for button actions that could not reach
+the sign. Kept actions are sent in order once it is reachable again, with
+toggles collapsed into the net mute state
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Outbox configuration
+BUTTON_OUTBOX = os.path.expanduser(os.getenv('BUTTON_OUTBOX', '~/.blinkysign'))  # Directory of the outboxes (empty: drop actions)
+BUTTON_OUTBOX_MAX = int(os.getenv('BUTTON_OUTBOX_MAX', 100))  # Kept actions before the oldest is dropped
+BUTTON_OUTBOX_MAX_AGE = float(os.getenv('BUTTON_OUTBOX_MAX_AGE', 3600))  # Seconds before a kept action is stale (0: never)
+BUTTON_OUTBOX_RETRY = float(os.getenv('BUTTON_OUTBOX_RETRY', 5.0))  # Seconds between delivery attempts while offline
+
+# Actions that change the mute state; they collapse into one entry
+STATE_ACTIONS = ("toggle", "mute", "unmute")
+
+# Actions that do no harm if the sign already carried them out
+REPEATABLE_ACTIONS = ("mute", "unmute", "off")
+
+class Undelivered(Exception):
+    """An action could not reach the sign and should be kept for later"""
+
+def outbox_path(client, directory=BUTTON_OUTBOX):
+    """The outbox file of one client (each client sends its own actions), or None if outboxes are off"""
+    if not directory:
+        return None
+    return os.path.join(os.path.expanduser(directory), f"{client}.outbox.db")
+
+class Outbox:
+    """Button actions kept on disk until the sign can be reached
+
+    ``submit(action, send)`` sends right away unless earlier actions are
+    still waiting; ``send(action)`` returns once the sign has answered (an
+    answer that rejects the action counts too) or raises Undelivered. Kept
+    actions survive restarts and are sent oldest first by ``start()``'s
+    thread, which the first ``submit`` starts with its ``send`` unless it
+    is already running.
+
+    Instead of one row per press, toggle, mute and unmute share a single
+    entry for the net mute state: ``mute``/``unmute`` if one is waiting
+    (toggles after it flip it), otherwise a toggle only if an odd number
+    are waiting. As a toggle also turns the LEDs on, toggles only cancel out
+    while no ``off`` is waiting. A toggle is never turned into a state the sign last
+    reported, since another client may have changed it since. ``off`` and
+    each effect keep only
+    their latest press. A collapsed entry moves to the position of its
+    latest press. The outbox holds at most ``max_entries`` actions, and
+    drops actions older than ``max_age`` seconds rather than replay them.
+    """
+
+    def __init__(self, path, max_entries=BUTTON_OUTBOX_MAX, max_age=BUTTON_OUTBOX_MAX_AGE,
+                 retry=BUTTON_OUTBOX_RETRY):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.retry = retry
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")  # A press is on disk once add() returns
+        self._db.execute("""CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            action TEXT NOT NULL,
+            muted INTEGER,
+            presses INTEGER NOT NULL,
+            created REAL NOT NULL,
+            updated REAL NOT NULL)""")
+        self._lock = threading.Lock()
+        self._sending = None
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        self.presses = 0
+        self.delivered = 0
+        self.expired = 0
+        self.dropped = 0
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._db.close()
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def entries(self):
+        """The kept actions, oldest first"""
+        with self._lock:
+            rows = self._db.execute("SELECT action, muted, presses, created, updated FROM outbox ORDER BY id").fetchall()
+        return [{"action": self._resolve(action, muted), "presses": presses, "created": created, "updated": updated}
+                for action, muted, presses, created, updated in rows]
+
+    def add(self, action, at=None):
+        """Keep ``action`` (toggle, mute, unmute, off or effect:<name>) for later"""
+        at = time.time() if at is None else at
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._add(action, at)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self.presses += 1
+
+    def _add(self, action, at):
+        if action in STATE_ACTIONS:
+            row = self._db.execute("SELECT id, muted, presses, created FROM outbox WHERE kind = 'state' "
+                                   "ORDER BY id DESC LIMIT 1").fetchone()
+        else:
+            row = self._db.execute("SELECT id, muted, presses, created FROM outbox WHERE kind = 'command' "
+                                   "AND action = ? ORDER BY id DESC LIMIT 1", (action,)).fetchone()
+        # The entry being sent right now is left alone; the new one goes after it
+        replace = row is not None and row[0] != self._sending
+        if replace and action == "toggle" and row[1] is None and self._off_queued():
+            # Toggles also turn the LEDs on, so with an off waiting two of them do not cancel out.
+            # A third in a row still leaves the same net flip as the first.
+            earlier = self._db.execute("SELECT id, action FROM outbox WHERE kind = 'state' AND id < ? "
+                                       "ORDER BY id DESC LIMIT 1", (row[0],)).fetchone()
+            if (earlier is not None and earlier[1] == "toggle" and earlier[0] != self._sending
+                    and not self._off_queued(after=earlier[0])):
+                self._db.execute("DELETE FROM outbox WHERE id = ?", (row[0],))
+                self._db.execute("UPDATE outbox SET presses = presses + ?, updated = ? WHERE id = ?",
+                                 (row[2] + 1, at, earlier[0]))
+                return
+            replace = False
+        presses, created = (row[2] + 1, row[3]) if replace else (1, at)
+        if replace:
+            self._db.execute("DELETE FROM outbox WHERE id = ?", (row[0],))
+
+        kind, muted = "state" if action in STATE_ACTIONS else "command", None
+        if action in ("mute", "unmute"):
+            action, muted = "set", action == "mute"
+        elif action == "toggle":
+            if row is not None and row[1] is not None:
+                action, muted = "set", not row[1]
+            elif row is not None and replace:
+                return  # Two toggles cancel out
+        self._db.execute("INSERT INTO outbox (kind, action, muted, presses, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                         (kind, action, muted, presses, created, at))
+
+        count = self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        if count > self.max_entries:
+            removed = self._db.execute("DELETE FROM outbox WHERE id IN (SELECT id FROM outbox WHERE id IS NOT ? "
+                                       "ORDER BY id LIMIT ?)", (self._sending, count - self.max_entries)).rowcount
+            self.dropped += removed
+            logger.warning(f"Outbox full, dropped the {removed} oldest actions")
+
+    def _supersede(self, row):
+        """Fold an entry that failed to send into a later one added while it was being sent"""
+        entry_id, action, muted, presses = row
+        if action in ("set", "toggle"):
+            later = self._db.execute("SELECT id, action FROM outbox WHERE kind = 'state' AND id > ? "
+                                     "ORDER BY id LIMIT 1", (entry_id,)).fetchone()
+        else:
+            later = self._db.execute("SELECT id, action FROM outbox WHERE kind = 'command' AND action = ? AND id > ? "
+                                     "ORDER BY id LIMIT 1", (action, entry_id)).fetchone()
+        if later is None or (action == "toggle" and later[1] == "toggle" and self._off_queued()):
+            return  # Kept where it is; with an off waiting, two toggles do not cancel out
+        self._db.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+        if action == "toggle" and later[1] == "toggle":
+            self._db.execute("DELETE FROM outbox WHERE id = ?", (later[0],))  # Two toggles cancel out
+        else:
+            self._db.execute("UPDATE outbox SET presses = presses + ? WHERE id = ?", (presses, later[0]))
+
+    def _off_queued(self, after=0):
+        """Whether an off is waiting (later than entry ``after``), including one being sent"""
+        return self._db.execute("SELECT 1 FROM outbox WHERE kind = 'command' AND action = 'off' AND id > ? "
+                                "LIMIT 1", (after,)).fetchone() is not None
+
+    @staticmethod
+    def _resolve(action, muted):
+        """The action to send for an entry"""
+        if action == "set":
+            return "mute" if muted else "unmute"
+        return action
+
+    def submit(self, action, send):
+        """Send ``action`` now, or keep it if the sign cannot be reached
+
+        Returns what ``send`` returned, or None if the action was kept.
+        """
+        self.start(send)
+        if self.pending():
+            self.add(action)
+            self._wake.set()
+            return None
+        try:
+            return send(action)
+        except Undelivered as e:
+            logger.warning(f"{e}; keeping {action} in the outbox")
+            self.add(action)
+            self._wake.set()
+            return None
+
+    def drain(self, send):
+        """Send kept actions oldest first until one is undelivered; returns the number sent"""
+        sent = 0
+        while True:
+            with self._lock:
+                if self.max_age:
+                    expired = self._db.execute("DELETE FROM outbox WHERE updated < ? AND id IS NOT ?",
+                                               (time.time() - self.max_age, self._sending)).rowcount
+                    if expired:
+                        self.expired += expired
+                        logger.warning(f"Outbox: dropped {expired} actions older than {self.max_age:.0f}s")
+                row = self._db.execute("SELECT id, action, muted, presses FROM outbox ORDER BY id LIMIT 1").fetchone()
+                if row is None:
+                    return sent
+                self._sending = row[0]
+            action = self._resolve(row[1], row[2])
+            try:
+                send(action)
+            except Exception as e:
+                with self._lock:
+                    self._sending = None
+                    self._supersede(row)
+                if not isinstance(e, Undelivered):
+                    raise
+                logger.info(f"Outbox: {action} still undelivered ({e})")
+                return sent
+            # Deleted as it stops being in flight, so a press in between cannot fold into it
+            with self._lock:
+                self._db.execute("DELETE FROM outbox WHERE id = ?", (row[0],))
+                self._sending = None
+                self.delivered += 1
+            sent += 1
+            logger.info(f"Outbox: sent {action} ({row[3]} presses)")
+
+    def start(self, send):
+        """Send kept actions in the background: now, after each new one, and every ``retry`` seconds
+
+        Does nothing if the thread is already running.
+        """
+        def run():
+            while not self._closed:
+                if self.pending():
+                    try:
+                        self.drain(send)
+                    except Exception as e:
+                        logger.error(f"Outbox: error sending kept actions: {e}")
+                self._wake.wait(self.retry)
+                self._wake.clear()
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=run, name="outbox")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "pending": len(entries),
+            "presses": self.presses,
+            "delivered": self.delivered,
+            "expired": self.expired,
+            "dropped": self.dropped,
+            "oldest_age_s": round(time.time() - entries[0]["created"], 1) if entries else None
+        }
@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 """
 Physical Button Client for BlinkySign
-Uses a physical button connected to Raspberry Pi GPIO to send toggle requests
+Uses physical buttons connected to Raspberry Pi GPIO to control the sign
+(by default one button that toggles on press, optionally with a double
+press effect and a long press off), straight through the LED daemon's socket
+when it runs on the same Pi
 """
 import os
 import time
 import logging
-import requests
-import RPi.GPIO as GPIO
 from dotenv import load_dotenv
+from led_client import LEDClient, LEDDaemonUnavailable, LED_SOCKET
+from api_client import APIClient, API_ENDPOINT, RETRY_STATUS, REFUSED_STATUS
+from button_panel import ButtonConfig, ButtonPanel, load_buttons
+from outbox import Outbox, Undelivered, outbox_path, REPEATABLE_ACTIONS
 
 # Load environment variables
 load_dotenv()
@@ -21,61 +26,141 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Configuration
-API_ENDPOINT = os.getenv('API_ENDPOINT', 'http://localhost:5000')
 BUTTON_PIN = int(os.getenv('BUTTON_PIN', 17))  # Default to GPIO 17
-DEBOUNCE_TIME = 0.3  # Debounce time in seconds
+BUTTON_TRANSPORT = os.getenv('BUTTON_TRANSPORT', 'auto')  # "local" (LED daemon socket), "http" (API_ENDPOINT) or "auto"
+BUTTON_TIMEOUT = float(os.getenv('BUTTON_TIMEOUT', 2.0))  # Seconds before a toggle request is given up
+BUTTON_EFFECT = os.getenv('BUTTON_EFFECT', '')  # Effect started by a double press (empty: no double press)
+BUTTON_LONG_PRESS_OFF = os.getenv('BUTTON_LONG_PRESS_OFF', 'false').lower() == 'true'  # Long press turns the LEDs off
+BUTTON_STATS_INTERVAL = float(os.getenv('BUTTON_STATS_INTERVAL', 300))  # Seconds between logged button stats (0: off)
 
-# GPIO setup
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(BUTTON_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+# BUTTON_CONFIG maps several pins to actions; without it, one button on BUTTON_PIN.
+# Without double or long presses it toggles on the press edge; with them it has to wait for the release.
+buttons = load_buttons(default=[
+    ButtonConfig(BUTTON_PIN, "toggle", double=f"effect:{BUTTON_EFFECT}" if BUTTON_EFFECT else None,
+                 long="off" if BUTTON_LONG_PRESS_OFF else None, name="button")
+])
 
-# Last button press time for debouncing
-last_press_time = 0
+# "auto" uses the LED daemon when its socket is on this machine
+transport = BUTTON_TRANSPORT
+if transport == "auto":
+    transport = "local" if os.path.exists(LED_SOCKET) else "http"
 
-def send_toggle_request():
-    """Send a toggle request to the API"""
+# Kept open between presses, so a press costs one round trip on the socket (or one HTTP request, no handshakes)
+led = LEDClient(timeout=BUTTON_TIMEOUT)
+api = APIClient(timeout=BUTTON_TIMEOUT)
+
+# Presses that cannot reach the sign wait on disk until it is back
+OUTBOX_PATH = outbox_path("physical_button")
+outbox = Outbox(OUTBOX_PATH) if OUTBOX_PATH else None
+
+def send_local(action, pressed_at=None):
+    """Send an action to the LED daemon; a state change is answered once it is on the strip
+
+    Raises Undelivered when the daemon is not reachable.
+    """
     try:
-        response = requests.put(f"{API_ENDPOINT}/toggle")
-        if response.status_code == 200:
-            data = response.json()
-            logger.info(f"Toggle successful: {data['message']}")
+        if action == "toggle":
+            response = led.toggle(pressed_at=pressed_at)
+        elif action in ("mute", "unmute"):
+            response = led.set_muted(action == "mute", pressed_at=pressed_at)
+        elif action == "off":
+            response = led.off()
+        else:
+            response = led.effect(action.split(":", 1)[1])
+        if response["status"] == "success":
+            latency = response.get("press_to_photon_ms")
+            logger.info(f"{action.capitalize()} successful: {response['message']}"
+                        + (f" (press to photon {latency} ms)" if latency is not None else ""))
             return True
+        logger.error(f"{action.capitalize()} failed: {response['message']}")
+        return False
+    except LEDDaemonUnavailable as e:
+        raise Undelivered(f"Error sending {action} to the LED daemon: {e}")
+
+def send_request(action):
+    """Send an action to the API; raises Undelivered when the API is not reachable"""
+    try:
+        if action == "toggle":
+            response = api.toggle()
+        elif action in ("mute", "unmute"):
+            response = api.set_muted(action == "mute")
+        elif action == "off":
+            response = api.off()
         else:
-            logger.error(f"Toggle failed with status code {response.status_code}")
-            return False
+            response = api.effect(action.split(":", 1)[1])
     except Exception as e:
-        logger.error(f"Error sending toggle request: {e}")
-        return False
+        if action not in REPEATABLE_ACTIONS and not api.never_sent(e):
+            # It may have been carried out; sending it again could undo it
+            logger.error(f"Error sending {action} request, not kept: {e}")
+            return False
+        raise Undelivered(f"Error sending {action} request: {e}")
+    if response.status_code in (200, 202):
+        data = response.json()
+        logger.info(f"{action.capitalize()} successful: {data.get('message', data.get('status'))}")
+        return True
+    # A toggle or effect is kept only if refused (429, 503); other server errors may follow its effect
+    unsent = RETRY_STATUS if action in REPEATABLE_ACTIONS else REFUSED_STATUS
+    if response.status_code in unsent or (action in REPEATABLE_ACTIONS and response.status_code >= 500):
+        raise Undelivered(f"{action.capitalize()} failed with status code {response.status_code}")
+    logger.error(f"{action.capitalize()} failed with status code {response.status_code}")
+    return False
 
-def button_callback(channel):
-    """Callback function for button press"""
-    global last_press_time
-    
-    # Debounce
-    current_time = time.time()
-    if (current_time - last_press_time) < DEBOUNCE_TIME:
-        return
-    
-    last_press_time = current_time
-    logger.info("Button pressed!")
-    send_toggle_request()
+def perform(action, pressed_at):
+    """Run a button's action (called from the panel's dispatch queue)"""
+    send = send_request if transport == "http" else lambda action: send_local(action, pressed_at)
+    if outbox:
+        return outbox.submit(action, send)
+    try:
+        return send(action)
+    except Undelivered as e:
+        logger.error(f"{e}; {action} dropped")
+        return False
 
 if __name__ == "__main__":
+    panel = None
     try:
         logger.info("Physical button client started")
-        logger.info(f"API endpoint: {API_ENDPOINT}")
-        logger.info(f"Button connected to GPIO {BUTTON_PIN}")
-        
-        # Add event detection for button press
-        GPIO.add_event_detect(BUTTON_PIN, GPIO.FALLING, 
-                             callback=button_callback, bouncetime=300)
-        
+        if transport == "local":
+            logger.info(f"LED daemon socket: {LED_SOCKET}")
+            try:
+                led.request("ping")  # Connect now rather than on the first press
+            except LEDDaemonUnavailable as e:
+                logger.warning(f"{e}; will retry on the first press")
+        else:
+            logger.info(f"API endpoint: {API_ENDPOINT}")
+            try:
+                api.status()  # Open the connection (and TLS session) now rather than on the first press
+            except Exception as e:
+                logger.warning(f"API not reachable yet: {e}")
+
+        if outbox:
+            # Also sends what was kept before a restart
+            outbox.start(send_request if transport == "http" else send_local)
+            logger.info(f"Outbox: {outbox.path} ({outbox.pending()} actions waiting)")
+
+        # Edges carry kernel timestamps; debouncing and gestures run on the monotonic clock
+        panel = ButtonPanel(buttons, perform)
+        panel.start()
+        for button in buttons:
+            actions = ", ".join(f"{kind}: {action}" for kind, action in button.actions.items() if action)
+            logger.info(f"Button {button.name} connected to GPIO {button.pin} ({actions})")
+
         # Keep the script running
         logger.info("Waiting for button presses... (Press Ctrl+C to exit)")
         while True:
-            time.sleep(1)
-            
+            time.sleep(BUTTON_STATS_INTERVAL or 60)
+            if BUTTON_STATS_INTERVAL:
+                logger.info(f"Button stats: {panel.stats()}")
+                if outbox:
+                    logger.info(f"Outbox stats: {outbox.stats()}")
+
     except KeyboardInterrupt:
         logger.info("Button client stopped")
     finally:
-        GPIO.cleanup()
\ No newline at end of file
+        if panel:
+            panel.stop()
+            logger.info(f"Button stats: {panel.stats()}")
+        if outbox:
+            outbox.close()
+        led.close()
+        api.close()
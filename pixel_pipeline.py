@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Pixel Pipeline for BlinkySign
+Whole-frame pixel generation for the LED effects. Uses NumPy when it is
+installed and falls back to plain Python lists otherwise.
+"""
+import logging
+import importlib.util
+
+logger = logging.getLogger(__name__)
+
+# NumPy is optional and slow to import on small boards, so it is only
+# loaded the first time a frame is actually computed
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+BACKEND = "numpy" if HAS_NUMPY else "python"
+_numpy_module = None
+_wheel_lut = None
+
+def _numpy():
+    """The numpy module (imported on first use), or None when unavailable"""
+    global _numpy_module
+    if not HAS_NUMPY:
+        return None
+    if _numpy_module is None:
+        import numpy
+        _numpy_module = numpy
+    return _numpy_module
+
+def wheel(pos):
+    """Generate rainbow colors across 0-255 positions"""
+    if pos < 85:
+        return (pos * 3, 255 - pos * 3, 0)
+    elif pos < 170:
+        pos -= 85
+        return (255 - pos * 3, 0, pos * 3)
+    else:
+        pos -= 170
+        return (0, pos * 3, 255 - pos * 3)
+
+# Precomputed hue lookup table
+WHEEL_TABLE = [wheel(pos) for pos in range(256)]
+
+def wheel_lut():
+    """The hue lookup table as a (256, 3) uint8 array"""
+    global _wheel_lut
+    if _wheel_lut is None:
+        np = _numpy()
+        _wheel_lut = np.array(WHEEL_TABLE, dtype=np.uint8)
+    return _wheel_lut
+
+def _padded(count, period):
+    """Smallest multiple of ``period`` that holds ``count`` pixels"""
+    return max(period, -(-count // period) * period)
+
+def solid_frame(color, count):
+    """A frame with every pixel set to one color"""
+    np = _numpy()
+    if np is not None:
+        frame = np.empty((count, 3), dtype=np.uint8)
+        frame[:] = color
+        return frame
+    return [tuple(color)] * count
+
+def copy_frame(frame):
+    """Independent copy of a frame"""
+    np = _numpy()
+    if np is not None and isinstance(frame, np.ndarray):
+        return frame.copy()
+    return list(frame)
+
+def fill_range(frame, stop, color):
+    """Set pixels ``0..stop-1`` of a frame to a color in place"""
+    np = _numpy()
+    if np is not None and isinstance(frame, np.ndarray):
+        frame[:stop] = color
+    else:
+        frame[:stop] = [tuple(color)] * min(stop, len(frame))
+    return frame
+
+def rainbow_frame(step, count):
+    """Rainbow frame where pixel ``i`` shows hue ``(i + step) & 255``"""
+    np = _numpy()
+    if np is not None:
+        # Tile the hue ring to a multiple of 256 so rolling it keeps every
+        # pixel on the right hue, then rotate the whole ring at once
+        ring = np.tile(wheel_lut(), (_padded(count, 256) // 256, 1))
+        return np.roll(ring, -(step & 255), axis=0)[:count]
+    return [WHEEL_TABLE[(i + step) & 255] for i in range(count)]
+
+def chase_frame(step, count, color, spacing=3):
+    """Theater chase frame: every ``spacing``-th pixel lit, shifted by ``step``"""
+    offset = step % spacing
+    np = _numpy()
+    if np is not None:
+        pattern = np.zeros((_padded(count, spacing), 3), dtype=np.uint8)
+        pattern[::spacing] = color
+        return np.roll(pattern, offset, axis=0)[:count]
+    color = tuple(color)
+    return [color if i % spacing == offset else (0, 0, 0) for i in range(count)]
+
+def scale(frame, brightness):
+    """Apply brightness to a frame (truncating like adafruit_pixelbuf)"""
+    np = _numpy()
+    if np is not None:
+        return (np.asarray(frame, dtype=np.float32) * brightness).astype(np.uint8)
+    return [tuple(int(c * brightness) for c in pixel) for pixel in frame]
+
+def frame_bytes(frame):
+    """Raw RGB bytes of a frame (no byte order or brightness applied)"""
+    np = _numpy()
+    if np is not None and isinstance(frame, np.ndarray):
+        return frame.astype(np.uint8).tobytes()
+    return bytes(value for pixel in frame for value in pixel)
+
+def wire_order(strip):
+    """Channel positions of a pixelbuf strip's wire format, or None
+
+    Only 3 byte-per-pixel strips whose pixel data starts the buffer can take
+    frames in wire format.
+    """
+    if getattr(strip, "_post_brightness_buffer", None) is None:
+        return None
+    if getattr(strip, "bpp", 3) != 3 or getattr(strip, "_offset", 0) != 0:
+        return None
+    return tuple(strip._byteorder[:3])
+
+def to_wire(frame, order, brightness=1.0):
+    """Encode a frame in wire format: channels reordered, brightness applied"""
+    np = _numpy()
+    if np is not None:
+        pixels = np.asarray(frame, dtype=np.uint8)
+        wire = np.empty_like(pixels)
+        wire[:, list(order)] = pixels
+        if brightness != 1.0:
+            wire = scale(wire, brightness)
+        return wire.tobytes()
+    wire = bytearray(len(frame) * 3)
+    for i, pixel in enumerate(frame):
+        for position, value in zip(order, pixel):
+            wire[i * 3 + position] = int(value * brightness)
+    return bytes(wire)
+
+def write_wire(strip, wire):
+    """Copy wire-format bytes straight into a strip's output buffer"""
+    size = len(strip) * 3
+    strip._post_brightness_buffer[0:size] = wire[:size]
+
+def write_frame(strip, frame, brightness):
+    """Write a whole frame into a strip's pixel buffer
+
+    With NumPy the frame is reordered into the strip's wire byte order and
+    copied into the pixelbuf byte buffers in one assignment. Without it (or
+    for strips that are not pixelbuf based) the frame is assigned as a slice.
+    """
+    count = len(strip)
+    order = wire_order(strip)
+    np = _numpy()
+    if np is not None and order is not None:
+        pixels = np.zeros((count, 3), dtype=np.uint8)
+        frame = np.asarray(frame, dtype=np.uint8)[:count]
+        pixels[:len(frame)] = frame
+        pre = getattr(strip, "_pre_brightness_buffer", None)
+        if pre is not None:
+            pre[0:count * 3] = to_wire(pixels, order)
+        strip._post_brightness_buffer[0:count * 3] = to_wire(pixels, order, brightness)
+        return
+
+    if strip.brightness != brightness:
+        strip.brightness = brightness
+    if np is not None and isinstance(frame, np.ndarray):
+        frame = frame.tolist()
+    strip[0:count] = frame[:count]
+
+def output_bytes(strip):
+    """Snapshot of the bytes a strip would send on its next show, or None"""
+    post = getattr(strip, "_post_brightness_buffer", None)
+    return bytes(post) if post is not None else None
+
+def show(strip):
+    """Send a strip's pixel buffer out over SPI
+
+    ``neopixel_spi`` expands every data bit into one SPI byte in a Python
+    loop. With NumPy the expansion is done as one vector lookup and the
+    result is written exactly like ``NeoPixel_SPI._transmit`` would.
+    """
+    spibuf = getattr(strip, "_spibuf", None)
+    post = getattr(strip, "_post_brightness_buffer", None)
+    np = _numpy()
+    if np is not None and spibuf is not None and post is not None and hasattr(strip, "_spi"):
+        bits = np.unpackbits(np.frombuffer(post, dtype=np.uint8))
+        patterns = np.array([strip._bit0, strip._bit1], dtype=np.uint8)
+        spibuf[:] = patterns[bits].tobytes()
+        with strip._spi as spi:
+            spi.write(strip._reset + spibuf + strip._reset)
+        return
+    strip.show()
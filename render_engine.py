@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Render Engine for BlinkySign
+Fixed-rate render loop that draws animations into a shared frame buffer
+and pushes the frames to the LED strips from a single render thread
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+import pixel_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Render configuration
+RENDER_FPS = float(os.getenv('RENDER_FPS', 50))  # Target frames per second
+
+class FrameBuffer:
+    """Shared frame that animations draw into and the render thread pushes out"""
+
+    def __init__(self, size):
+        self.size = size
+        # A plain list until the first fill, so creating an engine stays cheap
+        self.pixels = [(0, 0, 0)] * size
+        self.brightness = None  # None means the strip's configured brightness
+        self.wire = None  # Precompiled wire-format bytes per strip profile, replacing the pixels
+
+    def fill(self, color):
+        """Fill the whole frame with one color"""
+        self.pixels = pixel_pipeline.solid_frame(color, self.size)
+
+class Animation:
+    """A finite sequence of frames played back at a fixed step time
+
+    ``draw(step, frame)`` must fully describe step ``step`` in ``frame`` so the
+    engine can jump straight to any step when it has to skip frames.
+    ``key`` identifies the frames the animation produces (effect name plus
+    parameters) so they can be compiled and cached; ``uses_background`` marks
+    animations that draw on top of the frame left by whatever played before.
+    """
+
+    def __init__(self, name, steps, step_time, draw, key=None, uses_background=False):
+        self.name = name
+        self.steps = steps
+        self.step_time = step_time
+        self.draw = draw
+        self.key = key
+        self.uses_background = uses_background
+        self.step = -1
+        self.started_at = None
+        self.cancelled = False
+        self.done = threading.Event()
+
+    @property
+    def duration(self):
+        """Total playback time in seconds"""
+        return self.steps * self.step_time
+
+    def wait(self, timeout=None):
+        """Block until the animation finished or was cancelled"""
+        return self.done.wait(timeout)
+
+class RenderEngine:
+    """Pushes frames to the strips at a target FPS using deadline scheduling
+
+    Ticks that are missed because a frame took too long are dropped instead of
+    being replayed late, so animations keep their wall-clock duration.
+    """
+
+    def __init__(self, push, size, fps=RENDER_FPS):
+        self._push = push
+        self.frame = FrameBuffer(size)
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.lock = threading.RLock()
+        self._wake = threading.Condition(self.lock)
+        self._current = None
+        self._thread = None
+
+        # Statistics
+        self._push_times = deque(maxlen=max(2, int(fps * 2)))
+        self.frames_pushed = 0
+        self.frames_dropped = 0
+        self.render_time_total = 0.0
+        self.transfer_time_total = 0.0
+        self.last_render_time = 0.0
+        self.last_transfer_time = 0.0
+        self.max_render_time = 0.0
+        self.max_transfer_time = 0.0
+
+    def play(self, animation):
+        """Start an animation, replacing the one currently playing"""
+        if not animation.step_time > 0:
+            # A zero step time (wait_ms=0) plays one step per frame rather than dividing by zero
+            animation.step_time = self.interval
+        with self.lock:
+            self._cancel_current()
+            self._current = animation
+            self._ensure_thread()
+            self._wake.notify()
+        logger.info(f"Playing animation '{animation.name}' ({animation.steps} steps)")
+        return animation
+
+    def stop(self):
+        """Cancel the animation currently playing, if any"""
+        with self.lock:
+            self._cancel_current()
+
+    def show(self, color):
+        """Stop any animation and push a solid color frame right away"""
+        with self.lock:
+            self._cancel_current()
+            self.frame.brightness = None
+            self.frame.fill(color)
+            self._render(lambda frame: None)
+
+    @property
+    def current(self):
+        """The animation currently playing, or None"""
+        return self._current
+
+    def stats(self):
+        """Return render loop statistics"""
+        with self.lock:
+            pushes = self.frames_pushed or 1
+            fps = 0.0
+            if len(self._push_times) > 1:
+                span = self._push_times[-1] - self._push_times[0]
+                if span > 0:
+                    fps = (len(self._push_times) - 1) / span
+            avg_render = self.render_time_total / pushes
+            avg_transfer = self.transfer_time_total / pushes
+            return {
+                "target_fps": self.fps,
+                "measured_fps": round(fps, 2),
+                "frames_pushed": self.frames_pushed,
+                "frames_dropped": self.frames_dropped,
+                "render_ms": {
+                    "last": round(self.last_render_time * 1000, 3),
+                    "avg": round(avg_render * 1000, 3),
+                    "max": round(self.max_render_time * 1000, 3)
+                },
+                "transfer_ms": {
+                    "last": round(self.last_transfer_time * 1000, 3),
+                    "avg": round(avg_transfer * 1000, 3),
+                    "max": round(self.max_transfer_time * 1000, 3)
+                },
+                # Share of the frame budget spent drawing and pushing
+                "frame_budget_used": round((avg_render + avg_transfer) / self.interval, 3),
+                "animation": self._current.name if self._current else None
+            }
+
+    def _cancel_current(self):
+        if self._current is not None:
+            self._current.cancelled = True
+            self._current.done.set()
+            logger.info(f"Animation '{self._current.name}' cancelled")
+            self._current = None
+            self.frame.brightness = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="render-loop")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _render(self, draw):
+        """Draw into the frame buffer and push it, recording timings"""
+        start = time.perf_counter()
+        self.frame.wire = None
+        draw(self.frame)
+        drawn = time.perf_counter()
+        self._push(self.frame)
+        pushed = time.perf_counter()
+
+        self.last_render_time = drawn - start
+        self.last_transfer_time = pushed - drawn
+        self.max_render_time = max(self.max_render_time, self.last_render_time)
+        self.max_transfer_time = max(self.max_transfer_time, self.last_transfer_time)
+        self.render_time_total += self.last_render_time
+        self.transfer_time_total += self.last_transfer_time
+        self.frames_pushed += 1
+        self._push_times.append(pushed)
+
+    def _tick(self, animation, now):
+        """Render the step due at ``now`` and finish the animation when it ends"""
+        if animation.started_at is None:
+            animation.started_at = now
+        elapsed = now - animation.started_at
+        step = min(int(elapsed / animation.step_time), animation.steps - 1)
+        if step != animation.step:
+            self._render(lambda frame: animation.draw(step, frame))
+            animation.step = step
+        if elapsed >= animation.duration:
+            self._current = None
+            self.frame.brightness = None
+            animation.done.set()
+            logger.info(f"Animation '{animation.name}' finished")
+
+    def _run(self):
+        """Render thread main loop"""
+        next_deadline = time.monotonic()
+        while True:
+            with self.lock:
+                while self._current is None:
+                    self._wake.wait()
+                    next_deadline = time.monotonic()
+                try:
+                    self._tick(self._current, time.monotonic())
+                except Exception as e:
+                    logger.error(f"Error rendering frame: {e}")
+                    self._cancel_current()
+
+            # Deadline-based pacing: skip whole ticks rather than drifting
+            next_deadline += self.interval
+            delay = next_deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                missed = int(-delay / self.interval)
+                if missed:
+                    self.frames_dropped += missed
+                    next_deadline += missed * self.interval
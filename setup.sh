@@ -31,5 +31,6 @@ echo "Setup complete!"
 echo "Next steps:"
 echo "1. Edit .env file with your AWS credentials and configuration"
 echo "2. Run 'python aws_setup.py' to set up AWS resources"
-echo "3. Run 'python app.py' to start the local server"
-echo "4. Run 'python iot_client.py' to connect to AWS IoT Core"
\ No newline at end of file
+echo "3. Run 'python led_daemon.py' to start the LED daemon"
+echo "4. Run 'python app.py' to start the local server"
+echo "5. Run 'python iot_client.py' to connect to AWS IoT Core"
\ No newline at end of file
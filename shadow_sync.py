@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Shadow Sync for BlinkySign
+Keeps the sign's mute state in step with its AWS IoT Device Shadow
+"""
+import os
+import json
+import time
+import logging
+import threading
+from command_queue import CommandQueue
+from led_client import led_client, LEDDaemonUnavailable
+from mqtt_dispatcher import PRIORITY_STATE
+from state_publisher import STATE_PUBLISH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Shadow configuration
+SHADOW_GET_TIMEOUT = float(os.getenv('SHADOW_GET_TIMEOUT', 10))  # Seconds to wait for the shadow on connect
+SHADOW_RECONNECT = 1.0  # Seconds between attempts to follow the LED daemon's state stream
+
+# Shadow fields kept in step with the LED daemon state
+SHADOW_FIELDS = ("muted", "led_on")
+
+class ShadowSync:
+    """Syncs desired and reported state through the classic Device Shadow topics
+
+    ``start()`` requests the shadow document once and applies its desired
+    state, then applies every ``update/delta`` message. Reported state
+    follows the LED daemon's state stream: only fields that changed are
+    published, coalesced like the state publisher. Changes made locally (web
+    API, buttons) are written to ``desired`` as well, so the shadow does not
+    send them back as a delta. ``mqtt_client`` needs ``publish(topic,
+    payload, qos)`` and ``subscribe(topic, qos, callback)``;
+    ``on_publish()`` is called after each reported-state update.
+    """
+
+    def __init__(self, mqtt_client, thing_name, led=led_client, dispatcher=None,
+                 interval=STATE_PUBLISH_INTERVAL, on_publish=None):
+        self.mqtt_client = mqtt_client
+        self.topic = f"$aws/things/{thing_name}/shadow"
+        self.led = led
+        self.dispatcher = dispatcher
+        self.on_publish = on_publish
+        self.desired = None  # Unknown until the shadow document arrives
+        self.reported = {}
+        self.version = 0
+        self.synced = threading.Event()
+        self._lock = threading.Lock()
+        self._follower = None
+        self.deltas = 0
+        self.stale_deltas = 0
+        self.updates = 0
+        self.bytes_sent = 0
+        self.sync_ms = None
+        self._reports = CommandQueue(self._report, interval)
+
+    def start(self, timeout=SHADOW_GET_TIMEOUT):
+        """Fetch and apply the shadow, then start reporting; returns True once synced"""
+        started = time.perf_counter()
+        self.mqtt_client.subscribe(f"{self.topic}/get/accepted", 1, self._on_document)
+        self.mqtt_client.subscribe(f"{self.topic}/get/rejected", 1, self._on_rejected)
+        self.mqtt_client.subscribe(f"{self.topic}/update/delta", 1, self._on_delta)
+        self.mqtt_client.publish(f"{self.topic}/get", "", 1)
+
+        synced = self.synced.wait(timeout)
+        if synced:
+            self.sync_ms = round((time.perf_counter() - started) * 1000, 3)
+            logger.info(f"Device Shadow synced in {self.sync_ms} ms")
+        else:
+            logger.error("No Device Shadow received; reporting state without touching desired")
+        self._follow()
+        return synced
+
+    def _on_document(self, client, userdata, message):
+        """The full shadow document (once, on start)"""
+        try:
+            document = json.loads(message.payload.decode('utf-8'))
+            state = document.get("state", {})
+            desired = {key: value for key, value in (state.get("desired") or {}).items() if key in SHADOW_FIELDS}
+            with self._lock:
+                self.desired = desired
+                self.reported = dict(state.get("reported") or {})
+                self.version = document.get("version", 0)
+            logger.info(f"Device Shadow version {self.version}, desired {desired}")
+            self._submit("shadow document", desired)
+        except Exception as e:
+            logger.error(f"Error processing shadow document: {e}")
+
+    def _on_rejected(self, client, userdata, message):
+        """No shadow yet (404): start from the sign's own state"""
+        try:
+            error = json.loads(message.payload.decode('utf-8'))
+        except ValueError:
+            error = {}
+        if error.get("code") != 404:
+            logger.error(f"Shadow request rejected: {error}")
+        with self._lock:
+            if self.desired is None:
+                self.desired = {}
+        self.synced.set()
+
+    def _on_delta(self, client, userdata, message):
+        """Desired fields that differ from reported ones"""
+        try:
+            delta = json.loads(message.payload.decode('utf-8'))
+            changes = {key: value for key, value in delta.get("state", {}).items() if key in SHADOW_FIELDS}
+            with self._lock:
+                if delta.get("version", 0) <= self.version:
+                    self.stale_deltas += 1
+                    return
+                self.version = delta["version"]
+                self.deltas += 1
+                if self.desired is not None:
+                    self.desired.update(changes)
+            logger.info(f"Shadow delta: {changes}")
+            self._submit("shadow delta", changes)
+        except Exception as e:
+            logger.error(f"Error processing shadow delta: {e}")
+
+    def _submit(self, name, desired):
+        if self.dispatcher is not None:
+            self.dispatcher.submit(name, PRIORITY_STATE, self._apply, desired)
+        else:
+            self._apply(desired)
+
+    def _apply(self, desired):
+        """Drive the LED daemon to the desired state"""
+        try:
+            if desired.get("led_on") is False:
+                self.led.off()
+            elif "muted" in desired:
+                self.led.set_muted(bool(desired["muted"]))
+            elif desired.get("led_on"):
+                self.led.set_muted(self.led.status()["state"]["muted"])
+        finally:
+            self.synced.set()
+
+    def _follow(self):
+        """Report the daemon's state changes from a background thread (once)"""
+        with self._lock:
+            if self._follower is not None:
+                return
+            self._follower = threading.Thread(target=self._follow_stream, name="shadow-report")
+            self._follower.daemon = True
+            self._follower.start()
+
+    def _follow_stream(self):
+        while True:
+            try:
+                for event in self.led.subscribe():
+                    self._reports.submit(event["state"])
+            except LEDDaemonUnavailable as e:
+                logger.error(f"Lost LED daemon state stream: {e}")
+            time.sleep(SHADOW_RECONNECT)
+
+    def _report(self, state):
+        """Publish the fields that changed since the last report (runs on the report queue)"""
+        with self._lock:
+            reported = {key: state[key] for key in SHADOW_FIELDS if self.reported.get(key) != state.get(key)}
+            if not reported:
+                return
+            document = {"reported": reported}
+            if self.desired is not None:
+                # A local change: make it the desired state too
+                desired = {key: value for key, value in reported.items() if self.desired.get(key) != value}
+                if desired:
+                    document["desired"] = desired
+            payload = json.dumps({"state": document})
+        self.mqtt_client.publish(f"{self.topic}/update", payload, 1)
+        with self._lock:
+            self.reported.update(reported)
+            if "desired" in document:
+                self.desired.update(document["desired"])
+            self.updates += 1
+            self.bytes_sent += len(payload)
+        if self.on_publish is not None:
+            self.on_publish()
+
+    def stats(self):
+        """Return shadow sync statistics"""
+        with self._lock:
+            return {
+                "synced": self.synced.is_set(),
+                "sync_ms": self.sync_ms,
+                "version": self.version,
+                "deltas": self.deltas,
+                "stale_deltas": self.stale_deltas,
+                "updates": self.updates,
+                "bytes_sent": self.bytes_sent
+            }
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+State Publisher for BlinkySign
+Publishes the sign state to MQTT at most once per interval, only when it
+changed, with a sequence number so consumers can drop stale updates
+"""
+import os
+import json
+import time
+import logging
+import threading
+from command_queue import CommandQueue
+
+logger = logging.getLogger(__name__)
+
+# Publisher configuration
+STATE_PUBLISH_INTERVAL = float(os.getenv('STATE_PUBLISH_INTERVAL', 1.0))  # Minimum seconds between state publishes
+
+class StatePublisher:
+    """Coalescing, rate-limited state publisher
+
+    ``send(payload)`` publishes one JSON string. Updates go through a
+    CommandQueue: the first update after a quiet period is sent right away,
+    and a burst within ``interval`` sends only the newest state at the end of
+    the interval. A state equal to the last one sent is skipped. Each message
+    carries ``seq`` (increasing for the life of the process) and ``ts``.
+    """
+
+    def __init__(self, send, interval=STATE_PUBLISH_INTERVAL):
+        self._send = send
+        self._lock = threading.Lock()
+        self._last_sent = None
+        self.seq = 0
+        self.published = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.last_publish_at = None
+        self._queue = CommandQueue(self._publish, interval)
+
+    def update(self, state):
+        """Queue the latest state for publishing"""
+        self._queue.submit(dict(state))
+
+    def flush(self):
+        """Publish a pending update now (for example before disconnecting)"""
+        self._queue.barrier()
+
+    def _publish(self, state):
+        with self._lock:
+            if state == self._last_sent:
+                self.unchanged += 1
+                return
+            self.seq += 1
+            payload = json.dumps(dict(state, seq=self.seq, ts=time.time()))
+        try:
+            self._send(payload)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Error publishing state: {e}")
+            return
+        with self._lock:
+            self._last_sent = state
+            self.published += 1
+            self.last_publish_at = time.monotonic()
+
+    def stats(self):
+        """Return publish counts and the coalescing queue's statistics"""
+        queue_stats = self._queue.stats()
+        with self._lock:
+            return {
+                "updates": queue_stats["submitted"],
+                "published": self.published,
+                "coalesced": queue_stats["coalesced"],
+                "unchanged": self.unchanged,
+                "failed": self.failed,
+                "seq": self.seq,
+                "interval_ms": queue_stats["interval_ms"],
+                "latency_ms": queue_stats["latency_ms"]
+            }
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+State Stream for BlinkySign
+Fans mute state changes out to every open control panel as Server-Sent Events
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Stream configuration
+STREAM_HISTORY = int(os.getenv('STREAM_HISTORY', 32))  # Events kept for reconnecting subscribers
+STREAM_KEEPALIVE = float(os.getenv('STREAM_KEEPALIVE', 15))  # Seconds between keepalive comments
+STREAM_RETRY_MS = 3000  # Browser reconnect delay sent to EventSource clients
+STREAM_RECONNECT = 1.0  # Seconds between attempts to resubscribe to the LED daemon
+STATUS_MAX_WAIT = float(os.getenv('STATUS_MAX_WAIT', 60))  # Longest /status?wait= long-poll in seconds
+
+class StateEvent:
+    """One state change, encoded once for every subscriber and poller
+
+    ``body`` is the /status JSON and ``payload`` the SSE message. The ETag
+    comes from the LED daemon's state version, so it is the same across
+    front ends and changes when the daemon restarts.
+    """
+
+    def __init__(self, seq, state, changed_at, version=None, instance=None):
+        self.seq = seq
+        self.state = state
+        self.changed_at = changed_at
+        self.version = version
+        self.instance = instance
+        self.published_at = time.time()
+        self.body = json.dumps(state).encode('utf-8')
+        self.etag = f'"{instance}-{version}"' if version is not None else f'"local-{seq}"'
+        self.payload = b"id: %d\nevent: state\ndata: %s\n\n" % (seq, self.body)
+
+    @classmethod
+    def from_status(cls, response):
+        """Event for an LED daemon ``status`` response (when not following the stream)"""
+        return cls(0, response["state"], time.time(), response.get("version"), response.get("instance"))
+
+    def matches(self, if_none_match=None, version=None):
+        """True when a client holding this ETag (or version number) is up to date"""
+        if version is not None:
+            return str(self.version) == str(version)
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+        return "*" in tags or self.etag in tags
+
+class StateBroadcaster:
+    """Single shared buffer of recent state events
+
+    Subscribers only keep a cursor (the last event ID they sent), so adding a
+    subscriber costs no extra buffering and each change is encoded once.
+    Blocking subscribers (Flask) wait on a condition; async subscribers
+    (ASGI) are woken through one event per event loop.
+    """
+
+    def __init__(self, history=STREAM_HISTORY):
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._loop_wakers = {}
+        self._follower = None
+        self.connected = False
+        self.subscribers = 0
+        self.published = 0
+        self.deliveries = 0
+        self.latency_samples = 0
+        self._latency_last = 0.0
+        self._latency_max = 0.0
+        self._latency_total = 0.0
+
+    def publish(self, state, changed_at=None, version=None, instance=None):
+        """Add a state change to the buffer and wake every subscriber"""
+        with self._cond:
+            if self._events:
+                newest = self._events[-1]
+                if version is None and newest.state == state:
+                    return
+                if version is not None and (newest.version, newest.instance) == (version, instance):
+                    return
+            self._seq += 1
+            self._events.append(StateEvent(self._seq, state, changed_at or time.time(), version, instance))
+            self.published += 1
+            self._cond.notify_all()
+            wakers = list(self._loop_wakers.items())
+            self._loop_wakers.clear()
+        for loop, waker in wakers:
+            try:
+                loop.call_soon_threadsafe(waker.set)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+    def current(self):
+        """The newest event while following the LED daemon, otherwise None"""
+        with self._cond:
+            return self._events[-1] if self._events and self.connected else None
+
+    def _since(self, cursor):
+        """Events after ``cursor``; just the newest one for new or out-of-range cursors"""
+        if not self._events:
+            return []
+        newest = self._events[-1]
+        if cursor is None or cursor > newest.seq or cursor < self._events[0].seq - 1:
+            return [newest]
+        return [event for event in self._events if event.seq > cursor]
+
+    def wait(self, cursor, timeout=STREAM_KEEPALIVE):
+        """Block until there are events after ``cursor`` (or the timeout passes)"""
+        with self._cond:
+            events = self._since(cursor)
+            if not events:
+                self._cond.wait(timeout)
+                events = self._since(cursor)
+            return events
+
+    async def wait_async(self, cursor, timeout=STREAM_KEEPALIVE):
+        """Event loop version of wait()"""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            events = self._since(cursor)
+            if events:
+                return events
+            waker = self._loop_wakers.get(loop)
+            if waker is None:
+                waker = self._loop_wakers[loop] = asyncio.Event()
+        try:
+            await asyncio.wait_for(waker.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            return self._since(cursor)
+
+    def _delivered(self, events, waiting_since):
+        """Count deliveries; latency only for changes that happened while the subscriber waited"""
+        now = time.time()
+        with self._cond:
+            for event in events:
+                self.deliveries += 1
+                if event.published_at < waiting_since:
+                    continue
+                latency = max(now - event.changed_at, 0.0)
+                self.latency_samples += 1
+                self._latency_last = latency
+                self._latency_max = max(self._latency_max, latency)
+                self._latency_total += latency
+
+    def _subscribed(self, delta):
+        with self._cond:
+            self.subscribers += delta
+
+    @staticmethod
+    def _cursor(last_event_id):
+        try:
+            return int(last_event_id)
+        except (TypeError, ValueError):
+            return None
+
+    def sse_stream(self, last_event_id=None):
+        """Server-Sent Events for one subscriber (blocking generator)"""
+        cursor = self._cursor(last_event_id)
+        self._subscribed(1)
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n".encode('utf-8')
+            while True:
+                waiting_since = time.time()
+                events = self.wait(cursor)
+                if not events:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"".join(event.payload for event in events)
+                self._delivered(events, waiting_since)
+                cursor = events[-1].seq
+        finally:
+            self._subscribed(-1)
+
+    async def sse_stream_async(self, last_event_id=None):
+        """Server-Sent Events for one subscriber (async generator)"""
+        cursor = self._cursor(last_event_id)
+        self._subscribed(1)
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n".encode('utf-8')
+            while True:
+                waiting_since = time.time()
+                events = await self.wait_async(cursor)
+                if not events:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"".join(event.payload for event in events)
+                self._delivered(events, waiting_since)
+                cursor = events[-1].seq
+        finally:
+            self._subscribed(-1)
+
+    def follow(self, source):
+        """Publish state events from ``source`` on a background thread (once)
+
+        ``source`` returns an iterator of daemon state events, such as
+        ``LEDClient.subscribe``; it is called again whenever the stream breaks.
+        """
+        with self._cond:
+            if self._follower is not None:
+                return
+            self._follower = threading.Thread(target=self._follow, args=(source,), name="state-follower")
+            self._follower.daemon = True
+            self._follower.start()
+
+    def _follow(self, source):
+        while True:
+            try:
+                for event in source():
+                    if not self.connected:
+                        logger.info("Following LED daemon state changes")
+                        self.connected = True
+                    self.publish(event["state"], event.get("ts"), event.get("version"), event.get("instance"))
+            except Exception as e:
+                if self.connected:
+                    logger.error(f"Lost LED daemon state stream: {e}")
+            self.connected = False
+            time.sleep(STREAM_RECONNECT)
+
+    def stats(self):
+        """Return stream statistics"""
+        with self._cond:
+            samples = self.latency_samples or 1
+            return {
+                "subscribers": self.subscribers,
+                "following_daemon": self.connected,
+                "events_published": self.published,
+                "deliveries": self.deliveries,
+                "fanout_ms": {
+                    "last": round(self._latency_last * 1000, 3),
+                    "avg": round(self._latency_total / samples * 1000, 3),
+                    "max": round(self._latency_max * 1000, 3)
+                }
+            }
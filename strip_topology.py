@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Strip Topology for BlinkySign
+Describes which LED strips make up the sign and which SPI bus drives each one
+"""
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Topology configuration: a path to a JSON/YAML file or an inline JSON document.
+# Without it the sign is a single strip of LED_COUNT pixels on SPI0.
+STRIP_CONFIG = os.getenv('STRIP_CONFIG', '')
+LED_COUNT = int(os.getenv('LED_COUNT', 30))
+LED_BRIGHTNESS = float(os.getenv('LED_BRIGHTNESS', 0.5))
+DEFAULT_BUS = "spi0"
+
+class StripConfig:
+    """One LED strip segment of the sign"""
+
+    def __init__(self, name, length=LED_COUNT, bus=DEFAULT_BUS, brightness=LED_BRIGHTNESS,
+                 chip_select=None):
+        self.name = name
+        self.length = int(length)
+        self.bus = bus
+        self.brightness = float(brightness)
+        self.chip_select = chip_select
+
+        if self.length <= 0:
+            raise ValueError(f"Strip '{name}' must have at least one LED")
+        if not 0.0 <= self.brightness <= 1.0:
+            raise ValueError(f"Strip '{name}' brightness must be between 0.0 and 1.0")
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "length": self.length,
+            "bus": self.bus,
+            "brightness": self.brightness,
+            "chip_select": self.chip_select
+        }
+
+def default_topology():
+    """The classic single-strip sign"""
+    return [StripConfig("main")]
+
+def read_document(source):
+    """Parse inline JSON or a JSON/YAML file (also used for the button config)"""
+    if source.lstrip().startswith(("[", "{")):
+        return json.loads(source)
+
+    with open(source) as f:
+        text = f.read()
+    if source.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML is required for YAML configs (pip install pyyaml)")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+def parse_topology(document):
+    """Build strip configs from a parsed document
+
+    Accepts either a list of strips or ``{"strips": [...]}``. Each strip takes
+    ``name``, ``length``, ``bus`` (``spi0``/``spi1``), ``brightness`` and an
+    optional ``chip_select`` board pin name.
+    """
+    entries = document.get("strips", []) if isinstance(document, dict) else document
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Strip config must contain a non-empty list of strips")
+
+    strips = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Strip entry {index} must be an object")
+        unknown = set(entry) - {"name", "length", "bus", "brightness", "chip_select"}
+        if unknown:
+            raise ValueError(f"Strip entry {index} has unknown fields: {', '.join(sorted(unknown))}")
+        strips.append(StripConfig(
+            entry.get("name", f"strip{index}"),
+            entry.get("length", LED_COUNT),
+            entry.get("bus", DEFAULT_BUS),
+            entry.get("brightness", LED_BRIGHTNESS),
+            entry.get("chip_select")
+        ))
+
+    names = [strip.name for strip in strips]
+    if len(set(names)) != len(names):
+        raise ValueError("Strip names must be unique")
+    return strips
+
+def load_topology(source=STRIP_CONFIG):
+    """Load the strip topology, falling back to the single default strip"""
+    if not source:
+        return default_topology()
+    topology = parse_topology(read_document(source))
+    logger.info(f"Loaded topology with {len(topology)} strips on "
+                f"{len({strip.bus for strip in topology})} buses")
+    return topology
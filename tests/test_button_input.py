@@ -0,0 +1,66 @@
+"""Gesture detection on edge traces replayed through ReplayPin"""
+import time
+from button_input import ButtonGestures, ButtonInput, ReplayPin
+
+DEBOUNCE = 0.02
+DOUBLE_PRESS = 0.15
+LONG_PRESS = 0.3
+
+def press(at, hold, bounces=3, spacing=0.001):
+    """Edges for a press at ``at`` released ``hold`` seconds later, both with contact bounce"""
+    edges = []
+    for start, level in ((at, 0), (at + hold, 1)):
+        edges.append((start, level))
+        for i in range(bounces):
+            edges += [(start + (2 * i + 1) * spacing, 1 - level), (start + (2 * i + 2) * spacing, level)]
+    return edges
+
+def replay(edges, double_press=DOUBLE_PRESS, long_press=LONG_PRESS):
+    """Replay a trace in real time; returns [(kind, pressed_at, seen_at)] relative to the replay start"""
+    seen = []
+    pin = ReplayPin(edges)
+    gestures = ButtonGestures(debounce=DEBOUNCE, double_press=double_press, long_press=long_press)
+    button = ButtonInput(pin, lambda kind, pressed_at: seen.append((kind, pressed_at, time.monotonic())), gestures)
+    started = time.monotonic()
+    button.start()
+    assert pin.done.wait(5)
+    time.sleep(max(DEBOUNCE, double_press, long_press) + 0.1)
+    button.stop()
+    return [(kind, pressed_at - started, seen_at - started) for kind, pressed_at, seen_at in seen]
+
+def kinds(found):
+    return [kind for kind, _, _ in found]
+
+def test_single_press_with_bounce():
+    found = replay(press(0.05, 0.08))
+    assert kinds(found) == ["single"]
+    # Completed once the double press window after the release has passed
+    assert found[0][2] >= 0.05 + 0.08 + DOUBLE_PRESS
+
+def test_double_press():
+    assert kinds(replay(press(0.05, 0.06) + press(0.18, 0.06))) == ["double"]
+
+def test_long_press():
+    found = replay(press(0.05, LONG_PRESS + 0.15))
+    assert kinds(found) == ["long"]
+    assert found[0][2] < 0.05 + LONG_PRESS + 0.1  # While still held
+
+def test_presses_far_apart_are_singles():
+    edges = press(0.05, 0.06) + press(0.05 + DOUBLE_PRESS + 0.15, 0.06)
+    assert kinds(replay(edges)) == ["single", "single"]
+
+def test_press_without_double_or_long_acts_on_the_press():
+    found = replay(press(0.05, 0.2), double_press=0, long_press=0)
+    assert kinds(found) == ["single"]
+    _, pressed_at, seen_at = found[0]
+    assert abs(pressed_at - 0.05) < 0.01
+    assert seen_at < 0.05 + 0.1  # Before the release at 0.25
+
+def test_late_bounce_is_not_a_press():
+    # A bounce edge stamped inside the closed debounce window but delivered after it
+    gestures = ButtonGestures(debounce=DEBOUNCE, double_press=0, long_press=0)
+    found = gestures.edge(0, 1.0) + gestures.poll(1.05)
+    found += gestures.edge(1, 1.01) + gestures.edge(0, 1.011)
+    found += gestures.poll(2.0)
+    assert [kind for kind, _ in found] == ["single"]
+    assert gestures.level == 0